@@ -0,0 +1,250 @@
+"""
+パーサー・解析モジュール・プラグイン読み込みのベンチマーク。
+
+入力データを行数を変えて生成し、各ケースの処理時間（repeat 回の最小値・中央値）と
+tracemalloc によるピークメモリを計測して JSON に書き出す。
+--baseline を指定すると保存済みの結果と比較し、遅くなったケースがあれば終了コード 1 を返す。
+
+    python benchmarks/run_benchmarks.py --scales 1000,100000 --output results.json
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --save-baseline
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import contextlib
+import tracemalloc
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "modules"))
+sys.path.insert(0, os.path.join(ROOT, "plugins"))
+
+import logging
+from generate_dummy_csv import generate_dummy_csv
+from generate_dummy_json import generate_dummy_json
+from generate_dummy_datasets import (generate_anova_csv, generate_regression_csv, generate_clustering_csv,
+                                     generate_timeseries_csv, generate_stat_csv)
+from analysis_cache import configure_analysis_cache
+from columnar_io import convert
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+DEFAULT_SCALES = (1000, 100000)
+DEFAULT_THRESHOLD = 0.25   # 基準より 25% 以上遅ければ退行とみなす
+DEFAULT_MIN_DELTA_MS = 5.0  # ただし差が 5ms 未満なら計測誤差として無視する
+# 入力の規模に依存しないケース（最初の規模でだけ計測し、キーに規模を付けない）
+SCALE_INDEPENDENT = ("plugins.load",)
+
+def _quiet(func, *args, **kwargs):
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return func(*args, **kwargs)
+
+def prepare_inputs(workdir, scale):
+    """scale 行（件）の入力ファイルを workdir に作り、種類 -> パスの辞書を返す"""
+    paths = {
+        "csv": os.path.join(workdir, f"items_{scale}.csv"),
+        "json": os.path.join(workdir, f"items_{scale}.json"),
+        "anova": os.path.join(workdir, f"anova_{scale}.csv"),
+        "regression": os.path.join(workdir, f"regression_{scale}.csv"),
+        "clustering": os.path.join(workdir, f"clustering_{scale}.csv"),
+        "timeseries": os.path.join(workdir, f"timeseries_{scale}.csv"),
+        "stat": os.path.join(workdir, f"stat_{scale}.csv"),
+    }
+    _quiet(generate_dummy_csv, paths["csv"], scale)
+    _quiet(generate_dummy_json, paths["json"], scale)
+    _quiet(generate_anova_csv, paths["anova"], scale)
+    _quiet(generate_regression_csv, paths["regression"], scale)
+    _quiet(generate_clustering_csv, paths["clustering"], scale)
+    _quiet(generate_timeseries_csv, paths["timeseries"], max(scale, 48))
+    _quiet(generate_stat_csv, paths["stat"], scale)
+    # pyarrow があれば同じデータの Parquet 版も作り、CSV と読み込み時間を比べる
+    try:
+        for kind in ("csv", "anova"):
+            paths[f"{kind}_parquet"] = os.path.join(workdir, f"{kind}_{scale}.parquet")
+            convert(paths[kind], paths[f"{kind}_parquet"])
+    except ImportError:
+        paths.pop("csv_parquet", None)
+        paths.pop("anova_parquet", None)
+    return paths
+
+def build_cases(paths, workdir):
+    """ケース名 -> 引数なしで呼べる関数"""
+    from csv_parser_plugin import CSVParser
+    from json_parser_plugin import JSONParser
+    from plugin_manager import PluginManager
+    import anova_analyzer
+    import regression_analyzer
+    import clustering_analyzer
+    import time_series_analyzer
+    import statistical_analyzer
+
+    def consume(iterator):
+        for _ in iterator:
+            pass
+
+    def load_plugins():
+        PluginManager().load_plugins_from_directory(os.path.join(ROOT, "plugins"))
+
+    image = lambda name: os.path.join(workdir, name)
+    cases = {
+        "parse.csv": lambda: CSVParser().parse(paths["csv"]),
+        "parse.csv.stream": lambda: consume(CSVParser().iter_parse(paths["csv"])),
+        "parse.json": lambda: JSONParser().parse(paths["json"]),
+        "parse.json.stream": lambda: consume(JSONParser().iter_parse(paths["json"])),
+        "analyze.anova": lambda: anova_analyzer.analyze_anova(paths["anova"], image("anova.png")),
+        "analyze.regression": lambda: regression_analyzer.analyze_regression(paths["regression"],
+                                                                             image("regression.png")),
+        "analyze.clustering": lambda: clustering_analyzer.analyze_clustering(paths["clustering"],
+                                                                             image("clustering.png")),
+        "analyze.time_series": lambda: time_series_analyzer.analyze_time_series(paths["timeseries"],
+                                                                                image("timeseries")),
+        "analyze.t_test": lambda: statistical_analyzer.analyze_t_test(paths["stat"]),
+        "plugins.load": load_plugins,
+    }
+    if "csv_parquet" in paths:
+        from parquet_parser_plugin import ColumnarParser
+        cases["parse.parquet"] = lambda: ColumnarParser().parse(paths["csv_parquet"])
+        cases["parse.parquet.stream"] = lambda: consume(ColumnarParser().iter_parse(paths["csv_parquet"]))
+        cases["analyze.anova.parquet"] = lambda: anova_analyzer.analyze_anova(paths["anova_parquet"],
+                                                                              image("anova.png"))
+    return cases
+
+def measure(func, repeat):
+    """repeat 回の実行時間 (ms) と、別途 1 回実行したときの tracemalloc のピーク (bytes) を返す"""
+    func()  # ウォームアップ（import やキャッシュの初期化を計測から外す）
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000.0)
+    # tracemalloc は実行を遅くするため時間計測とは別に 1 回だけ回す
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "min_ms": min(times),
+        "median_ms": statistics.median(times),
+        "max_ms": max(times),
+        "repeat": repeat,
+        "peak_bytes": peak,
+    }
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(scales=DEFAULT_SCALES, repeat=5, only=None):
+    """全ケースを計測し、{"meta": {...}, "results": {"<ケース>@<規模>": {...}}} を返す"""
+    # メモ化が効くと 2 回目以降が計測にならないため、config.json で有効にしていても無効化する
+    configure_analysis_cache(enabled=False)
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    try:
+        for i, scale in enumerate(scales):
+            paths = prepare_inputs(workdir, scale)
+            for name, func in build_cases(paths, workdir).items():
+                if only and not any(name.startswith(prefix) for prefix in only):
+                    continue
+                if name in SCALE_INDEPENDENT:
+                    if i > 0:
+                        continue
+                    key = name
+                else:
+                    key = f"{name}@{scale}"
+                result = measure(func, repeat)
+                results[key] = result
+                print(f"{key:<32} median {result['median_ms']:>10.2f} ms  peak {result['peak_bytes'] / 1e6:>8.2f} MB",
+                      file=sys.stderr)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    meta = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "git_revision": _git_revision(),
+        "scales": list(scales),
+        "repeat": repeat,
+    }
+    return {"meta": meta, "results": results}
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD, min_delta_ms=DEFAULT_MIN_DELTA_MS):
+    """
+    中央値を基準と比較し、ケースごとの比率と退行の有無を返す。
+    比率が 1 + threshold を超え、かつ差が min_delta_ms 以上のものを退行とする。
+    """
+    comparison = {}
+    for key, result in current["results"].items():
+        base = baseline.get("results", {}).get(key)
+        if base is None:
+            continue
+        ratio = result["median_ms"] / base["median_ms"] if base["median_ms"] else float("inf")
+        delta = result["median_ms"] - base["median_ms"]
+        comparison[key] = {
+            "baseline_ms": base["median_ms"],
+            "current_ms": result["median_ms"],
+            "ratio": ratio,
+            "memory_ratio": (result["peak_bytes"] / base["peak_bytes"]) if base.get("peak_bytes") else None,
+            "regression": ratio > 1 + threshold and delta >= min_delta_ms,
+        }
+    return comparison
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="パーサー・解析・プラグイン読み込みのベンチマーク")
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)),
+                        help="入力の行数（カンマ区切り）")
+    parser.add_argument("--repeat", type=int, default=5, help="各ケースの計測回数")
+    parser.add_argument("--only", help="このケース名で始まるものだけ計測する（カンマ区切り、例: parse,analyze.anova）")
+    parser.add_argument("--output", help="結果の JSON を書き出すファイル（省略時は標準出力）")
+    parser.add_argument("--baseline", help="比較する基準の JSON（既定: benchmarks/baseline.json があれば使う）")
+    parser.add_argument("--save-baseline", action="store_true", help="結果を基準として保存する")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="退行とみなす遅延の割合")
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS,
+                        help="退行とみなす最小の差 (ms)")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.CRITICAL)
+    scales = [int(s) for s in args.scales.split(",") if s]
+    only = [s for s in args.only.split(",") if s] if args.only else None
+    current = run_benchmarks(scales, args.repeat, only)
+
+    baseline_path = args.baseline or (DEFAULT_BASELINE if os.path.exists(DEFAULT_BASELINE) else None)
+    exit_code = 0
+    if baseline_path and not args.save_baseline:
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        comparison = compare(current, baseline, args.threshold, args.min_delta_ms)
+        current["comparison"] = {"baseline": baseline_path, "cases": comparison}
+        for key, c in comparison.items():
+            mark = "REGRESSION" if c["regression"] else ""
+            print(f"{key:<32} {c['baseline_ms']:>10.2f} -> {c['current_ms']:>10.2f} ms  x{c['ratio']:.2f} {mark}",
+                  file=sys.stderr)
+        if any(c["regression"] for c in comparison.values()):
+            exit_code = 1
+
+    text = json.dumps(current, indent=2, ensure_ascii=False)
+    if args.save_baseline:
+        with open(args.baseline or DEFAULT_BASELINE, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    elif not args.save_baseline:
+        print(text)
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,91 +4,80 @@ import os
 import sys
 import shutil
 import json
+import argparse
 import subprocess
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
-# ログ設定: ファイル (main.log) とコンソールに INFO レベル以上のログを出力
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-file_handler = logging.FileHandler('main.log', mode='a', encoding='utf-8')
-file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(formatter)
-logger.addHandler(console_handler)
+# modules/ の各モジュールは同じディレクトリのモジュールを "from config_manager import ..." の形で import する。
+# "modules.xxx" と素の名前の両方で読み込むと同じモジュールが 2 つでき（ConfigManager のシングルトンも 2 つになる）、
+# main.py からも素の名前で import するため、ここで一度だけ検索パスに加える
+MODULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "modules")
+if MODULES_DIR not in sys.path:
+    sys.path.insert(0, MODULES_DIR)
 
-def full_cleanup():
+def setup_logging():
+    """ログ設定: ファイル (main.log) とコンソールに INFO レベル以上のログを出力"""
+    logger = logging.getLogger()
+    logger.setLevel(logging.INFO)
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    file_handler = logging.FileHandler('main.log', mode='a', encoding='utf-8')
+    file_handler.setFormatter(formatter)
+    logger.addHandler(file_handler)
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+    logger.addHandler(console_handler)
+
+_repo = None
+_policy = None
+
+def get_policy():
+    """対話の代わりに分岐を決めるポリシー（config.json の "workflow" と CLI 引数から読む）"""
+    global _policy
+    if _policy is None:
+        from workflow_policy import load_policy
+        _policy = load_policy()
+    return _policy
+
+def get_repo():
+    """この実行で共有する GitRepo（現在のブランチや status をキャッシュする）"""
+    global _repo
+    if _repo is None:
+        from git_ops import GitRepo
+        _repo = GitRepo(".", deadline=get_policy().deadline)
+    return _repo
+
+# テスト影響キャッシュ（git clean でも残し、変更のないテストを再実行しないようにする）
+TEST_IMPACT_CACHE = ".test_impact_cache.json"
+# modules/ などのスナップショット（git clean でも残す）と保持する世代数
+SNAPSHOT_STORE = ".snapshots"
+SNAPSHOT_KEEP = int(os.environ.get("SNAPSHOT_KEEP", "5"))
+# Gist に最後にアップロードした内容のマニフェスト（git clean でも残し、変更のないファイルを再送しない）
+GIST_MANIFEST = ".gist_manifest.json"
+
+def analysis_cache_dir():
+    """解析結果のキャッシュ（config.json の analysis_cache_dir。git clean でも残し、再実行を速くする）"""
+    from config_manager import get_config
+    return get_config().get_str("analysis_cache_dir", ".analysis_cache")
+
+def full_cleanup(dry_run=False):
     """
     ローカル環境を完全にクリーンアップする関数です。
     ※ tracked な変更は保持します（git reset --hard は実行しません）。
     未追跡ファイル・ディレクトリは削除します。
+    __pycache__ / desktop.ini / バックアップの削除は run_maintenance でファイル移動とまとめて行います。
     """
     logging.shutdown()  # ログファイルのロック解除
     print("【全環境クリーンアップ開始】")
     
     try:
-        subprocess.run(["git", "clean", "-xdf"], check=True, text=True, encoding="utf-8")
-        print("未追跡ファイル・ディレクトリを削除しました。")
+        # dry_run では削除されるものの一覧だけを表示する (-n)
+        get_repo().clean([TEST_IMPACT_CACHE, SNAPSHOT_STORE, GIST_MANIFEST, analysis_cache_dir()], dry_run=dry_run)
+        if not dry_run:
+            print("未追跡ファイル・ディレクトリを削除しました。")
     except Exception as e:
         print(f"git clean に失敗しました: {e}")
     
-    # バックアップフォルダとバックアップファイルの削除
-    for backup_dir in ["modules.bak"]:
-        if os.path.exists(backup_dir):
-            try:
-                shutil.rmtree(backup_dir)
-                print(f"{backup_dir} を削除しました。")
-            except Exception as e:
-                print(f"{backup_dir} の削除に失敗しました: {e}")
-    for backup_file in ["config.json.bak"]:
-        if os.path.exists(backup_file):
-            try:
-                os.remove(backup_file)
-                print(f"{backup_file} を削除しました。")
-            except Exception as e:
-                print(f"{backup_file} の削除に失敗しました: {e}")
-    
-    # __pycache__ の削除
-    for root, dirs, files in os.walk(".", topdown=False):
-        for d in dirs:
-            if d == "__pycache__":
-                path = os.path.join(root, d)
-                try:
-                    shutil.rmtree(path)
-                    print(f"{path} を削除しました。")
-                except Exception as e:
-                    print(f"{path} の削除に失敗しました: {e}")
-    
-    # desktop.ini の削除
-    removed_files = []
-    for root, dirs, files in os.walk(".", topdown=False):
-        for f in files:
-            if f.lower() == "desktop.ini":
-                file_path = os.path.join(root, f)
-                try:
-                    os.remove(file_path)
-                    removed_files.append(file_path)
-                    print(f"削除: {file_path}")
-                except Exception as e:
-                    print(f"{file_path} の削除に失敗しました: {e}")
-    
-    # Gitインデックスから、トラッキング中の desktop.ini を除外
-    if removed_files:
-        tracked_files = []
-        for file in removed_files:
-            result = subprocess.run(["git", "ls-files", "--error-unmatch", file],
-                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
-                                      text=True, encoding="utf-8")
-            if result.returncode == 0:
-                tracked_files.append(file)
-        if tracked_files:
-            try:
-                subprocess.run(["git", "rm", "--cached", "-f"] + tracked_files, check=True, text=True, encoding="utf-8")
-                print("Gitインデックスから desktop.ini ファイルを除外しました。")
-            except Exception as e:
-                print(f"Gitインデックスからの desktop.ini 除外に失敗: {e}")
-    
     # .gitignore の更新（desktop.ini は既に追加済み）
     gitignore_path = ".gitignore"
     try:
@@ -97,7 +86,7 @@ def full_cleanup():
                 lines = f.read().splitlines()
         else:
             lines = []
-        if "desktop.ini" not in [line.strip() for line in lines]:
+        if "desktop.ini" not in [line.strip() for line in lines] and not dry_run:
             with open(gitignore_path, "a", encoding="utf-8") as f:
                 f.write("\ndesktop.ini\n")
             print("'.gitignore' に 'desktop.ini' を追加しました。")
@@ -106,6 +95,20 @@ def full_cleanup():
     
     print("【全環境クリーンアップ終了】")
 
+def run_maintenance(groups=None, dry_run=False):
+    """
+    バックアップ・__pycache__・desktop.ini の削除と、test/・modules/ へのファイル移動を、
+    ツリーの 1 回の走査で計画してまとめて実行する。dry_run なら計画を表示するだけ。
+    modules/ への移動に失敗した場合は False を返す。
+    """
+    from fs_maintenance import plan_maintenance, execute_plan, ALL_GROUPS, MOVE_MODULES
+    groups = groups or ALL_GROUPS
+    plan = plan_maintenance(".", groups)
+    if MOVE_MODULES in groups and not dry_run:
+        ensure_init_file()
+    failed = execute_plan(plan, dry_run=dry_run)
+    return not any(action.group == MOVE_MODULES for action in failed)
+
 def update_gitignore_python_entries():
     """
     Pythonの一時ファイルやディレクトリを自動で .gitignore に追加する。
@@ -153,42 +156,8 @@ def move_test_files():
     ファイル名に 'test' が含まれる .py ファイルは、
     直下、modules、modules.bak から問答無用で test/ フォルダへ移動する。
     """
-    test_dir = "test"
-    if not os.path.exists(test_dir):
-        os.makedirs(test_dir)
-        print("test/ フォルダを作成しました。")
-    # 直下の test ファイル
-    for filename in os.listdir("."):
-        if filename.endswith(".py") and "test" in filename.lower() and filename not in ("main.py", "config.json"):
-            src = filename
-            dst = os.path.join(test_dir, filename)
-            try:
-                shutil.move(src, dst)
-                print(f"{filename} を {dst} に移動しました。")
-            except Exception as e:
-                print(f"{filename} の移動中にエラーが発生しました: {e}")
-    # modules 内の test ファイル
-    if os.path.exists("modules"):
-        for filename in os.listdir("modules"):
-            if filename.endswith(".py") and "test" in filename.lower():
-                src = os.path.join("modules", filename)
-                dst = os.path.join(test_dir, filename)
-                try:
-                    shutil.move(src, dst)
-                    print(f"{filename} を {dst} に移動しました。")
-                except Exception as e:
-                    print(f"{filename} の移動中にエラーが発生しました: {e}")
-    # modules.bak 内の test ファイル
-    if os.path.exists("modules.bak"):
-        for filename in os.listdir("modules.bak"):
-            if filename.endswith(".py") and "test" in filename.lower():
-                src = os.path.join("modules.bak", filename)
-                dst = os.path.join(test_dir, filename)
-                try:
-                    shutil.move(src, dst)
-                    print(f"{filename} を {dst} に移動しました。")
-                except Exception as e:
-                    print(f"{filename} の移動中にエラーが発生しました: {e}")
+    from fs_maintenance import MOVE_TESTS
+    run_maintenance((MOVE_TESTS,))
 
 def ensure_init_file():
     """
@@ -203,47 +172,39 @@ def ensure_init_file():
         except Exception as e:
             print(f"modules/__init__.py の作成に失敗しました: {e}")
 
+def snapshot_paths():
+    """スナップショットの対象: modules/, test/, config.json と直下の .py（移動されうるファイル）"""
+    top_level = sorted(f for f in os.listdir(".") if f.endswith(".py") and os.path.isfile(f))
+    return ["modules", "test", "config.json"] + top_level
+
+def take_backup():
+    """
+    modules/ などのスナップショットを .snapshots/ に作る。前の世代と同じ内容のファイルは
+    ハードリンクで共有するため、コストは変更のあったファイルの量に比例する。
+    """
+    from snapshots import take_snapshot
+    try:
+        generation, stats = take_snapshot(snapshot_paths(), store=SNAPSHOT_STORE, keep=SNAPSHOT_KEEP)
+        print(f"スナップショット {generation} を作成しました（コピー {stats['copied']} 件、共有 {stats['linked']} 件）。")
+        return True
+    except Exception as e:
+        print(f"スナップショットの作成に失敗しました: {e}")
+        return False
+
 def ensure_folder_consistency():
     """
     modules フォルダのバックアップ、重複整理、設定修正を実施する。
     """
-    backup_success = True
-    if os.path.exists("modules"):
-        if os.path.exists("modules.bak"):
-            try:
-                shutil.rmtree("modules.bak")
-                print("古いバックアップ modules.bak/ を削除しました。")
-            except Exception as e:
-                print(f"古い modules.bak/ の削除に失敗しました: {e}")
-        try:
-            shutil.copytree("modules", "modules.bak")
-            print("modules/ を modules.bak/ にバックアップしました。")
-        except Exception as e:
-            print(f"modules/ のバックアップに失敗しました: {e}")
-            backup_success = False
-    else:
+    if not os.path.exists("modules"):
         print("modules/ ディレクトリが存在しません。")
-    if not backup_success:
+        return True
+    py_files = [f for f in os.listdir("modules") if f.endswith(".py")]
+    if len(py_files) == 0:
+        # 空の modules/ をスナップショットにすると復元元がなくなるため、先に直前の世代から戻す
+        print("modules/ に .py ファイルが見つかりません。スナップショットから modules/ を復元します。")
+        restore_modules_and_config(sources=["modules"])
+    elif not take_backup():
         return False
-
-    if os.path.exists("modules"):
-        py_files = [f for f in os.listdir("modules") if f.endswith(".py")]
-        if len(py_files) == 0:
-            if os.path.exists("modules.bak"):
-                print("modules/ に .py ファイルが見つかりません。バックアップから復元します。")
-                try:
-                    shutil.rmtree("modules")
-                except Exception as e:
-                    print(f"modules/ の削除に失敗しました: {e}")
-                try:
-                    shutil.copytree("modules.bak", "modules")
-                    print("バックアップから modules/ を復元しました。")
-                except Exception as e:
-                    print(f"modules/ の復元に失敗しました: {e}")
-            else:
-                print("modules/ が空で、バックアップも存在しません。")
-    else:
-        print("modules/ ディレクトリが存在しません。")
     if os.path.exists("modules"):
         ensure_init_file()
     return True
@@ -252,26 +213,8 @@ def move_py_files():
     """
     main.py と config.json 以外の .py ファイル（"test" を含まないもの）を modules/ に移動する。
     """
-    modules_dir = "modules"
-    if not os.path.exists(modules_dir):
-        os.makedirs(modules_dir, exist_ok=True)
-        print(f"{modules_dir}/ を作成しました。")
-    ensure_init_file()
-    for filename in os.listdir("."):
-        if (filename.endswith(".py") and filename not in ("main.py", "config.json")
-            and "test" not in filename.lower()):
-            src = filename
-            dst = os.path.join(modules_dir, filename)
-            try:
-                if os.path.exists(dst):
-                    print(f"{dst} が既に存在します。{filename} の移動をスキップします。")
-                else:
-                    shutil.move(src, dst)
-                    print(f"{filename} を {dst} に移動しました。")
-            except Exception as e:
-                print(f"{filename} の移動中にエラーが発生しました: {e}")
-                return False
-    return True
+    from fs_maintenance import MOVE_MODULES
+    return run_maintenance((MOVE_MODULES,))
 
 def update_config():
     """
@@ -296,19 +239,25 @@ def update_config():
         print("config.json が存在しないため、スキップします。")
     return True
 
-def run_tests():
+def run_tests(full=None, timeout=None):
     """
-    test/ フォルダ内から unittest を探索して実行する。
+    test/ フォルダ内の test_*.py を pytest で実行する。
+    前回成功したテストのうち、import で辿れる依存ファイルが変わっていないものは再実行しない
+    （.test_impact_cache.json）。pytest-xdist があればテストファイル単位で並列に実行する。
+    full=True または環境変数 FULL_TESTS=1 で全件を実行する。timeout 秒を超えたら失敗とする。
     """
+    if full is None:
+        full = os.environ.get("FULL_TESTS", "").lower() in ("1", "true", "yes")
     try:
-        result = subprocess.run(
-            [sys.executable, "-m", "unittest", "discover", "-s", "test", "-p", "*.py"],
-            capture_output=True, text=True, encoding="utf-8"
-        )
-        if result.returncode != 0:
-            print(f"ユニットテスト失敗:\n{result.stdout}\n{result.stderr}")
+        from change_impact import run_impacted_tests
+        report = run_impacted_tests(cache_file=TEST_IMPACT_CACHE, full=full, timeout=timeout)
+        if not report["selected"]:
+            print(f"変更の影響を受けるテストはありません（{len(report['skipped'])} 件をスキップ）。")
+            return True
+        if not report["ok"]:
+            print(f"ユニットテスト失敗 ({', '.join(report['failed'])}):\n{report['output']}")
             return False
-        print("ユニットテスト成功。")
+        print(f"ユニットテスト成功（{len(report['selected'])} 件を実行、{len(report['skipped'])} 件は変更なしのためスキップ）。")
         return True
     except Exception as e:
         print(f"ユニットテスト実行中に例外が発生しました: {e}")
@@ -316,39 +265,46 @@ def run_tests():
 
 def resolve_merge_conflicts():
     """
-    Git merge コンフリクトが発生している場合、ユーザーに確認して old ブランチ側（ours）の内容を採用する。
+    Git merge コンフリクトが発生している場合、ポリシー（on_conflict）に従い、ask ならユーザーに確認して
+    old ブランチ側（ours）の内容を採用する。コンフリクトが残らなければ True を返す。
+    コンフリクトしたファイルは git checkout --ours / git add をそれぞれ 1 回でまとめて処理する。
+    非対話モードで採用しない場合は git merge --abort で作業コピーをマージ前に戻す。
     """
+    repo = get_repo()
+    policy = get_policy()
     try:
-        result = subprocess.run(["git", "diff", "--name-only", "--diff-filter=U"],
-                                capture_output=True, text=True, encoding="utf-8", check=True)
-        conflicted_files = result.stdout.splitlines()
+        conflicted_files = repo.conflicted_files()
     except Exception as e:
         print(f"merge コンフリクトの確認に失敗しました: {e}")
-        return
+        return False
 
     if conflicted_files:
         print("以下のファイルでマージコンフリクトが発生しています:")
         for f in conflicted_files:
             print(f"  {f}")
-        answer = input("oldブランチのこみっとOKです。テストも成功しました。対象ブランチの内容でマージしますか? (y/n): ")
-        if answer.lower() == 'y':
-            for f in conflicted_files:
-                try:
-                    subprocess.run(["git", "checkout", "--ours", f], check=True, text=True, encoding="utf-8")
-                    print(f"{f} のコンフリクトを 'ours' で解決しました。")
-                except Exception as e:
-                    print(f"{f} のコンフリクト解決に失敗しました: {e}")
+        action = policy.choose(
+            "on_conflict",
+            "oldブランチのこみっとOKです。テストも成功しました。対象ブランチの内容でマージしますか? (y/n): ",
+            {"y": "ours", "n": "abort"})
+        if action == "ours":
             try:
-                subprocess.run(["git", "add"] + conflicted_files, check=True, text=True, encoding="utf-8")
-                subprocess.run(["git", "commit", "-m", "自動マージ解決: oldブランチの内容を採用"], check=True, text=True, encoding="utf-8")
-                print("マージコンフリクトを解決し、コミットしました。")
+                repo.resolve_ours("自動マージ解決: oldブランチの内容を採用")
+                print(f"{len(conflicted_files)} 件のコンフリクトを 'ours' で解決し、コミットしました。")
+                return True
             except Exception as e:
-                print(f"マージコンフリクトのコミットに失敗しました: {e}")
-        else:
+                print(f"マージコンフリクトの解決に失敗しました: {e}")
+                return False
+        if policy.interactive:
             print("マージ解決がキャンセルされました。手動で解決してください。")
-            return
-    else:
-        print("マージコンフリクトはありません。")
+        else:
+            try:
+                repo.merge_abort()
+                print("マージ解決を行わないポリシーのため、マージを中止しました。")
+            except Exception as e:
+                print(f"マージの中止に失敗しました: {e}")
+        return False
+    print("マージコンフリクトはありません。")
+    return True
 
 def auto_commit_and_push():
     """
@@ -364,21 +320,15 @@ def auto_commit_and_push():
         except Exception as e:
             print(f"index.lock の削除に失敗しました: {e}")
             return False
+    repo = get_repo()
     try:
-        # 全変更をステージする（main.py の変更も含む）
-        subprocess.run(["git", "add", "-A"], check=True, text=True, encoding="utf-8")
-        result_commit = subprocess.run(
-            ["git", "commit", "-m", "自動コミット by main.py"],
-            check=False, capture_output=True, text=True, encoding="utf-8", errors="replace"
-        )
-        stdout_lower = (result_commit.stdout or "").lower()
-        stderr_lower = (result_commit.stderr or "").lower()
-        if "nothing to commit" in stdout_lower or "nothing to commit" in stderr_lower:
-            print("変更はありません。自動コミットはスキップします。")
-        else:
+        # 全変更をステージしてコミットする（main.py の変更も含む）
+        if repo.commit_all("自動コミット by main.py"):
             print("自動コミット完了。")
+        else:
+            print("変更はありません。自動コミットはスキップします。")
         try:
-            subprocess.run(["git", "push"], check=True, text=True, encoding="utf-8")
+            repo.push()
             print("自動コミットとプッシュが完了しました。")
             return True
         except subprocess.CalledProcessError as e:
@@ -390,19 +340,22 @@ def auto_commit_and_push():
                     print("現在のブランチの取得に失敗しました。")
                     return False
                 print("アップストリームブランチ名の不一致が検出されました。")
-                print("以下のオプションから選択してください:")
-                print(f"1: 'git push origin HEAD:{current_branch}' を実行する")
-                print("2: 'git push origin HEAD' を実行する (ローカルと同名のリモートブランチにプッシュ)")
-                choice = input("番号を入力してください (1 または 2): ").strip()
-                if choice == "1":
-                    push_cmd = ["git", "push", "origin", f"HEAD:{current_branch}"]
-                elif choice == "2":
-                    push_cmd = ["git", "push", "origin", "HEAD"]
+                policy = get_policy()
+                if policy.will_prompt("push_fallback"):
+                    print("以下のオプションから選択してください:")
+                    print(f"1: 'git push origin HEAD:{current_branch}' を実行する")
+                    print("2: 'git push origin HEAD' を実行する (ローカルと同名のリモートブランチにプッシュ)")
+                choice = policy.choose("push_fallback", "番号を入力してください (1 または 2): ",
+                                       {"1": "branch", "2": "head"})
+                if choice == "branch":
+                    refspec = ["origin", f"HEAD:{current_branch}"]
+                elif choice == "head":
+                    refspec = ["origin", "HEAD"]
                 else:
-                    print("無効な入力です。push をキャンセルします。")
+                    print("push をキャンセルします。")
                     return False
                 try:
-                    subprocess.run(push_cmd, check=True, text=True, encoding="utf-8")
+                    repo.push(*refspec)
                     print("選択した push コマンドが成功しました。")
                     return True
                 except subprocess.CalledProcessError as e2:
@@ -424,25 +377,22 @@ def choose_merge_option(current_branch, target_branch):
       3: リモートの同名ブランチを更新する
       4: リモートの main ブランチにマージする
     キャンセル（空入力）の場合は None を返します。
+    ポリシー（merge_option）が ask 以外なら尋ねずにそのオプションを選びます。
     """
-    print("マージオプションを選択してください:")
-    print("1: ローカルの一時ブランチに移行する")
-    print("2: ローカルの main ブランチにマージする")
-    print("3: リモートの同名ブランチを更新する")
-    print("4: リモートの main ブランチにマージする")
-    option = input("番号を入力してください (1-4、またはキャンセルなら Enter): ").strip()
-    if option == "":
+    from workflow_policy import MERGE_OPTION_NUMBERS
+    policy = get_policy()
+    if policy.will_prompt("merge_option"):
+        print("マージオプションを選択してください:")
+        print("1: ローカルの一時ブランチに移行する")
+        print("2: ローカルの main ブランチにマージする")
+        print("3: リモートの同名ブランチを更新する")
+        print("4: リモートの main ブランチにマージする")
+    answers = {str(number): name for name, number in MERGE_OPTION_NUMBERS.items()}
+    option = policy.choose("merge_option", "番号を入力してください (1-4、またはキャンセルなら Enter): ", answers)
+    if option == "skip":
         print("マージがキャンセルされました。")
         return None
-    try:
-        option = int(option)
-    except ValueError:
-        print("無効な入力です。")
-        return None
-    if option not in [1, 2, 3, 4]:
-        print("無効な選択です。")
-        return None
-    return option
+    return MERGE_OPTION_NUMBERS[option]
 
 def merge_into_target():
     """
@@ -452,9 +402,9 @@ def merge_into_target():
     ユーザーがキャンセルした場合はエラー終了せずにスキップします。
     """
     target_branch = os.environ.get("TARGET_BRANCH", "main")
+    repo = get_repo()
     try:
-        current_branch = subprocess.check_output(["git", "rev-parse", "--abbrev-ref", "HEAD"],
-                                                   text=True, encoding="utf-8").strip()
+        current_branch = repo.current_branch()
     except Exception as e:
         print("現在のブランチ名の取得に失敗しました:", e)
         return False
@@ -471,9 +421,9 @@ def merge_into_target():
         # ローカルの一時ブランチに移行する（ブランチ名を temp_ + 現在のブランチ に変更）
         try:
             new_branch = "temp_" + current_branch
-            subprocess.run(["git", "branch", "-m", new_branch], check=True, text=True, encoding="utf-8")
+            repo.rename_branch(new_branch)
             print(f"ブランチ名を {new_branch} に変更しました。")
-            subprocess.run(["git", "push", "origin", new_branch], check=True, text=True, encoding="utf-8")
+            repo.push("origin", new_branch)
             print(f"リモートに {new_branch} をプッシュしました。")
         except Exception as e:
             print("一時ブランチへの移行に失敗しました:", e)
@@ -482,17 +432,17 @@ def merge_into_target():
     elif option == 2:
         # ローカルの main ブランチにマージする
         try:
-            subprocess.run(["git", "checkout", target_branch], check=True, text=True, encoding="utf-8")
-            subprocess.run(["git", "merge", current_branch], check=True, text=True, encoding="utf-8")
-            subprocess.run(["git", "push"], check=True, text=True, encoding="utf-8")
+            repo.checkout(target_branch)
+            repo.merge(current_branch)
+            repo.push()
             print(f"{target_branch} にマージし、プッシュしました。")
         except Exception as e:
             print(f"{target_branch} へのローカルマージに失敗しました:", e)
             return False
         try:
             # マージが完了したら、不要になったブランチは削除
-            subprocess.run(["git", "branch", "-d", current_branch], check=True, text=True, encoding="utf-8")
-            subprocess.run(["git", "push", "origin", "--delete", current_branch, "--force"], check=True, text=True, encoding="utf-8")
+            repo.delete_branch(current_branch)
+            repo.push("origin", "--delete", current_branch, "--force")
             print(f"ブランチ {current_branch} をローカルおよびリモートから削除しました。")
         except Exception as e:
             print(f"ブランチ {current_branch} の削除に失敗しました: {e}")
@@ -500,7 +450,7 @@ def merge_into_target():
     elif option == 3:
         # リモートの同名ブランチを更新する（現在のブランチをそのままリモートにプッシュ）
         try:
-            subprocess.run(["git", "push", "origin", current_branch], check=True, text=True, encoding="utf-8")
+            repo.push("origin", current_branch)
             print(f"リモートの {current_branch} ブランチを更新しました。")
         except Exception as e:
             print("リモートブランチの更新に失敗しました:", e)
@@ -509,144 +459,243 @@ def merge_into_target():
     elif option == 4:
         # リモートの main ブランチにマージする
         try:
-            subprocess.run(["git", "checkout", target_branch], check=True, text=True, encoding="utf-8")
-            subprocess.run(["git", "merge", current_branch], check=True, text=True, encoding="utf-8")
-            subprocess.run(["git", "push"], check=True, text=True, encoding="utf-8")
+            repo.checkout(target_branch)
+            repo.merge(current_branch)
+            repo.push()
             print(f"リモートの {target_branch} にマージし、プッシュしました。")
         except Exception as e:
             print(f"{target_branch} へのリモートマージに失敗しました:", e)
             return False
         try:
             # マージ後、不要な一時ブランチはローカルおよびリモートから削除
-            subprocess.run(["git", "branch", "-d", current_branch], check=True, text=True, encoding="utf-8")
-            subprocess.run(["git", "push", "origin", "--delete", current_branch, "--force"], check=True, text=True, encoding="utf-8")
+            repo.delete_branch(current_branch)
+            repo.push("origin", "--delete", current_branch, "--force")
             print(f"ブランチ {current_branch} をローカルおよびリモートから削除しました。")
         except Exception as e:
             print(f"ブランチ {current_branch} の削除に失敗しました: {e}")
 
     return True
 
-def restore_modules_and_config():
+def backup_config():
+    """config.json を config.json.bak にコピーする"""
+    if not os.path.exists("config.json"):
+        print("config.json が存在しないため、バックアップは不要です。")
+        return True
+    try:
+        shutil.copy2("config.json", "config.json.bak")
+        print("config.json のバックアップを作成しました。")
+        return True
+    except Exception as e:
+        print(f"config.json のバックアップに失敗しました: {e}")
+        return False
+
+def restore_modules_and_config(sources=None):
     """
-    modules/ および config.json をバックアップから復元する。
+    snapshot_paths() のパス（modules/, test/, config.json と直下の .py）を最新のスナップショットから復元する。
+    sources を渡すと、そのソース（例: ["modules"]）だけを復元し、他の作業中の変更には触れない。
+    ディレクトリは組み立て直したものと入れ替えるため、途中で失敗しても中途半端な状態にならない。
     """
-    if os.path.exists("modules.bak"):
-        try:
-            if os.path.exists("modules"):
-                shutil.rmtree("modules")
-            shutil.copytree("modules.bak", "modules")
-            print("バックアップから modules/ を復元しました。")
-        except Exception as e:
-            print(f"modules/ の復元に失敗しました: {e}")
-    else:
-        print("modules.bak/ が存在しないため modules/ を復元できません。")
-    if os.path.exists("config.json.bak"):
-        try:
-            shutil.copy2("config.json.bak", "config.json")
-            print("バックアップから config.json を復元しました。")
-        except Exception as e:
-            print(f"config.json の復元に失敗しました: {e}")
+    from snapshots import restore_snapshot
+    target = "、".join(sources or snapshot_paths())
+    try:
+        stats = restore_snapshot(store=SNAPSHOT_STORE, sources=sources)
+    except Exception as e:
+        print(f"スナップショットからの復元に失敗しました: {e}")
+        return
+    if stats is None:
+        print(f"スナップショットが存在しないため {target} を復元できません。")
     else:
-        if os.path.exists("config.json"):
-            print("config.json.bak が存在しないため config.json を復元できません。")
-        else:
-            print("config.json が元々存在しないため、復元は不要です。")
+        print(f"スナップショットから {target} を復元しました（コピー {stats['copied']} 件）。")
 
 def show_git_status():
-    """現在の Git の状態を表示する"""
+    """現在の Git の状態を表示する（git status --porcelain=v2 の結果を整形する）"""
     try:
-        result = subprocess.run(["git", "status"], capture_output=True, text=True, encoding="utf-8", check=True)
         print("=== git status ===")
-        print(result.stdout)
+        print(get_repo().format_status())
     except Exception as e:
         print(f"git status の表示に失敗しました: {e}")
 
 def get_current_branch():
     try:
-        result = subprocess.run(
-            ["git", "symbolic-ref", "--short", "HEAD"],
-            capture_output=True, text=True, encoding="utf-8", check=True
-        )
-        return result.stdout.strip()
+        return get_repo().current_branch()
     except Exception as e:
         print(f"現在のブランチの取得に失敗しました: {e}")
         return None
 
-if __name__ == "__main__":
-    print("===== main.py 開始 =====")
+def _run_step(report, name, func, *args, **kwargs):
+    """ステップを実行して結果をレポートに記録する（False を返したら失敗）"""
+    report.start_step(name)
+    result = func(*args, **kwargs)
+    report.end_step("failed" if result is False else "ok")
+    return result
+
+def run_workflow(report, dry_run=False):
+    """main.py のワークフロー本体。終了コードを返す"""
+    policy = get_policy()
     
     # 1. 全環境クリーンアップ（作業ディレクトリの変更はそのまま）
-    full_cleanup()
+    _run_step(report, "cleanup", full_cleanup, dry_run)
+    if dry_run:
+        # --dry-run: クリーンアップとファイル移動の計画を表示して終了する（何も変更しない）
+        _run_step(report, "maintenance", run_maintenance, dry_run=True)
+        print("===== main.py 終了 (dry-run) =====")
+        return 0
     
     # 2. Python 一時ファイルのエントリを .gitignore に追加
-    update_gitignore_python_entries()
+    _run_step(report, "gitignore", update_gitignore_python_entries)
     
     # 3. テストファイルの import 文自動修正
-    fix_test_imports()
+    _run_step(report, "fix_test_imports", fix_test_imports)
     
-    # 4. 'test' が名前に含まれる .py ファイルを test/ フォルダへ移動
-    move_test_files()
+    # 4. ファイル移動・設定更新の前にスナップショットを作成（失敗時はここへロールバックする）
+    if not _run_step(report, "snapshot", take_backup):
+        print("バックアップに失敗したため処理を中断します。")
+        print("===== main.py 終了 (バックアップ失敗) =====")
+        return 1
     
-    # 5. main.py と config.json 以外の .py ファイルを modules/ に移動する
-    if not move_py_files():
+    # 5. バックアップ・__pycache__・desktop.ini の削除、'test' が名前に含まれる .py ファイルの
+    #    test/ への移動、main.py と config.json 以外の .py ファイルの modules/ への移動を
+    #    ツリーの 1 回の走査でまとめて行う
+    if not _run_step(report, "maintenance", run_maintenance):
         print("ファイル移動中にエラーが発生しました。ロールバックを実行します。")
         restore_modules_and_config()
         print("===== main.py 終了 (ロールバック実行) =====")
-        sys.exit(1)
+        return 1
     
-    # 6. config.json のバックアップ作成
-    if os.path.exists("config.json"):
-        try:
-            shutil.copy2("config.json", "config.json.bak")
-            print("config.json のバックアップを作成しました。")
-        except Exception as e:
-            print(f"config.json のバックアップに失敗しました: {e}")
-            print("設定ファイルのバックアップに失敗したため処理を中断します。")
-            print("===== main.py 終了 (バックアップ失敗) =====")
-            sys.exit(1)
-    else:
-        print("config.json が存在しないため、バックアップは不要です。")
+    # 6. config.json のバックアップ作成（5 で削除した config.json.bak を作り直す。リポジトリで管理している）
+    if not _run_step(report, "backup_config", backup_config):
+        print("設定ファイルのバックアップに失敗したため処理を中断します。")
+        print("===== main.py 終了 (バックアップ失敗) =====")
+        return 1
     
     # 7. config.json の自動更新（Gist依存の設定を削除）
-    if not update_config():
+    if not _run_step(report, "update_config", update_config):
         print("config.json の更新に失敗しました。")
-        sys.exit(1)
+        return 1
     
     # 8. test/ フォルダ内からユニットテストを実行
-    if not run_tests():
+    if not _run_step(report, "tests", run_tests, timeout=policy.remaining()):
         print("ユニットテストに失敗したため、変更を元に戻します。")
         restore_modules_and_config()
         print("===== main.py 終了 (ロールバック実行) =====")
-        sys.exit(1)
+        return 1
     
     # 9. 自動コミット＆プッシュ（main.py の変更も含む）
-    if not auto_commit_and_push():
+    if not _run_step(report, "commit_push", auto_commit_and_push):
         print("自動コミット/プッシュに失敗しました。")
-        sys.exit(1)
+        return 1
     
     # 10. 現在のブランチがターゲットブランチ（TARGET_BRANCH, デフォルトは "main"）でない場合、
-    #     リモートのターゲットブランチとマージを試み、必ずユーザーに合流確認のメッセージを表示
+    #     リモートのターゲットブランチとマージを試み、コンフリクトはポリシーに従って解決する
     current_branch = get_current_branch()
     target_branch = os.environ.get("TARGET_BRANCH", "main")
     if current_branch != target_branch:
+        report.start_step("pull_target")
         try:
-            subprocess.run(["git", "pull", "origin", target_branch], check=True, text=True, encoding="utf-8")
+            get_repo().pull("origin", target_branch)
             print(f"リモートの {target_branch} ブランチをマージしました。")
+            report.end_step("ok")
         except subprocess.CalledProcessError as e:
             print(f"git pull でマージコンフリクトが発生しました: {e}")
-            resolve_merge_conflicts()
-            if not auto_commit_and_push():
+            report.end_step("conflict")
+            if not _run_step(report, "resolve_conflicts", resolve_merge_conflicts):
+                print("マージコンフリクトが解決されていないため処理を中断します。")
+                return 1
+            if not _run_step(report, "commit_push_merge", auto_commit_and_push):
                 print("自動コミット/プッシュに失敗しました。")
-                sys.exit(1)
+                return 1
     else:
         print(f"現在のブランチは {target_branch} です。")
     
     # 11. merge_into_target() を実行（現在のブランチがターゲットブランチでない場合のみ）
     if current_branch != target_branch:
-        if not merge_into_target():
+        if not _run_step(report, "merge_into_target", merge_into_target):
             print("ブランチのマージ/移行処理がキャンセルまたは失敗しました。")
             # エラー終了せずにスキップします。
     # 12. git status の結果を表示
-    show_git_status()
+    _run_step(report, "status", show_git_status)
     
     print("===== main.py 終了 =====")
+    return 0
+
+def parse_args(argv=None):
+    from workflow_policy import POLICY_SCHEMA
+    parser = argparse.ArgumentParser(description="リポジトリの整理・テスト・コミット/プッシュ・マージを行う")
+    parser.add_argument("--dry-run", action="store_true", help="クリーンアップとファイル移動の計画を表示して終了する")
+    parser.add_argument("--non-interactive", action="store_true",
+                        help="入力を求めない（ポリシーが ask の分岐は安全側の既定値を選ぶ）")
+    parser.add_argument("--push-fallback", choices=POLICY_SCHEMA["push_fallback"][0],
+                        help="upstream 不一致時の push 先 (branch: HEAD:<ブランチ>, head: HEAD, abort: 中止)")
+    parser.add_argument("--on-conflict", choices=POLICY_SCHEMA["on_conflict"][0],
+                        help="マージコンフリクト時の処理 (ours: old ブランチ側を採用, abort: マージを中止)")
+    parser.add_argument("--merge-option", choices=POLICY_SCHEMA["merge_option"][0],
+                        help="ターゲットブランチへの合流方法")
+    parser.add_argument("--time-budget", type=float, help="ワークフロー全体の制限時間（秒）")
+    parser.add_argument("--report", help="実行レポート (JSON) の出力先（作業コピーからの相対パス可）")
+    parser.add_argument("--workdir", action="append",
+                        help="この作業コピーで実行する（複数指定すると別プロセスで並列に実行する）")
+    parser.add_argument("--jobs", type=int, help="--workdir を複数指定したときの同時実行数（既定: 作業コピー数）")
+    return parser.parse_args(argv)
+
+def _child_args(args):
+    """並列実行する各作業コピー用の引数（--workdir / --jobs 以外を引き継ぎ、必ず非対話にする）"""
+    child = ["--non-interactive"]
+    if args.dry_run:
+        child.append("--dry-run")
+    for flag, value in (("--push-fallback", args.push_fallback), ("--on-conflict", args.on_conflict),
+                        ("--merge-option", args.merge_option), ("--time-budget", args.time_budget),
+                        ("--report", args.report)):
+        if value is not None:
+            child += [flag, str(value)]
+    return child
+
+def run_parallel(args):
+    """作業コピーごとに main.py を別プロセスで実行し、最大の終了コードを返す"""
+    script = os.path.abspath(__file__)
+    child_args = _child_args(args)
+
+    def run_one(workdir):
+        result = subprocess.run([sys.executable, script, "--workdir", workdir] + child_args,
+                                capture_output=True, text=True, encoding="utf-8", errors="replace")
+        return workdir, result
+
+    exit_code = 0
+    with ThreadPoolExecutor(max_workers=args.jobs or len(args.workdir)) as executor:
+        for workdir, result in executor.map(run_one, args.workdir):
+            print(f"===== {workdir}: 終了コード {result.returncode} =====")
+            print(result.stdout + result.stderr)
+            exit_code = max(exit_code, result.returncode)
+    return exit_code
+
+def main(argv=None):
+    global _policy, _repo
+    args = parse_args(argv)
+    if args.workdir and len(args.workdir) > 1:
+        return run_parallel(args)
+    if args.workdir:
+        os.chdir(args.workdir[0])
+    setup_logging()
+    from workflow_policy import load_policy, RunReport, BudgetExceeded
+    overrides = {"push_fallback": args.push_fallback, "on_conflict": args.on_conflict,
+                 "merge_option": args.merge_option}
+    _policy = load_policy(overrides=overrides, interactive=False if args.non_interactive else None,
+                          time_budget=args.time_budget, report_path=args.report)
+    _repo = None
+    report = RunReport(_policy)
+    print("===== main.py 開始 =====")
+    status, error = None, None
+    try:
+        exit_code = run_workflow(report, args.dry_run)
+    except (BudgetExceeded, subprocess.TimeoutExpired) as e:
+        print(f"制限時間を超えたため処理を中断します: {e}")
+        exit_code, status, error = 3, "timeout", str(e)
+    if status is None and exit_code != 0 and _policy.remaining() == 0:
+        status = "timeout"  # 各ステップ内で打ち切られ、失敗として返ってきた場合
+    try:
+        report.finish(exit_code, status, error)
+    except OSError as e:
+        print(f"実行レポートの書き出しに失敗しました: {e}")
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,298 @@
+import os
+import copy
+import json
+import shutil
+import hashlib
+import inspect
+import logging
+import threading
+import functools
+from collections import OrderedDict
+from result_store import fingerprint_file, make_params_key, save_to_result_store
+from config_manager import get_config
+
+# キャッシュ形式を変えたら上げる（古いエントリは別キーになり自然に追い出される）
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = ".analysis_cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 128
+
+class LRUCache:
+    """件数上限付きのメモリキャッシュ（スレッドセーフ）"""
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+class DiskCache:
+    """
+    cache_dir/<key の先頭2文字>/<key>/ に結果 (result.json) と成果物（グラフ画像など）を保存するキャッシュ。
+    合計サイズが max_bytes を超えたら、最後に参照された時刻が古いエントリから削除する。
+    """
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._sizes = None  # エントリのパス -> バイト数（初回アクセス時にディレクトリを走査して作る）
+        self._lock = threading.Lock()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key):
+        """(result, [成果物ファイルのパス, ...]) を返す。なければ None"""
+        entry = self._entry_dir(key)
+        meta_path = os.path.join(entry, "result.json")
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            os.utime(meta_path)  # 参照時刻を更新（追い出し順に使う）
+        except (OSError, ValueError):
+            return None
+        files = [os.path.join(entry, name) for name in meta["artifacts"]]
+        if not all(os.path.exists(p) for p in files):
+            return None
+        return meta["result"], files
+
+    def put(self, key, result, artifacts):
+        """結果と成果物（ファイルパスのリスト）を保存する。保存できなければ False"""
+        entry = self._entry_dir(key)
+        tmp = f"{entry}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            os.makedirs(tmp, exist_ok=True)
+            names = []
+            for i, path in enumerate(artifacts):
+                name = f"artifact_{i}{os.path.splitext(path)[1]}"
+                shutil.copyfile(path, os.path.join(tmp, name))
+                names.append(name)
+            with open(os.path.join(tmp, "result.json"), "w", encoding="utf-8") as f:
+                json.dump({"result": result, "artifacts": names}, f, ensure_ascii=False)
+            if os.path.exists(entry):
+                shutil.rmtree(entry, ignore_errors=True)
+            os.replace(tmp, entry)
+        except (OSError, TypeError, ValueError) as e:
+            logging.warning(f"Failed to write analysis cache entry {key}: {e}")
+            shutil.rmtree(tmp, ignore_errors=True)
+            return False
+        size = _dir_size(entry)
+        with self._lock:
+            sizes = self._load_sizes()
+            sizes[entry] = size
+            self._evict(sizes)
+        return True
+
+    def _load_sizes(self):
+        if self._sizes is None:
+            self._sizes = {}
+            if os.path.isdir(self.cache_dir):
+                for prefix in os.scandir(self.cache_dir):
+                    if not prefix.is_dir():
+                        continue
+                    for entry in os.scandir(prefix.path):
+                        if entry.is_dir() and ".tmp-" not in entry.name:
+                            self._sizes[entry.path] = _dir_size(entry.path)
+        return self._sizes
+
+    def _evict(self, sizes):
+        total = sum(sizes.values())
+        if total <= self.max_bytes:
+            return
+
+        def last_access(entry):
+            try:
+                return os.stat(os.path.join(entry, "result.json")).st_mtime
+            except OSError:
+                return 0.0
+
+        for entry in sorted(sizes, key=last_access):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= sizes.pop(entry)
+            logging.debug("Evicted analysis cache entry %s", entry)
+
+    def clear(self):
+        with self._lock:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            self._sizes = None
+
+def _dir_size(path):
+    total = 0
+    for entry in os.scandir(path):
+        if entry.is_file():
+            total += entry.stat().st_size
+    return total
+
+def _file_state(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+class AnalysisCache:
+    """メモリ (LRU) → ディスクの 2 段構成のキャッシュ"""
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES,
+                 max_entries=DEFAULT_MAX_ENTRIES, enabled=True):
+        self.memory = LRUCache(max_entries)
+        self.disk = DiskCache(cache_dir, max_bytes)
+        self.enabled = enabled
+
+    def get(self, key, targets):
+        """
+        キャッシュ済みの結果を返し、成果物を targets（今回の出力先パス）に復元する。なければ None。
+        メモリにある場合でも、出力先のファイルが記録時から変わっていればディスクから復元し直す。
+        """
+        entry = self.memory.get(key)
+        if entry is not None:
+            result, states = entry
+            if len(states) == len(targets) and all(_file_state(t) == s for t, s in zip(targets, states)):
+                return copy.deepcopy(result)
+        cached = self.disk.get(key)
+        if cached is None:
+            if entry is not None:
+                self.memory.discard(key)
+            return None
+        result, files = cached
+        if len(files) != len(targets):
+            return None
+        for src, dst in zip(files, targets):
+            if os.path.dirname(dst):
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.copyfile(src, dst)
+        self.memory.put(key, (result, [_file_state(t) for t in targets]))
+        return copy.deepcopy(result)
+
+    def put(self, key, result, targets):
+        if not all(os.path.exists(t) for t in targets):
+            return
+        self.memory.put(key, (copy.deepcopy(result), [_file_state(t) for t in targets]))
+        self.disk.put(key, result, targets)
+
+    def clear(self):
+        self.memory.clear()
+        self.disk.clear()
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_analysis_cache():
+    """
+    既定のキャッシュを返す。初回は config.json の analysis_cache_enabled（既定 false）と
+    analysis_cache_dir から作るため、有効にしない限りディスクには何も書かない。
+    """
+    global _default_cache
+    if _default_cache is None:
+        with _default_lock:
+            if _default_cache is None:
+                config = get_config()
+                _default_cache = AnalysisCache(
+                    config.get_str("analysis_cache_dir", DEFAULT_CACHE_DIR),
+                    config.get_int("analysis_cache_max_bytes", DEFAULT_MAX_BYTES),
+                    enabled=config.get_bool("analysis_cache_enabled", False),
+                )
+    return _default_cache
+
+def configure_analysis_cache(cache_dir=None, max_bytes=None, max_entries=None, enabled=None):
+    """既定のキャッシュ設定を変更する（指定しなかった項目は現在の値を引き継ぐ）"""
+    global _default_cache
+    current = get_analysis_cache()
+    _default_cache = AnalysisCache(
+        cache_dir if cache_dir is not None else current.disk.cache_dir,
+        max_bytes if max_bytes is not None else current.disk.max_bytes,
+        max_entries if max_entries is not None else current.memory.max_entries,
+        enabled if enabled is not None else current.enabled,
+    )
+    return _default_cache
+
+def _persist_hit(store, analysis_type, fingerprint, params, result, input_file, artifact_path):
+    """メモ化の命中で解析関数を呼ばなかった場合にも、ResultStore に結果が残るようにする"""
+    try:
+        if store.lookup(analysis_type, fingerprint, params) is not None:
+            return
+    except Exception as e:
+        logging.warning(f"Result store lookup failed for '{input_file}': {e}")
+        return
+    save_to_result_store(store, analysis_type, fingerprint, params, result, input_file, artifact_path)
+
+def memoize_analysis(analysis_type, input_args=("csv_file",), artifact_args=(), artifact_paths=None,
+                     ignore_args=("store",), extra_key=None, store_arg="store", store_params=None):
+    """
+    解析関数の結果を、入力ファイルの内容ハッシュ + パラメータをキーにメモ化するデコレータ。
+    - input_args: 入力ファイルパスを受け取る引数名（内容の SHA-256 がキーになる）
+    - artifact_args: 出力ファイルパスを受け取る引数名。キーには含めず、キャッシュ済みの成果物を今回の出力先へ復元する
+    - artifact_paths: 引数 (dict) から出力ファイルのリストを返す関数（出力先がディレクトリ指定の場合など）
+    - ignore_args: キーに含めない引数名
+    - extra_key: 引数以外で結果に影響する値（設定値など）を返す関数
+    - store_arg: ResultStore を受け取る引数名。命中時はここに渡されたストアへ結果を保存する
+    - store_params: 引数 (dict) からストアのキーに使うパラメータを返す関数（既定はキーに含めた引数）。
+      解析関数が check_result_store() に渡すパラメータと一致させる
+    関数が None（エラー）を返した場合はキャッシュしない。
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        excluded = set(input_args) | set(artifact_args) | set(ignore_args)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = get_analysis_cache()
+            if not cache.enabled:
+                return func(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = bound.arguments
+            try:
+                fingerprints = [fingerprint_file(arguments[name]) for name in input_args]
+            except OSError:
+                # 入力が読めない場合はキャッシュせず、エラー処理は解析関数に任せる
+                return func(*args, **kwargs)
+            params = {k: v for k, v in arguments.items() if k not in excluded}
+            key_source = {
+                "version": CACHE_VERSION,
+                "analysis": analysis_type,
+                "inputs": fingerprints,
+                "params": make_params_key(params),
+                "extra": make_params_key(extra_key() if extra_key else None),
+            }
+            key = hashlib.sha256(json.dumps(key_source, sort_keys=True).encode("utf-8")).hexdigest()
+            targets = [arguments[name] for name in artifact_args]
+            if artifact_paths is not None:
+                targets.extend(artifact_paths(arguments))
+
+            result = cache.get(key, targets)
+            if result is not None:
+                logging.info(f"Using cached {analysis_type} result")
+                store = arguments.get(store_arg)
+                if store is not None and fingerprints:
+                    _persist_hit(store, analysis_type, fingerprints[0],
+                                 store_params(arguments) if store_params else params, result,
+                                 arguments[input_args[0]], targets[0] if targets else None)
+                return result
+            result = func(*args, **kwargs)
+            if result is not None:
+                cache.put(key, result, targets)
+            return result
+
+        return wrapper
+    return decorator
@@ -0,0 +1,323 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from analysis_cache import get_analysis_cache, CACHE_VERSION
+from result_store import fingerprint_file, make_params_key, save_to_result_store
+from metrics import stage as metrics_stage
+
+# 解析をステージ（load → clean → analyze → render → persist）の DAG として実行する。
+# - 各ステージは入力となるステージ名を宣言し、入力がそろったものから並列に実行する
+# - データセットは load ステージで 1 回だけ読み、それを使う全解析で共有する
+# - キー（key）を持つステージの結果は AnalysisCache（メモリ + ディスク）に保存し、次回はキャッシュから返す。
+#   キャッシュにあるステージの入力は計算しないので、全解析がキャッシュ済みならデータセットも読まない
+# matplotlib の pyplot はスレッドセーフでないため、描画ステージは同じロックで 1 つずつ実行する。
+
+DAG_CACHE_VERSION = 1
+RENDER_LOCK = threading.Lock()
+
+class Stage:
+    def __init__(self, name, func, inputs=(), key=None, artifacts=(), lock=None):
+        """
+        func(*入力ステージの値) を実行するステージ。
+        key: キャッシュキーを返す関数（None ならキャッシュしない。値は JSON にできるものに限る）
+        artifacts: このステージが書き出すファイル（キャッシュから復元する）
+        lock: 実行中に保持するロック
+        """
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.key = key
+        self.artifacts = list(artifacts)
+        self.lock = lock
+
+DagResult = namedtuple("DagResult", ["values", "status", "errors", "durations"])
+
+class AnalysisDAG:
+    def __init__(self, workers=None, cache=None):
+        self.stages = {}
+        self.workers = workers or min(8, (os.cpu_count() or 1) + 2)
+        self.cache = cache if cache is not None else get_analysis_cache()
+
+    def add(self, name, func, inputs=(), key=None, artifacts=(), lock=None):
+        if name in self.stages:
+            raise ValueError(f"Stage {name!r} is already defined")
+        self.stages[name] = Stage(name, func, inputs, key, artifacts, lock)
+        return name
+
+    def _cache_key(self, stage):
+        if stage.key is None or not self.cache.enabled:
+            return None
+        try:
+            return stage.key()
+        except OSError as e:
+            logging.warning(f"Cannot compute cache key for {stage.name}: {e}")
+            return None
+
+    def _plan(self, targets):
+        """
+        実行が必要なステージと、キャッシュから得た値を求める。
+        キャッシュにあるステージの入力は（他で必要でなければ）たどらない。
+        """
+        needed, cached, keys = set(), {}, {}
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name in needed or name in cached:
+                continue
+            if name not in self.stages:
+                raise KeyError(f"Unknown stage {name!r}")
+            stage = self.stages[name]
+            key = self._cache_key(stage)
+            if key is not None:
+                value = self.cache.get(key, stage.artifacts)
+                if value is not None:
+                    cached[name] = value
+                    continue
+                keys[name] = key
+            needed.add(name)
+            stack.extend(stage.inputs)
+        return needed, cached, keys
+
+    def _execute(self, stage, values):
+        args = [values[name] for name in stage.inputs]
+        start = time.perf_counter()
+        with metrics_stage(f"dag.{stage.name.split(':', 1)[0]}", stage=stage.name):
+            if stage.lock is not None:
+                with stage.lock:
+                    value = stage.func(*args)
+            else:
+                value = stage.func(*args)
+        return value, time.perf_counter() - start
+
+    def run(self, targets=None) -> DagResult:
+        """
+        targets（既定は他のステージの入力になっていない末端のステージ）とその入力を実行する。
+        失敗したステージに依存するステージは "skipped" になる（他の枝は続行する）。
+        """
+        if not targets:
+            used = {i for stage in self.stages.values() for i in stage.inputs}
+            targets = [name for name in self.stages if name not in used]
+        needed, cached, keys = self._plan(targets)
+        values = dict(cached)
+        status = {name: "cached" for name in cached}
+        errors, durations = {}, {}
+        pending = set(needed)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="analysis-dag") as executor:
+            while pending or running:
+                for name in sorted(pending):
+                    stage = self.stages[name]
+                    if any(status.get(i) in ("failed", "skipped") for i in stage.inputs):
+                        status[name] = "skipped"
+                        pending.discard(name)
+                    elif all(i in values for i in stage.inputs):
+                        running[executor.submit(self._execute, stage, values)] = name
+                        pending.discard(name)
+                if not running:
+                    if pending:  # 入力が循環している
+                        for name in pending:
+                            status[name], errors[name] = "failed", "dependency cycle"
+                        pending.clear()
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        value, durations[name] = future.result()
+                    except Exception as e:
+                        logging.error(f"Stage {name} failed: {e}")
+                        status[name], errors[name] = "failed", f"{type(e).__name__}: {e}"
+                        continue
+                    values[name] = value
+                    status[name] = "ok"
+                    if name in keys and value is not None:
+                        self.cache.put(keys[name], value, self.stages[name].artifacts)
+        status = {name: status[name] for name in self.stages if name in status}
+        return DagResult(values, status, errors, durations)
+
+# ---- 解析の定義 ----
+
+def _numeric(frame, columns):
+    import pandas as pd
+    missing = [c for c in columns if c not in frame.columns]
+    if missing:
+        raise ValueError(f"missing columns: {', '.join(missing)}")
+    return frame[columns].apply(pd.to_numeric, errors="coerce").dropna()
+
+def _clean_anova(frame):
+    import pandas as pd
+    if "group" not in frame.columns or "value" not in frame.columns:
+        raise ValueError("missing columns: group, value")
+    data = frame[["group", "value"]].copy()
+    data["value"] = pd.to_numeric(data["value"], errors="coerce")
+    return data.dropna()
+
+def _compute_regression(data):
+    from regression_analyzer import fit_regression
+    if data.empty:
+        raise ValueError("no numeric x/y rows")
+    return fit_regression(data["x"].to_numpy(), data["y"].to_numpy())
+
+def _render_regression(data, result, output):
+    from regression_analyzer import plot_regression
+    plot_regression(data["x"].to_numpy(), data["y"].to_numpy(), result, output)
+
+def _compute_clustering(data, n_clusters=3):
+    from clustering_analyzer import fit_clustering
+    return fit_clustering(data[["x", "y"]].to_numpy(), n_clusters)[0]
+
+def _render_clustering(data, result, output):
+    import numpy as np
+    from clustering_analyzer import plot_clustering
+    X = data[["x", "y"]].to_numpy()
+    centers = np.asarray(result["centers"])
+    # KMeans のラベルは最終的な中心への最近傍なので、中心から求め直せる
+    labels = ((X[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+    plot_clustering(X, labels, centers, output)
+
+def _compute_anova(data):
+    from anova_analyzer import compute_anova
+    return compute_anova(data)
+
+def _render_anova(data, result, output):
+    from anova_analyzer import plot_anova
+    plot_anova(data, output)
+
+def _compute_t_test(data):
+    from statistical_analyzer import compute_t_test
+    if data.empty:
+        raise ValueError("no numeric group1/group2 rows")
+    return compute_t_test(data["group1"].tolist(), data["group2"].tolist())
+
+# clean: 読み込んだ DataFrame から解析に使う列を取り出す。compute: (clean の結果, **params) -> 結果の辞書。
+# render: (clean の結果, 結果, 出力パス)。output: 既定の出力ファイル名（各 analyze_* の既定と同じ）
+# columns: clean が使う列。load は実行する解析の columns の和集合だけを読む
+AnalysisSpec = namedtuple("AnalysisSpec", ["clean", "compute", "render", "output", "params", "columns"])
+
+ANALYSES = {
+    "regression": AnalysisSpec(lambda f: _numeric(f, ["x", "y"]), _compute_regression, _render_regression,
+                               "regression_analysis.png", {}, ("x", "y")),
+    "clustering": AnalysisSpec(lambda f: _numeric(f, ["x", "y"]), _compute_clustering, _render_clustering,
+                               "clustering_analysis.png", {"n_clusters": 3}, ("x", "y")),
+    "anova": AnalysisSpec(_clean_anova, _compute_anova, _render_anova, "anova_boxplot.png", {}, ("group", "value")),
+    "t_test": AnalysisSpec(lambda f: _numeric(f, ["group1", "group2"]), _compute_t_test, None, None, {},
+                           ("group1", "group2")),
+}
+
+def _load_dataset(path, columns=None):
+    from metrics import record_metrics
+    from columnar_io import read_frame
+    frame = read_frame(path, columns=columns)
+    record_metrics(rows=len(frame))
+    logging.info(f"Loaded dataset '{path}' ({len(frame)} rows) for analysis DAG")
+    return frame
+
+def build_analysis_dag(dataset, analyses=None, output_dir=".", params=None, store=None, render=True,
+                       workers=None, cache=None, results_file=None):
+    """
+    dataset（CSV / Parquet / Arrow IPC）に対して analyses（既定は全解析）を実行する DAG を作る。
+    params: 解析名 -> パラメータ（既定値を上書き）。store を渡すと persist ステージで ResultStore に保存する。
+    results_file（.parquet / .arrow など）を渡すと export ステージで全解析の結果を 1 行 1 解析で書き出す。
+    ステージ名は "load", "clean:<解析>", "analyze:<解析>", "render:<解析>", "persist:<解析>", "export"。
+    """
+    dag = AnalysisDAG(workers, cache)
+    fingerprint = {}
+
+    def dataset_fingerprint():
+        if "sha256" not in fingerprint:
+            fingerprint["sha256"] = fingerprint_file(dataset)
+        return fingerprint["sha256"]
+
+    def make_key(*parts):
+        def key():
+            source = {"version": [CACHE_VERSION, DAG_CACHE_VERSION], "input": dataset_fingerprint(),
+                      "parts": make_params_key(list(parts))}
+            return hashlib.sha256(json.dumps(source, sort_keys=True).encode("utf-8")).hexdigest()
+        return key
+
+    analyses = list(analyses or ANALYSES)
+    for name in analyses:
+        if name not in ANALYSES:
+            raise ValueError(f"Unknown analysis {name!r}. Available: {', '.join(ANALYSES)}")
+    columns = list(dict.fromkeys(c for name in analyses for c in ANALYSES[name].columns))
+    dag.add("load", lambda: _load_dataset(dataset, columns))
+    for name in analyses:
+        spec = ANALYSES[name]
+        analysis_params = dict(spec.params, **(params or {}).get(name, {}))
+        dag.add(f"clean:{name}", spec.clean, ["load"])
+        dag.add(f"analyze:{name}", lambda data, spec=spec, p=analysis_params: spec.compute(data, **p),
+                [f"clean:{name}"], key=make_key("analyze", name, analysis_params))
+        output = None
+        if render and spec.render is not None:
+            output = os.path.join(output_dir, spec.output)
+
+            # キーは output_dir を含まない（別の出力先でも画像をキャッシュから復元する）ため、
+            # ステージの値にパスを持たせない。出力先は persist が output から直接受け取る
+            def render_stage(data, result, spec=spec, output=output):
+                spec.render(data, result, output)
+                return True
+            dag.add(f"render:{name}", render_stage, [f"clean:{name}", f"analyze:{name}"],
+                    key=make_key("render", name, analysis_params), artifacts=[output], lock=RENDER_LOCK)
+        if store is not None:
+            inputs = [f"analyze:{name}"] + ([f"render:{name}"] if output else [])
+
+            def persist(result, *rendered, name=name, p=analysis_params, output=output):
+                save_to_result_store(store, name, dataset_fingerprint(), p, result, dataset, output)
+                return True
+            dag.add(f"persist:{name}", persist, inputs)
+    if results_file is not None:
+        def export(*results):
+            from columnar_io import write_results
+            write_results([{"analysis": name, **result} for name, result in zip(analyses, results)], results_file)
+            logging.info(f"Wrote {len(results)} analysis results to {results_file}")
+            return results_file
+        dag.add("export", export, [f"analyze:{name}" for name in analyses])
+    return dag
+
+def run_analyses(dataset, analyses=None, **options):
+    """
+    dataset に対して analyses を DAG で実行し、(解析名 -> 結果（失敗なら None）, DagResult) を返す。
+    options は build_analysis_dag() と同じ。
+    """
+    dag = build_analysis_dag(dataset, analyses, **options)
+    # 描画がキャッシュ済みでも結果を返すため、analyze ステージも対象にする
+    outcome = dag.run([name for name in dag.stages
+                       if name.split(":", 1)[0] in ("analyze", "render", "persist", "export")])
+    results = {name.split(":", 1)[1]: outcome.values.get(name)
+               for name in dag.stages if name.startswith("analyze:")}
+    return results, outcome
+
+def main(argv=None):
+    from result_store import ResultStore
+
+    parser = argparse.ArgumentParser(description="1 つのデータセットに複数の解析を DAG で実行する（データセットは 1 回だけ読む）")
+    parser.add_argument("dataset")
+    parser.add_argument("--analyses", help=f"カンマ区切り（既定: {','.join(ANALYSES)}）")
+    parser.add_argument("--output-dir", default=".")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--no-render", action="store_true", help="グラフを描画しない")
+    parser.add_argument("--store", action="store_true", help="結果を ResultStore に保存する")
+    parser.add_argument("--results-file", help="全解析の結果を書き出す Parquet / Arrow ファイル")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s",
+                        datefmt="%Y-%m-%d %H:%M:%S")
+
+    analyses = args.analyses.split(",") if args.analyses else None
+    results, outcome = run_analyses(args.dataset, analyses, output_dir=args.output_dir, workers=args.workers,
+                                    render=not args.no_render, store=ResultStore() if args.store else None,
+                                    results_file=args.results_file)
+    for name, state in outcome.status.items():
+        duration = outcome.durations.get(name)
+        detail = outcome.errors.get(name) or (f"{duration * 1000:.1f} ms" if duration is not None else "")
+        print(f"{name:24s} {state:8s} {detail}")
+    return 1 if outcome.errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,61 @@
 import os
 import logging
-import pandas as pd
 import matplotlib.pyplot as plt
 from scipy import stats
+from result_store import ResultStore, check_result_store, save_to_result_store
+from analysis_cache import memoize_analysis
+from metrics import timed, record_metrics
+from profiling import profiled
+from columnar_io import read_frame
 
-def analyze_anova(csv_file="sample_anova.csv", output_image="anova_boxplot.png"):
+def compute_anova(data):
+    """
+    'group' と 'value' の列を持つ DataFrame の 1 元配置分散分析。
+    グループが 2 つ未満なら ValueError。
+    """
+    # グループごとに値をリスト化
+    groups = data.groupby("group")["value"].apply(list)
+    if len(groups) < 2:
+        raise ValueError("ANOVA requires at least two groups.")
+    f_stat, p_value = stats.f_oneway(*groups)
+    logging.info(f"ANOVA results: F-statistic = {f_stat:.3f}, p-value = {p_value:.3f}")
+    return {"f_statistic": float(f_stat), "p_value": float(p_value), "groups": int(len(groups))}
+
+def plot_anova(data, output_image):
+    """各グループの箱ひげ図を output_image に保存する"""
+    plt.figure(figsize=(10, 6))
+    data.boxplot(column="value", by="group", grid=False)
+    plt.title("ANOVA Boxplot by Group")
+    plt.suptitle("")  # デフォルトタイトルを削除
+    plt.xlabel("Group")
+    plt.ylabel("Value")
+    plt.tight_layout()
+    plt.savefig(output_image)
+    plt.close()
+    logging.info(f"ANOVA boxplot saved as '{output_image}'")
+
+@timed("analyze.anova", input_arg="csv_file")
+@memoize_analysis("anova", artifact_args=("output_image",))
+@profiled("analyze.anova")
+def analyze_anova(csv_file="sample_anova.csv", output_image="anova_boxplot.png", store=None):
     """
     CSVファイルは、少なくとも2つ以上のグループのデータを含むことが前提です。
+    拡張子が .parquet / .arrow / .feather の場合は Parquet / Arrow IPC として読みます。
     CSVファイルは 'group' と 'value' という列を持つ形式で、各行が各グループの観測値です。
 
     1元配置分散分析（ANOVA）を実施し、F統計量とp値をログに出力。
     また、各グループの箱ひげ図を作成して output_image に保存します。
+    store (ResultStore) を渡すと保存済みの結果があればそれを返し、なければ計算結果を保存します。
     """
+    fingerprint, cached = check_result_store(store, "anova", csv_file, {}, output_image)
+    if cached is not None:
+        return cached
+
     try:
-        data = pd.read_csv(csv_file)
+        # 使う 2 列だけを読む（Parquet / Arrow の入力では他の列をディスクから読まない）
+        data = read_frame(csv_file, columns=["group", "value"])
         logging.info(f"CSV file '{csv_file}' read successfully.")
+        record_metrics(rows=len(data))
     except Exception as e:
         logging.error(f"Failed to read CSV file '{csv_file}': {e}")
         return
@@ -24,34 +65,21 @@ def analyze_anova(csv_file="sample_anova.csv", output_image="anova_boxplot.png")
         logging.error(f"CSV file '{csv_file}' must contain 'group' and 'value' columns.")
         return
 
-    # グループごとに値をリスト化
-    groups = data.groupby("group")["value"].apply(list)
-    if len(groups) < 2:
-        logging.error("ANOVA requires at least two groups.")
-        return
-
     try:
-        f_stat, p_value = stats.f_oneway(*groups)
-        logging.info(f"ANOVA results: F-statistic = {f_stat:.3f}, p-value = {p_value:.3f}")
+        result = compute_anova(data)
     except Exception as e:
         logging.error(f"Error performing ANOVA: {e}")
         return
 
     # 箱ひげ図の作成
     try:
-        plt.figure(figsize=(10, 6))
-        data.boxplot(column="value", by="group", grid=False)
-        plt.title("ANOVA Boxplot by Group")
-        plt.suptitle("")  # デフォルトタイトルを削除
-        plt.xlabel("Group")
-        plt.ylabel("Value")
-        plt.tight_layout()
-        plt.savefig(output_image)
-        plt.close()
-        logging.info(f"ANOVA boxplot saved as '{output_image}'")
+        plot_anova(data, output_image)
     except Exception as e:
         logging.error(f"Error generating or saving boxplot: {e}")
 
+    save_to_result_store(store, "anova", fingerprint, {}, result, csv_file, output_image)
+    return result
+
 def main():
     logging.basicConfig(
         level=logging.INFO,
@@ -59,7 +87,7 @@ def main():
         datefmt="%Y-%m-%d %H:%M:%S"
     )
     logging.info("Starting ANOVA Analyzer")
-    analyze_anova()
+    analyze_anova(store=ResultStore())
     logging.info("ANOVA analysis completed.")
 
 if __name__ == "__main__":
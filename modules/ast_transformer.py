@@ -1,6 +1,21 @@
+import io
+import os
+import re
 import ast
-import logging
 import sys
+import json
+import keyword
+import hashlib
+import logging
+import argparse
+import builtins
+from concurrent.futures import ProcessPoolExecutor
+
+# 変換規則を変えたら上げる（バッチモードのキャッシュが無効になり、全ファイルを変換し直す）
+TRANSFORMER_VERSION = 2
+MANIFEST_NAME = ".ast_transform_manifest.json"
+SKIP_DIRS = {"__pycache__", ".git", ".hg", ".svn", ".tox", ".venv", "venv", "node_modules"}
+MODES = ("prefix", "compact")
 
 class Obfuscator(ast.NodeTransformer):
     def visit_FunctionDef(self, node):
@@ -24,30 +39,801 @@ class Obfuscator(ast.NodeTransformer):
             node.id = "obf_" + node.id
         return node
 
-def transform_code(source_code):
+# ---- シンボル表による短い名前への置き換え (mode="compact") ----
+
+_BUILTINS = frozenset(dir(builtins))
+_RESERVED = _BUILTINS | frozenset(keyword.kwlist) | frozenset(getattr(keyword, "softkwlist", ()))
+# 組み込み型・ファイルオブジェクトの属性名。自前のクラスに同名のメソッドがあっても変換しない
+_PROTECTED_ATTRS = frozenset(
+    name
+    for t in (str, bytes, bytearray, list, dict, set, frozenset, tuple, int, float, complex, object,
+              BaseException, io.TextIOWrapper, io.BufferedReader, io.BufferedWriter, io.BytesIO, io.StringIO)
+    for name in dir(t)
+)
+# 継承しても、サブクラスのメソッド名を名前で呼び出すことのない基底クラス
+_SAFE_BASES = frozenset({"object", "ABC"}) | frozenset(
+    name for name in _BUILTINS
+    if isinstance(getattr(builtins, name), type) and issubclass(getattr(builtins, name), BaseException)
+)
+_FIRST_CHARS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_REST_CHARS = _FIRST_CHARS + "0123456789_"
+
+def _compact_name(index):
+    """0, 1, 2, ... を a, b, ..., Z, aa, ba, ... に対応させる"""
+    name = _FIRST_CHARS[index % 52]
+    index //= 52
+    while index:
+        index -= 1
+        name += _REST_CHARS[index % 63]
+        index //= 63
+    return name
+
+# "visit_%s" / "_handle_%s" / f"on_{name}" のように、書式で組み立てて getattr される名前の先頭部分
+_PREFIX_PATTERN = re.compile(r"([A-Za-z_][A-Za-z0-9_]*)(?:%|\{|$)")
+
+def _is_special(name):
+    return name.startswith("__")
+
+class NameTable:
+    """
+    識別子 -> 短い名前 の共有表。割り当ては追記のみで、一度決めた名前は変わらないため、
+    複数ファイル・複数回の実行で同じ識別子は同じ名前になる。名前は sys.intern して共有する。
+    """
+    def __init__(self, mapping=None):
+        self.mapping = {}
+        self._used = set()
+        self._reserved = set(_RESERVED)
+        self._next = 0
+        for name, short in (mapping or {}).items():
+            self.mapping[sys.intern(name)] = sys.intern(short)
+            self._used.add(short)
+
+    def reserve(self, names) -> bool:
+        """
+        names（コード中に現れる識別子）を生成名として使わないようにする。
+        既に割り当てた生成名と衝突した場合は False を返す（表を作り直す必要がある）。
+        """
+        names = set(names)
+        self._reserved |= names
+        return self._used.isdisjoint(names)
+
+    def assign(self, names):
+        """まだ名前のない識別子に、渡された順で短い名前を割り当てる"""
+        for name in names:
+            if name in self.mapping:
+                continue
+            while True:
+                short = _compact_name(self._next)
+                self._next += 1
+                if short not in self._reserved and short not in self._used:
+                    break
+            self.mapping[sys.intern(name)] = sys.intern(short)
+            self._used.add(short)
+
+    def __getitem__(self, name):
+        return self.mapping[name]
+
+class _Scope:
+    __slots__ = ("kind", "parent", "owner", "bindings", "globals", "nonlocals", "imports", "attr_stores",
+                 "definitions", "receiver")
+
+    def __init__(self, kind, parent, owner=None):
+        self.kind = kind          # "module" / "class" / "function"
+        self.parent = parent
+        self.owner = owner        # メソッドのスコープなら、そのクラスのスコープ
+        self.bindings = set()
+        self.globals = set()
+        self.nonlocals = set()
+        self.imports = {}         # import で束縛した名前 -> 外部モジュールなら True
+        self.attr_stores = set()  # クラスのスコープ: メソッド内で self.X = ... と代入された属性名
+        self.definitions = set()  # def / class で束縛した名前
+        self.receiver = None      # メソッドのスコープ: 第 1 引数 (self / cls) の名前
+
+    def resolve(self, name):
+        """name を束縛しているスコープを返す。どこにもなければ（組み込み名など）None"""
+        scope = self
+        while scope is not None:
+            if name in scope.globals:
+                return _module_scope(scope)
+            if name in scope.bindings and name not in scope.nonlocals and (scope is self or scope.kind != "class"):
+                return scope
+            scope = scope.parent
+        return None
+
+def _module_scope(scope):
+    while scope.parent is not None:
+        scope = scope.parent
+    return scope
+
+def _root(node):
+    """a.b().c[0].d の a のように、属性参照・呼び出し・添字をたどった先頭の式を返す"""
+    while True:
+        kind = type(node)
+        if kind is ast.Attribute or kind is ast.Subscript:
+            node = node.value
+        elif kind is ast.Call:
+            node = node.func
+        else:
+            return node
+
+class SymbolCollector:
+    """
+    AST を 1 回だけ走査して、スコープごとの束縛（シンボル表）と、識別子を持つノードを集める。
+    - defined: どこかのスコープで束縛される識別子（変数・引数・関数/クラス名・import 名）
+    - members: 属性として参照されうる自前の識別子（モジュール/クラス直下の名前、self.X への代入）
+    - protected: 変換すると動作が変わる識別子（組み込み名・外部モジュールの属性・外部関数への
+      キーワード引数・外部クラスを継承/装飾したクラスのメンバー・識別子と同じ文字列リテラル）
+    internal_modules が None なら import はすべて外部モジュールとして扱う（単一ファイルの変換）。
+    """
+    def __init__(self, internal_modules=None):
+        self.internal_modules = internal_modules
+        self.defined = set()
+        self.members = set()
+        self.protected = set()
+        self.counts = {}
+        self.modules = set()
+        self.prefixes = set()
+        self.names, self.args, self.defs, self.attrs, self.keywords = [], [], [], [], []
+        self.imports, self.scoped_names, self.match_attrs = [], [], []
+        self._scopes = []
+        self._attr_roots = []
+        self._calls = []
+        self._classes = []
+        self._handlers = {
+            ast.Name: self._visit_Name,
+            ast.Attribute: self._visit_Attribute,
+            ast.Call: self._visit_Call,
+            ast.Constant: self._visit_Constant,
+            ast.JoinedStr: self._visit_JoinedStr,
+            ast.FunctionDef: self._visit_FunctionDef,
+            ast.AsyncFunctionDef: self._visit_FunctionDef,
+            ast.Lambda: self._visit_Lambda,
+            ast.ClassDef: self._visit_ClassDef,
+            ast.Import: self._visit_Import,
+            ast.ImportFrom: self._visit_ImportFrom,
+            ast.Global: self._visit_Global,
+            ast.Nonlocal: self._visit_Global,
+            ast.ExceptHandler: self._visit_ExceptHandler,
+            ast.ListComp: self._visit_Comprehension,
+            ast.SetComp: self._visit_Comprehension,
+            ast.GeneratorExp: self._visit_Comprehension,
+            ast.DictComp: self._visit_Comprehension,
+        }
+        for name in ("MatchAs", "MatchStar", "MatchMapping", "MatchClass"):
+            if hasattr(ast, name):
+                self._handlers[getattr(ast, name)] = self._visit_Match
+
+    # ---- 走査 ----
+
+    def collect(self, tree):
+        module = self._new_scope("module", None)
+        self._visit_list(tree.body, module)
+        self._finish()
+        return self
+
+    def _new_scope(self, kind, parent, owner=None):
+        scope = _Scope(kind, parent, owner)
+        self._scopes.append(scope)
+        return scope
+
+    def _count(self, name):
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def _visit(self, node, scope):
+        handler = self._handlers.get(type(node))
+        if handler is not None:
+            handler(node, scope)
+        else:
+            self._visit_children(node, scope)
+
+    def _visit_children(self, node, scope):
+        visit = self._visit
+        for field in node._fields:
+            value = getattr(node, field, None)
+            if type(value) is list:
+                for item in value:
+                    if isinstance(item, ast.AST):
+                        visit(item, scope)
+            elif isinstance(value, ast.AST):
+                visit(value, scope)
+
+    def _visit_list(self, nodes, scope):
+        visit = self._visit
+        for node in nodes:
+            if node is not None:
+                visit(node, scope)
+
+    def _visit_Name(self, node, scope):
+        name = node.id
+        self.names.append(node)
+        self._count(name)
+        if type(node.ctx) is not ast.Load:
+            if name in scope.globals:
+                _module_scope(scope).bindings.add(name)
+            else:
+                scope.bindings.add(name)
+        else:
+            self._attr_roots.append((None, name, scope))
+
+    def _visit_Attribute(self, node, scope):
+        attr = node.attr
+        self.attrs.append(node)
+        self._count(attr)
+        if type(node.ctx) is not ast.Load:
+            self.members.add(attr)
+            owner = scope.owner
+            if owner is not None:
+                owner.attr_stores.add(attr)
+        value = node.value
+        if type(value) is ast.Name:
+            self._attr_roots.append((attr, value.id, scope))
+        else:
+            # 呼び出し結果・添字・リテラルなどの属性は型が分からないため、外部のものとみなす
+            self.protected.add(attr)
+        self._visit(value, scope)
+
+    def _visit_Call(self, node, scope):
+        self._visit(node.func, scope)
+        self._visit_list(node.args, scope)
+        for kw in node.keywords:
+            if kw.arg is not None:
+                self.keywords.append(kw)
+                self._count(kw.arg)
+            self._visit(kw.value, scope)
+        if node.keywords:
+            self._calls.append((node, scope))
+
+    def _visit_Constant(self, node, scope):
+        value = node.value
+        # getattr(obj, "name") や __all__、kwargs.get("name") などの文字列で参照される名前は変換しない
+        if type(value) is str:
+            if value.isidentifier():
+                self.protected.add(value)
+            if value.endswith("_") or "%" in value or "{" in value:
+                self._add_prefix(value)
+
+    def _add_prefix(self, text):
+        match = _PREFIX_PATTERN.match(text)
+        if match and len(match.group(1)) > 1:
+            self.prefixes.add(match.group(1))
+
+    def _visit_JoinedStr(self, node, scope):
+        first = node.values[0] if node.values else None
+        if type(first) is ast.Constant and type(first.value) is str:
+            self._add_prefix(first.value + "{")
+        self._visit_children(node, scope)
+
+    def _visit_arguments(self, args, outer, inner):
+        self._visit_list(args.defaults, outer)
+        self._visit_list(args.kw_defaults, outer)
+        for arg in args.posonlyargs + args.args + [args.vararg] + args.kwonlyargs + [args.kwarg]:
+            if arg is None:
+                continue
+            inner.bindings.add(arg.arg)
+            self.args.append(arg)
+            self._count(arg.arg)
+            if arg.annotation is not None:
+                self._visit(arg.annotation, outer)
+
+    def _visit_FunctionDef(self, node, scope):
+        scope.bindings.add(node.name)
+        scope.definitions.add(node.name)
+        self.defs.append(node)
+        self._count(node.name)
+        self._visit_list(node.decorator_list, scope)
+        if node.returns is not None:
+            self._visit(node.returns, scope)
+        inner = self._new_scope("function", scope, scope if scope.kind == "class" else None)
+        self._visit_arguments(node.args, scope, inner)
+        positional = node.args.posonlyargs + node.args.args
+        if scope.kind == "class" and positional:
+            inner.receiver = positional[0].arg
+        self._visit_list(node.body, inner)
+
+    def _visit_Lambda(self, node, scope):
+        inner = self._new_scope("function", scope)
+        self._visit_arguments(node.args, scope, inner)
+        self._visit(node.body, inner)
+
+    def _visit_ClassDef(self, node, scope):
+        scope.bindings.add(node.name)
+        scope.definitions.add(node.name)
+        self.defs.append(node)
+        self._count(node.name)
+        self._visit_list(node.decorator_list, scope)
+        self._visit_list(node.bases, scope)
+        for kw in node.keywords:  # metaclass= などはそのまま残す
+            self._visit(kw.value, scope)
+        inner = self._new_scope("class", scope)
+        self._classes.append((node, scope, inner))
+        self._visit_list(node.body, inner)
+
+    def _visit_Comprehension(self, node, scope):
+        generators = node.generators
+        self._visit(generators[0].iter, scope)
+        inner = self._new_scope("function", scope)
+        for i, comp in enumerate(generators):
+            self._visit(comp.target, inner)
+            if i:
+                self._visit(comp.iter, inner)
+            self._visit_list(comp.ifs, inner)
+        if type(node) is ast.DictComp:
+            self._visit(node.key, inner)
+            self._visit(node.value, inner)
+        else:
+            self._visit(node.elt, inner)
+
+    def _is_internal(self, module, level):
+        if self.internal_modules is None:
+            return False
+        if level:
+            return True
+        return module in self.internal_modules
+
+    def _visit_Import(self, node, scope):
+        for alias in node.names:
+            self.modules.update(alias.name.split("."))
+            if alias.asname is None and "." in alias.name:
+                # import a.b は a を束縛するため、別名にすると意味が変わる
+                local = alias.name.split(".")[0]
+                self.protected.add(local)
+            else:
+                local = alias.asname or alias.name
+            internal = self._is_internal(alias.name, 0)
+            scope.bindings.add(local)
+            scope.imports[local] = scope.imports.get(local, False) or not internal
+            self.imports.append((alias, local, False, internal))
+            self._count(local)
+
+    def _visit_ImportFrom(self, node, scope):
+        module = node.module or ""
+        self.modules.update(module.split("."))
+        internal = self._is_internal(module, node.level)
+        for alias in node.names:
+            if alias.name == "*":
+                continue
+            local = alias.asname or alias.name
+            if module == "__future__":
+                self.protected.add(alias.name)
+                continue
+            scope.bindings.add(local)
+            scope.imports[local] = scope.imports.get(local, False) or not internal
+            if not internal:
+                self.protected.add(alias.name)
+            self.imports.append((alias, local, True, internal))
+            self._count(local)
+
+    def _visit_Global(self, node, scope):
+        target = scope.globals if type(node) is ast.Global else scope.nonlocals
+        target.update(node.names)
+        self.scoped_names.append(node)
+        for name in node.names:
+            self._count(name)
+
+    def _visit_ExceptHandler(self, node, scope):
+        if node.name is not None:
+            scope.bindings.add(node.name)
+            self.scoped_names.append(node)
+            self._count(node.name)
+        if node.type is not None:
+            self._visit(node.type, scope)
+        self._visit_list(node.body, scope)
+
+    def _visit_Match(self, node, scope):
+        kind = type(node).__name__
+        if kind == "MatchClass":
+            self.match_attrs.append(node)
+            for attr in node.kwd_attrs:
+                self._count(attr)
+        else:
+            name = node.rest if kind == "MatchMapping" else node.name
+            if name is not None:
+                scope.bindings.add(name)
+                self.scoped_names.append(node)
+                self._count(name)
+        self._visit_children(node, scope)
+
+    # ---- 走査後の解決 ----
+
+    def _is_external_name(self, name, scope):
+        bound = scope.resolve(name)
+        if bound is None:
+            return name not in self.defined  # 組み込み名、またはどこでも定義されていない名前
+        return bound.imports.get(name, False)
+
+    def _is_known_object(self, name, scope):
+        """name が自前の関数・クラス・モジュール、またはメソッドの self / cls を指すなら True"""
+        bound = scope.resolve(name)
+        if bound is None:
+            return False
+        if name == bound.receiver or name in bound.definitions:
+            return True
+        return bound.imports.get(name) is False
+
+    def _finish(self):
+        for scope in self._scopes:
+            self.defined |= scope.bindings
+            if scope.kind != "function":
+                self.members |= scope.bindings
+        for attr, root, scope in self._attr_roots:
+            # 型の分からない変数の属性（外部オブジェクトのメソッドかもしれない）は変換しない
+            if attr is not None and not self._is_known_object(root, scope):
+                self.protected.add(attr)
+        for node, outer, inner in self._classes:
+            if self._is_external_class(node, outer):
+                self.protected |= inner.bindings | inner.attr_stores
+        for call, scope in self._calls:
+            func = call.func
+            kind = type(func)
+            if kind is ast.Name:
+                external = self._is_external_name(func.id, scope)
+            elif kind is ast.Attribute:
+                external = func.attr in self.protected or func.attr not in self.members
+            else:
+                external = True
+            if external:
+                self.protected.update(kw.arg for kw in call.keywords if kw.arg is not None)
+        self._attr_roots = self._calls = self._classes = self._scopes = None
+
+    def _is_external_class(self, node, scope):
+        """外部のクラスを継承している、または外部のデコレータが付いたクラスなら True"""
+        for base in node.bases:
+            root = _root(base)
+            if type(root) is not ast.Name:
+                return True
+            if type(base) is ast.Name and base.id in _SAFE_BASES:
+                continue
+            if self._is_external_name(root.id, scope):
+                return True
+        for decorator in node.decorator_list:
+            root = _root(decorator)
+            if type(root) is not ast.Name or self._is_external_name(root.id, scope):
+                return True
+        return False
+
+    def summary(self) -> dict:
+        """ファイルをまたいで名前を決めるための集計（JSON にできる形）"""
+        return {
+            "defined": sorted(self.defined),
+            "members": sorted(self.members),
+            "protected": sorted(self.protected),
+            "counts": self.counts,
+            "modules": sorted(self.modules),
+            "prefixes": sorted(self.prefixes),
+        }
+
+def build_rename_maps(summaries, table=None):
+    """
+    ファイルごとの集計をまとめ、(変数名の対応表, 属性名の対応表, NameTable) を返す。
+    どちらの対応表でも同じ識別子は同じ短い名前になる。
+    """
+    defined, members, protected, counts, seen = set(), set(), set(_RESERVED | _PROTECTED_ATTRS), {}, set()
+    prefixes = set()
+    for s in summaries:
+        defined.update(s["defined"])
+        members.update(s["members"])
+        protected.update(s["protected"])
+        seen.update(s["modules"])
+        prefixes.update(s["prefixes"])
+        for name, n in s["counts"].items():
+            counts[name] = counts.get(name, 0) + n
+    seen.update(counts)
+    if prefixes:
+        pattern = re.compile("|".join(map(re.escape, sorted(prefixes))))
+        protected.update(name for name in defined | members if pattern.match(name))
+    rename_names = {name for name in defined if name not in protected and not _is_special(name)}
+    rename_attrs = {name for name in members if name not in protected and not _is_special(name)}
+    if table is None or not table.reserve(seen):
+        table = NameTable()
+        table.reserve(seen)
+    # 出現回数の多い識別子ほど短い名前にする
+    table.assign(sorted(rename_names | rename_attrs, key=lambda name: (-counts.get(name, 0), name)))
+    names_map = {name: table[name] for name in rename_names}
+    attrs_map = {name: table[name] for name in rename_attrs}
+    return names_map, attrs_map, table
+
+def apply_renames(collector, names_map, attrs_map):
+    """collector が集めたノードの識別子をその場で書き換える"""
+    get_name = names_map.get
+    get_attr = attrs_map.get
+    for node in collector.names:
+        new = get_name(node.id)
+        if new is not None:
+            node.id = new
+    for node in collector.args:
+        new = get_name(node.arg)
+        if new is not None:
+            node.arg = new
+    for node in collector.keywords:
+        new = get_name(node.arg)
+        if new is not None:
+            node.arg = new
+    for node in collector.defs:
+        new = get_name(node.name)
+        if new is not None:
+            node.name = new
+    for node in collector.attrs:
+        new = get_attr(node.attr)
+        if new is not None:
+            node.attr = new
+    for node in collector.scoped_names:
+        if hasattr(node, "names"):
+            node.names = [get_name(name) or name for name in node.names]
+        elif hasattr(node, "rest"):
+            node.rest = get_name(node.rest) or node.rest
+        else:
+            node.name = get_name(node.name) or node.name
+    for node in collector.match_attrs:
+        node.kwd_attrs = [get_attr(name) or name for name in node.kwd_attrs]
+    for alias, local, is_from, internal in collector.imports:
+        new_local = get_name(local) or local
+        if is_from:
+            new_name = (get_attr(alias.name) or alias.name) if internal else alias.name
+            alias.name = new_name
+            alias.asname = None if new_local == new_name else new_local
+        elif alias.asname is not None or new_local != local:
+            alias.asname = None if new_local == alias.name else new_local
+
+def _unparse(tree):
+    # Python 3.9+ なら ast.unparse を使用、それ以前は astor を利用
+    if hasattr(ast, "unparse"):
+        return ast.unparse(tree)
+    import astor
+    return astor.to_source(tree)
+
+def compact_transform_code(source_code, table=None, internal_modules=None):
+    """
+    識別子をシンボル表に基づいて短い名前に置き換える。table (NameTable) を渡すと、
+    複数ファイルで同じ識別子に同じ名前を使う。失敗時は None。
+    """
+    try:
+        tree = ast.parse(source_code)
+        collector = SymbolCollector(internal_modules).collect(tree)
+        names_map, attrs_map, _ = build_rename_maps([collector.summary()], table)
+        apply_renames(collector, names_map, attrs_map)
+        return _unparse(tree)
+    except Exception as e:
+        logging.error(f"AST transformation failed: {e}")
+        return None
+
+def transform_code(source_code, mode="prefix", table=None):
+    """mode="prefix" は従来の obf_ 接頭辞、mode="compact" はシンボル表による短い名前への置き換え"""
+    if mode == "compact":
+        return compact_transform_code(source_code, table)
     try:
         # ソースコードをASTにパース
         tree = ast.parse(source_code)
         obfuscator = Obfuscator()
         transformed_tree = obfuscator.visit(tree)
         ast.fix_missing_locations(transformed_tree)
-        # Python 3.9+ なら ast.unparse を使用、それ以前は astor を利用
-        if hasattr(ast, "unparse"):
-            transformed_code = ast.unparse(transformed_tree)
-        else:
-            import astor
-            transformed_code = astor.to_source(transformed_tree)
-        return transformed_code
+        return _unparse(transformed_tree)
     except Exception as e:
         logging.error(f"AST transformation failed: {e}")
         return None
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python ast_transformer.py <source_file.py>")
-        sys.exit(1)
+# ---- バッチモード ----
+
+def _write_atomic(path, text):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def _source_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def _transform_task(task):
+    """プロセスプールで実行する 1 ファイル分の変換 (prefix)。(相対パス, ハッシュ, エラー) を返す"""
+    rel, src, dst = task
+    try:
+        with open(src, "rb") as f:
+            data = f.read()
+        transformed = transform_code(data.decode("utf-8"))
+        if transformed is None:
+            return rel, None, "transformation failed"
+        _write_atomic(dst, transformed)
+        return rel, _source_hash(data), None
+    except Exception as e:
+        return rel, None, str(e)
+
+def _collect_task(task):
+    """1 ファイル分のシンボル集計 (compact の第 1 段階)。(相対パス, ハッシュ, 集計, エラー) を返す"""
+    rel, src, internal_modules = task
+    try:
+        with open(src, "rb") as f:
+            data = f.read()
+        tree = ast.parse(data.decode("utf-8"))
+        return rel, _source_hash(data), SymbolCollector(internal_modules).collect(tree).summary(), None
+    except Exception as e:
+        return rel, None, None, str(e)
+
+def _rename_task(task):
+    """決まった対応表で 1 ファイルを書き換える (compact の第 2 段階)。(相対パス, エラー) を返す"""
+    rel, src, dst, names_map, attrs_map, internal_modules = task
+    try:
+        with open(src, "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+        collector = SymbolCollector(internal_modules).collect(tree)
+        apply_renames(collector, names_map, attrs_map)
+        _write_atomic(dst, _unparse(tree))
+        return rel, None
+    except Exception as e:
+        return rel, str(e)
+
+def _run_tasks(func, tasks, workers):
+    if workers == 1 or len(tasks) <= 1:
+        return list(map(func, tasks))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, tasks, chunksize=max(1, len(tasks) // 64)))
+
+def _iter_sources(src_root, exclude):
+    """src_root 以下の .py ファイルの相対パスを返す（隠しディレクトリ・exclude 以下は除く）"""
+    for dirpath, dirnames, filenames in os.walk(src_root):
+        dirnames[:] = sorted(d for d in dirnames
+                             if d not in SKIP_DIRS and not d.startswith(".")
+                             and os.path.abspath(os.path.join(dirpath, d)) not in exclude)
+        for name in sorted(filenames):
+            if name.endswith(".py"):
+                yield os.path.relpath(os.path.join(dirpath, name), src_root)
+
+def _internal_modules(sources):
+    """変換対象のファイルから import されうるモジュール名（a/b/c.py -> c, b.c, a.b.c と a, a.b）"""
+    names = set()
+    for rel in sources:
+        parts = rel[:-3].split(os.sep)
+        if parts[-1] == "__init__":
+            parts = parts[:-1]
+        for i in range(len(parts)):
+            names.add(".".join(parts[i:]))
+            names.add(".".join(parts[:i + 1]))
+    names.discard("")
+    return names
+
+def _load_manifest(path, mode, extra_key=None):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if (manifest.get("version") != TRANSFORMER_VERSION or manifest.get("mode", "prefix") != mode
+            or manifest.get("key") != extra_key):
+        return {}
+    return manifest
+
+def _remove_stale_outputs(previous, files, src_root, dst_root, stats):
+    for rel in set(previous) - set(files):
+        if not os.path.exists(os.path.join(src_root, rel)):
+            try:
+                os.remove(os.path.join(dst_root, rel))
+                stats["removed"] += 1
+            except OSError:
+                pass
+
+def _rename_digest(names, names_map, attrs_map):
+    """ファイル中の識別子に対する対応表の要約。変わったファイルは内容が同じでも書き直す"""
+    pairs = [(name, names_map.get(name), attrs_map.get(name)) for name in sorted(names)]
+    return hashlib.sha256(json.dumps(pairs).encode("utf-8")).hexdigest()
+
+def transform_tree(src_root, dst_root, workers=None, use_cache=True, mode="prefix"):
+    """
+    src_root 以下の .py ファイルを変換し、同じ相対パスで dst_root に書き出す。
+    dst_root のマニフェストに (サイズ, mtime, 内容ハッシュ) を記録し、変換規則のバージョンが同じで
+    内容が変わっていないファイルは変換しない。ソースから消えたファイルの出力は削除する。
+    変換は workers 個のプロセスで並列に行う。件数の辞書を返す。
+    mode="compact" では全ファイルのシンボルを集計してから共通の名前表で書き換える（2 段階）。
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode: {mode}")
+    src_root = os.path.abspath(src_root)
+    dst_root = os.path.abspath(dst_root)
+    manifest_path = os.path.join(dst_root, MANIFEST_NAME)
+    sources = list(_iter_sources(src_root, {dst_root}))
+    internal_modules = _internal_modules(sources) if mode == "compact" else None
+    key = hashlib.sha256(json.dumps(sorted(internal_modules)).encode()).hexdigest() if internal_modules else None
+    manifest = _load_manifest(manifest_path, mode, key) if use_cache else {}
+    previous = manifest.get("files", {})
+    files = {}
+    tasks = []
+    stats = {"transformed": 0, "skipped": 0, "failed": 0, "removed": 0}
+
+    for rel in sources:
+        src = os.path.join(src_root, rel)
+        dst = os.path.join(dst_root, rel)
+        st = os.stat(src)
+        entry = previous.get(rel)
+        if entry is not None and os.path.exists(dst):
+            if entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+                files[rel] = dict(entry)
+                continue
+            # mtime だけ変わった（チェックアウトし直しなど）場合は内容ハッシュで判定する
+            with open(src, "rb") as f:
+                digest = _source_hash(f.read())
+            if digest == entry["hash"]:
+                files[rel] = dict(entry, size=st.st_size, mtime_ns=st.st_mtime_ns)
+                continue
+        files[rel] = {"hash": None, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        tasks.append(rel)
+
+    if mode == "prefix":
+        stats["skipped"] = len(files) - len(tasks)
+        results = _run_tasks(_transform_task,
+                             [(rel, os.path.join(src_root, rel), os.path.join(dst_root, rel)) for rel in tasks],
+                             workers)
+        for rel, digest, error in results:
+            if error is None:
+                files[rel]["hash"] = digest
+                stats["transformed"] += 1
+            else:
+                logging.error(f"Failed to transform {rel}: {error}")
+                del files[rel]
+                stats["failed"] += 1
+        table_mapping = None
+    else:
+        # 第 1 段階: 変更されたファイルだけシンボルを集計し直す
+        results = _run_tasks(_collect_task, [(rel, os.path.join(src_root, rel), internal_modules)
+                                             for rel in tasks], workers)
+        for rel, digest, summary, error in results:
+            if error is None:
+                files[rel].update(hash=digest, symbols=summary, rename=None)
+            else:
+                logging.error(f"Failed to transform {rel}: {error}")
+                del files[rel]
+                stats["failed"] += 1
+        table = NameTable(manifest.get("table")) if manifest.get("table") else None
+        names_map, attrs_map, table = build_rename_maps([entry["symbols"] for entry in files.values()], table)
+        table_mapping = table.mapping
+        # 第 2 段階: 内容か、そのファイルに関係する名前の対応が変わったファイルを書き換える
+        rename_tasks = []
+        for rel, entry in files.items():
+            names = entry["symbols"]["counts"]
+            digest = _rename_digest(names, names_map, attrs_map)
+            if entry.get("rename") == digest:
+                stats["skipped"] += 1
+                continue
+            entry["rename"] = digest
+            rename_tasks.append((rel, os.path.join(src_root, rel), os.path.join(dst_root, rel),
+                                 {n: names_map[n] for n in names if n in names_map},
+                                 {n: attrs_map[n] for n in names if n in attrs_map},
+                                 internal_modules))
+        for rel, error in _run_tasks(_rename_task, rename_tasks, workers):
+            if error is None:
+                stats["transformed"] += 1
+            else:
+                logging.error(f"Failed to transform {rel}: {error}")
+                del files[rel]
+                stats["failed"] += 1
+
+    _remove_stale_outputs(previous, files, src_root, dst_root, stats)
+    os.makedirs(dst_root, exist_ok=True)
+    manifest = {"version": TRANSFORMER_VERSION, "mode": mode, "key": key, "files": files}
+    if table_mapping is not None:
+        manifest["table"] = table_mapping
+    _write_atomic(manifest_path, json.dumps(manifest, sort_keys=True))
+    logging.info(f"AST transformation of {src_root} -> {dst_root}: {stats}")
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Python ソースの名前を難読化する")
+    parser.add_argument("source", help="変換するファイル、またはディレクトリ（バッチモード）")
+    parser.add_argument("-o", "--output",
+                        help="出力先（既定: ファイルなら transformed_<名前>、ディレクトリなら <名前>_transformed）")
+    parser.add_argument("--mode", choices=MODES, default="prefix",
+                        help="prefix: 名前に obf_ を付ける / compact: シンボル表に基づき短い名前に置き換える")
+    parser.add_argument("--workers", type=int, help="バッチモードのプロセス数（既定: CPU 数）")
+    parser.add_argument("--no-cache", action="store_true", help="キャッシュを使わず全ファイルを変換し直す")
+    args = parser.parse_args(argv)
+
+    source_file = args.source
+    if os.path.isdir(source_file):
+        output_dir = args.output or source_file.rstrip(os.sep) + "_transformed"
+        stats = transform_tree(source_file, output_dir, args.workers, use_cache=not args.no_cache, mode=args.mode)
+        if stats["failed"]:
+            sys.exit(1)
+        return
 
-    source_file = sys.argv[1]
     try:
         with open(source_file, "r", encoding="utf-8") as f:
             source_code = f.read()
@@ -55,9 +841,10 @@ def main():
         logging.error(f"Failed to read source file {source_file}: {e}")
         sys.exit(1)
 
-    transformed_code = transform_code(source_code)
+    transformed_code = transform_code(source_code, args.mode)
     if transformed_code is not None:
-        output_file = f"transformed_{source_file}"
+        directory, name = os.path.split(source_file)
+        output_file = args.output or os.path.join(directory, f"transformed_{name}")
         try:
             with open(output_file, "w", encoding="utf-8") as f:
                 f.write(transformed_code)
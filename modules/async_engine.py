@@ -0,0 +1,128 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from interfaces import IParser, IAnalysis
+from metrics import stage, record_metrics
+
+# 多数のファイルを、拡張子に対応するパーサーの aparse() と全解析の aanalyze() に並行して流す asyncio エンジン。
+# 同時に処理するファイル数を concurrency で制限する。同期プラグインは IParser / IAnalysis のデフォルトの
+# アダプターで既定の executor（スレッド）上で動くため、run() は executor のスレッド数も concurrency に合わせる。
+DEFAULT_CONCURRENCY = 16
+
+# data は keep_data=True のときだけ保持する（大量のファイルでメモリを使い切らないため）
+FileResult = namedtuple("FileResult", ["path", "rows", "results", "error", "duration_s", "data"])
+
+def collect_plugins(modules):
+    """
+    プラグインモジュール（PluginManager.plugins の値など）から IParser / IAnalysis の実装を探して生成し、
+    (拡張子 -> パーサー, 名前 -> 解析) を返す。
+    """
+    parsers, analyses = {}, {}
+    for module in modules:
+        for obj in vars(module).values():
+            if not isinstance(obj, type) or obj.__module__ != module.__name__:
+                continue
+            if issubclass(obj, IParser) and obj is not IParser:
+                parser = obj()
+                for ext in parser.supported_extensions():
+                    parsers[ext.lower()] = parser
+            elif issubclass(obj, IAnalysis) and obj is not IAnalysis:
+                analyses[getattr(module, "PLUGIN_NAME", obj.__name__)] = obj()
+    return parsers, analyses
+
+class AsyncEngine:
+    def __init__(self, parsers, analyses=None, concurrency=DEFAULT_CONCURRENCY, analysis_kwargs=None,
+                 encoding="utf-8", keep_data=False):
+        """
+        parsers: 拡張子（".csv" など）-> IParser、または IParser のリスト（supported_extensions() で対応付ける）
+        analyses: 名前 -> IAnalysis。analysis_kwargs: 名前 -> aanalyze() に渡すキーワード引数
+        """
+        if not isinstance(parsers, dict):
+            parsers = {ext.lower(): p for p in parsers for ext in p.supported_extensions()}
+        self.parsers = {ext.lower(): p for ext, p in parsers.items()}
+        self.analyses = dict(analyses or {})
+        self.analysis_kwargs = analysis_kwargs or {}
+        self.concurrency = max(1, concurrency)
+        self.encoding = encoding
+        self.keep_data = keep_data
+
+    def parser_for(self, path):
+        return self.parsers.get(os.path.splitext(path)[1].lower())
+
+    async def process_file(self, path, semaphore):
+        """1 ファイルをパースし、全解析を並行に実行する。失敗はエラーメッセージとして結果に入れる"""
+        async with semaphore:
+            start = time.perf_counter()
+            parser = self.parser_for(path)
+            if parser is None:
+                return FileResult(path, 0, {}, f"no parser for {os.path.splitext(path)[1] or path}", 0.0, None)
+            try:
+                data = await parser.aparse(path, self.encoding)
+                names = list(self.analyses)
+                outcomes = await asyncio.gather(
+                    *(self.analyses[name].aanalyze(data, **self.analysis_kwargs.get(name, {})) for name in names),
+                    return_exceptions=True)
+            except Exception as e:
+                logging.error(f"Async processing failed for {path}: {e}")
+                return FileResult(path, 0, {}, str(e), time.perf_counter() - start, None)
+            results, errors = {}, []
+            for name, outcome in zip(names, outcomes):
+                if isinstance(outcome, Exception):
+                    logging.error(f"Analysis {name} failed for {path}: {outcome}")
+                    errors.append(f"{name}: {outcome}")
+                else:
+                    results[name] = outcome
+            return FileResult(path, len(data), results, "; ".join(errors) or None, time.perf_counter() - start,
+                              data if self.keep_data else None)
+
+    async def arun(self, paths):
+        """paths を並行に処理し、入力と同じ順序の FileResult のリストを返す"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        return await asyncio.gather(*(self.process_file(path, semaphore) for path in paths))
+
+    def run(self, paths):
+        """
+        新しいイベントループで arun() を実行する。同期プラグインが concurrency 件まで同時に動けるよう、
+        既定の executor を concurrency スレッドのプールにする（標準の既定は CPU 数 + 4 で頭打ちになる）。
+        """
+        paths = list(paths)
+
+        async def main():
+            executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="async-engine")
+            asyncio.get_running_loop().set_default_executor(executor)
+            return await self.arun(paths)
+
+        with stage("engine.run", files=len(paths), concurrency=self.concurrency):
+            results = asyncio.run(main())
+            record_metrics(rows=sum(r.rows for r in results), failed=sum(1 for r in results if r.error))
+        return results
+
+def main(argv=None):
+    from plugin_manager import PluginManager
+
+    parser = argparse.ArgumentParser(description="プラグインのパーサーと解析で多数のファイルを並行に処理する")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--plugins", default="plugins", help="プラグインのディレクトリ")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--encoding", default="utf-8")
+    args = parser.parse_args(argv)
+
+    manager = PluginManager()
+    manager.load_plugins_from_directory(args.plugins)
+    parsers, analyses = collect_plugins(manager.plugins.values())
+    engine = AsyncEngine(parsers, analyses, concurrency=args.concurrency, encoding=args.encoding)
+    start = time.perf_counter()
+    results = engine.run(args.files)
+    for result in results:
+        status = f"エラー: {result.error}" if result.error else f"{len(result.results)} 件の解析"
+        print(f"{result.path}: {result.rows} 行, {status} ({result.duration_s * 1000:.1f} ms)")
+    print(f"{len(results)} ファイルを {time.perf_counter() - start:.2f} 秒で処理しました。")
+    return 1 if any(r.error for r in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+import os
+import ast
+import sys
+import json
+import hashlib
+import logging
+import tempfile
+import subprocess
+import importlib.util
+import xml.etree.ElementTree as ET
+
+# テストファイルごとに「import を辿って読み込みうるリポジトリ内のファイル」とその内容ハッシュを記録し、
+# 前回成功したテストのうち、依存ファイルが変わっていないものは再実行しない（テスト影響キャッシュ）。
+CACHE_VERSION = 1
+DEFAULT_CACHE_FILE = ".test_impact_cache.json"
+DEFAULT_TEST_DIR = "test"
+TEST_PATTERN_PREFIX = "test_"
+# これらが変わると全テストの結果に影響しうるため、全件を再実行する
+GLOBAL_DEPENDENCIES = ("requirements.txt", "config.json", "conftest.py", "pytest.ini", "setup.cfg", "pyproject.toml")
+_SKIP_DIRS = {"__pycache__", ".git", ".pytest_cache", ".venv", "venv", "modules.bak"}
+
+def discover_tests(test_dir=DEFAULT_TEST_DIR):
+    """test_dir 直下の test_*.py（statistical_test_analyzer.py のような非テストは含めない）"""
+    if not os.path.isdir(test_dir):
+        return []
+    return sorted(os.path.join(test_dir, name) for name in os.listdir(test_dir)
+                  if name.startswith(TEST_PATTERN_PREFIX) and name.endswith(".py"))
+
+def _search_roots(root):
+    """import の解決に使うディレクトリ: リポジトリ直下と、.py を含む直下のディレクトリ（modules, plugins など）"""
+    roots = [root]
+    for entry in sorted(os.listdir(root)):
+        path = os.path.join(root, entry)
+        if entry in _SKIP_DIRS or entry.startswith(".") or not os.path.isdir(path):
+            continue
+        if any(name.endswith(".py") for name in os.listdir(path)):
+            roots.append(path)
+    return roots
+
+def _resolve_module(name, roots):
+    """モジュール名をリポジトリ内のファイルに対応させる（見つからなければ外部モジュールとして None）"""
+    parts = name.split(".")
+    for base in roots:
+        path = os.path.join(base, *parts)
+        if os.path.isfile(path + ".py"):
+            return path + ".py"
+        init = os.path.join(path, "__init__.py")
+        if os.path.isfile(init):
+            return init
+    return None
+
+def _resolve_imports(tree, path, local_roots):
+    """tree の import 文が指すリポジトリ内のファイル"""
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                parts = alias.name.split(".")
+                for i in range(len(parts), 0, -1):
+                    found = _resolve_module(".".join(parts[:i]), local_roots)
+                    if found:
+                        yield found
+                        break
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base = os.path.dirname(path)
+                for _ in range(node.level - 1):
+                    base = os.path.dirname(base)
+                prefix = [base]
+            else:
+                prefix = local_roots
+            module = node.module or ""
+            for alias in node.names:
+                # from pkg import mod はサブモジュールのこともあるため両方を試す
+                for candidate in (f"{module}.{alias.name}".strip("."), module):
+                    if candidate:
+                        found = _resolve_module(candidate, prefix)
+                        if found:
+                            yield found
+                            break
+
+def _inline_scripts(tree):
+    """
+    [sys.executable, "-c", "import main; ..."] のように別プロセスで実行するコード文字列。
+    コードを変数に入れてから渡す場合（script = "..."; [..., "-c", script]）も辿る
+    """
+    strings = {}
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name)
+                and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)):
+            strings[node.targets[0].id] = node.value.value
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.List, ast.Tuple)):
+            continue
+        for flag, code in zip(node.elts, node.elts[1:]):
+            if not (isinstance(flag, ast.Constant) and flag.value == "-c"):
+                continue
+            if isinstance(code, ast.Constant) and isinstance(code.value, str):
+                source = code.value
+            elif isinstance(code, ast.Name) and code.id in strings:
+                source = strings[code.id]
+            else:
+                continue
+            try:
+                yield ast.parse(source)
+            except SyntaxError:
+                continue
+
+def _scan_file(path, root, roots):
+    """
+    path が import するリポジトリ内のファイルと、文字列で参照するリポジトリ内のディレクトリを返す。
+    python -c で別プロセスに渡すコードの import も辿る（main.py を別プロセスで読み込むテストなど）。
+    """
+    with open(path, "rb") as f:
+        tree = ast.parse(f.read(), filename=path)
+    local_roots = [os.path.dirname(path)] + roots
+    directories = []
+    # 呼び出しの引数に現れるディレクトリ名（os.path.join(ROOT, "plugins") など）。
+    # ただし sys.path.insert(0, ".../modules") は import 先の追加であり、ディレクトリの読み込みではない
+    call_args, path_args = set(), set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            func = node.func
+            if (isinstance(func, ast.Attribute) and func.attr in ("insert", "append")
+                    and ast.unparse(func.value) == "sys.path"):
+                path_args.update(id(arg) for arg in ast.walk(node))
+            else:
+                call_args.update(id(arg) for arg in node.args)
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Constant) and isinstance(node.value, str) and node.value.isidentifier()
+                and id(node) in call_args and id(node) not in path_args):
+            # PluginManager のようにディレクトリ内のファイルを読み込む場合
+            candidate = os.path.join(root, node.value)
+            if node.value not in _SKIP_DIRS and os.path.isdir(candidate):
+                directories.append(candidate)
+    yield from _resolve_imports(tree, path, local_roots)
+    for script in _inline_scripts(tree):
+        # 別プロセスの作業ディレクトリは分からないため、リポジトリ直下などの検索パスで解決する
+        yield from _resolve_imports(script, path, local_roots)
+    for directory in directories:
+        for entry in sorted(os.listdir(directory)):
+            if entry.endswith(".py"):
+                yield os.path.join(directory, entry)
+
+def import_closure(path, root="."):
+    """path から import を辿って到達するリポジトリ内の .py ファイル（path 自身を含む）の相対パス集合"""
+    root = os.path.abspath(root)
+    roots = _search_roots(root)
+    seen = set()
+    stack = [os.path.abspath(path)]
+    while stack:
+        current = stack.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        try:
+            stack.extend(found for found in _scan_file(current, root, roots) if found not in seen)
+        except (OSError, SyntaxError, ValueError) as e:
+            logging.debug(f"Skipping imports of {current}: {e}")
+    return {os.path.relpath(p, root) for p in seen}
+
+class ImpactCache:
+    """
+    テストファイル -> {"deps": {依存ファイル: [サイズ, mtime_ns, ハッシュ]}, "passed": bool} を JSON で保持する。
+    依存ファイルのサイズと mtime が同じならハッシュは計算し直さない。
+    """
+    def __init__(self, path=DEFAULT_CACHE_FILE, root="."):
+        self.path = path
+        self.root = os.path.abspath(root)
+        self.tests = {}
+        self._hashes = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION and data.get("python") == sys.version:
+                self.tests = data.get("tests", {})
+        except (OSError, ValueError):
+            pass
+
+    def _fingerprint(self, rel, previous=None):
+        path = os.path.join(self.root, rel)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if previous and previous[0] == st.st_size and previous[1] == st.st_mtime_ns:
+            return previous
+        digest = self._hashes.get(rel)
+        if digest is None:
+            with open(path, "rb") as f:
+                digest = self._hashes[rel] = hashlib.sha256(f.read()).hexdigest()
+        return [st.st_size, st.st_mtime_ns, digest]
+
+    def _unchanged(self, rel, previous):
+        current = self._fingerprint(rel, previous)
+        return current is not None and (current is previous or current[2] == previous[2])
+
+    def is_affected(self, test, global_deps=()):
+        """前回成功しておらず、または依存ファイル（global_deps を含む）が変わっていれば True"""
+        entry = self.tests.get(test)
+        if entry is None or not entry.get("passed"):
+            return True
+        deps = entry["deps"]
+        for rel in global_deps:
+            if (rel in deps) != os.path.exists(os.path.join(self.root, rel)):
+                return True
+        return not all(self._unchanged(rel, fp) for rel, fp in deps.items())
+
+    def record(self, test, deps, passed):
+        old = self.tests.get(test, {}).get("deps", {})
+        fingerprints = {}
+        for rel in sorted(deps):
+            fp = self._fingerprint(rel, old.get(rel))
+            if fp is not None:
+                fingerprints[rel] = fp
+        self.tests[test] = {"deps": fingerprints, "passed": bool(passed)}
+
+    def prune(self, tests):
+        """削除されたテストの記録を消す"""
+        for test in set(self.tests) - set(tests):
+            del self.tests[test]
+
+    def save(self):
+        data = {"version": CACHE_VERSION, "python": sys.version, "tests": self.tests}
+        tmp = f"{self.path}.tmp-{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, sort_keys=True)
+        os.replace(tmp, self.path)
+
+def select_tests(tests, cache, root=".", full=False):
+    """(再実行が必要なテスト, そのテスト -> 依存ファイル集合) を返す。full なら全件を選ぶ"""
+    global_deps = [rel for rel in GLOBAL_DEPENDENCIES if os.path.exists(os.path.join(root, rel))]
+    affected, closures = [], {}
+    for test in tests:
+        if full or cache.is_affected(test, GLOBAL_DEPENDENCIES):
+            affected.append(test)
+            closures[test] = import_closure(os.path.join(root, test), root) | set(global_deps)
+    return affected, closures
+
+def xdist_available() -> bool:
+    return importlib.util.find_spec("xdist") is not None
+
+def _failed_files(junit_path, tests):
+    """JUnit XML から失敗・エラーのあったテストファイルを求める"""
+    failed = set()
+    by_module = {os.path.splitext(t)[0].replace(os.sep, "."): t for t in tests}
+    root = ET.parse(junit_path).getroot()
+    for case in root.iter("testcase"):
+        if case.find("failure") is None and case.find("error") is None:
+            continue
+        path = case.get("file")
+        if path and os.path.normpath(path) in tests:
+            failed.add(os.path.normpath(path))
+            continue
+        classname = case.get("classname", "")
+        matched = [t for module, t in by_module.items() if classname == module or classname.startswith(module + ".")]
+        if not matched:
+            return set(tests)  # どのファイルの失敗か分からなければ全件を失敗扱いにする
+        failed.update(matched)
+    return failed
+
+def run_pytest(tests, workers=None, cwd=None, timeout=None):
+    """
+    pytest でテストを実行し、(成功したか, 失敗したテストファイルの集合, 出力) を返す。
+    pytest-xdist があり 2 ファイル以上なら、ファイル単位で workers 個のプロセスに分散する。
+    timeout 秒を超えたら打ち切り、全件を失敗として扱う。
+    """
+    tests = [os.path.normpath(t) for t in tests]
+    fd, junit_path = tempfile.mkstemp(suffix=".xml", prefix="test_impact_")
+    os.close(fd)
+    command = [sys.executable, "-m", "pytest", "-q", "-o", "junit_family=xunit1", f"--junitxml={junit_path}"]
+    if workers is None:
+        workers = min(len(tests), os.cpu_count() or 1)
+    if xdist_available() and workers > 1 and len(tests) > 1:
+        command += ["-n", str(workers), "--dist", "loadfile"]
+    command += tests
+    try:
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, encoding="utf-8", cwd=cwd,
+                                    timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return False, set(tests), f"pytest timed out after {timeout:.1f}s"
+        output = (result.stdout or "") + (result.stderr or "")
+        try:
+            failed = _failed_files(junit_path, tests) if result.returncode else set()
+        except (OSError, ET.ParseError):
+            failed = set(tests)
+        if result.returncode not in (0, 5) and not failed:
+            failed = set(tests)  # 収集エラーや中断
+        return result.returncode in (0, 5), failed, output
+    finally:
+        try:
+            os.remove(junit_path)
+        except OSError:
+            pass
+
+def run_impacted_tests(test_dir=DEFAULT_TEST_DIR, cache_file=DEFAULT_CACHE_FILE, full=False, workers=None,
+                       root=".", timeout=None):
+    """
+    影響を受けるテストだけを実行し、結果をキャッシュに記録する。
+    戻り値は {"selected": [...], "skipped": [...], "failed": [...], "ok": bool, "output": str}。
+    """
+    tests = [os.path.relpath(t, root) for t in discover_tests(os.path.join(root, test_dir))]
+    cache = ImpactCache(os.path.join(root, cache_file), root)
+    affected, closures = select_tests(tests, cache, root, full)
+    report = {"selected": affected, "skipped": [t for t in tests if t not in affected], "failed": [],
+              "ok": True, "output": ""}
+    if affected:
+        ok, failed, output = run_pytest(affected, workers, cwd=root, timeout=timeout)
+        report.update(ok=ok, failed=sorted(failed), output=output)
+        for test in affected:
+            cache.record(test, closures[test], passed=test not in failed)
+    cache.prune(tests)
+    try:
+        cache.save()
+    except OSError as e:
+        logging.warning(f"Failed to save test impact cache {cache_file}: {e}")
+    return report
@@ -1,18 +1,56 @@
 import os
 import logging
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from sklearn.cluster import KMeans
+from result_store import ResultStore, check_result_store, save_to_result_store
+from analysis_cache import memoize_analysis
+from metrics import timed, record_metrics
+from profiling import profiled
+from columnar_io import read_frame
 
-def analyze_clustering(csv_file="sample_clustering.csv", output_image="clustering_analysis.png", n_clusters=3):
+def fit_clustering(X, n_clusters=3):
+    """X（n×2 の配列）を KMeans でクラスタリングし、(結果の辞書, 各点のラベル) を返す"""
+    kmeans = KMeans(n_clusters=n_clusters, random_state=42)
+    kmeans.fit(X)
+    logging.info(f"KMeans clustering completed with inertia: {kmeans.inertia_:.3f}")
+    result = {"inertia": float(kmeans.inertia_), "centers": kmeans.cluster_centers_.tolist(), "n_clusters": n_clusters}
+    return result, kmeans.labels_
+
+def plot_clustering(X, labels, centers, output_image):
+    """クラスタリング結果と中心点の散布図を output_image に保存する"""
+    centers = np.asarray(centers)
+    plt.figure(figsize=(8, 6))
+    plt.scatter(X[:, 0], X[:, 1], c=labels, cmap='viridis', marker='o', label='Data Points')
+    plt.scatter(centers[:, 0], centers[:, 1], c='red', marker='X', s=200, label='Cluster Centers')
+    plt.xlabel("X")
+    plt.ylabel("Y")
+    plt.title("KMeans Clustering Analysis")
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(output_image)
+    plt.close()
+    logging.info(f"Clustering analysis plot saved as '{output_image}'")
+
+@timed("analyze.clustering", input_arg="csv_file")
+@memoize_analysis("clustering", artifact_args=("output_image",))
+@profiled("analyze.clustering")
+def analyze_clustering(csv_file="sample_clustering.csv", output_image="clustering_analysis.png", n_clusters=3,
+                       store=None):
     """
     sample_clustering.csv は 'x' と 'y' の列を持つ2次元データが含まれていることを前提とします。
     KMeansクラスタリングを実施し、クラスタリング結果と中心点を画像（散布図）として出力します。
+    store (ResultStore) を渡すと保存済みの結果があればそれを返し、なければ計算結果を保存します。
     """
+    params = {"n_clusters": n_clusters}
+    fingerprint, cached = check_result_store(store, "clustering", csv_file, params, output_image)
+    if cached is not None:
+        return cached
+
     try:
-        data = pd.read_csv(csv_file)
+        data = read_frame(csv_file, columns=["x", "y"])
         logging.info(f"CSV file '{csv_file}' loaded successfully.")
+        record_metrics(rows=len(data))
     except Exception as e:
         logging.error(f"Failed to read CSV file '{csv_file}': {e}")
         return
@@ -24,30 +62,19 @@ def analyze_clustering(csv_file="sample_clustering.csv", output_image="clusterin
     X = data[['x', 'y']].values
 
     try:
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-        kmeans.fit(X)
-        labels = kmeans.labels_
-        centers = kmeans.cluster_centers_
-        logging.info(f"KMeans clustering completed with inertia: {kmeans.inertia_:.3f}")
+        result, labels = fit_clustering(X, n_clusters)
     except Exception as e:
         logging.error(f"Error during clustering: {e}")
         return
 
     try:
-        plt.figure(figsize=(8, 6))
-        plt.scatter(X[:, 0], X[:, 1], c=labels, cmap='viridis', marker='o', label='Data Points')
-        plt.scatter(centers[:, 0], centers[:, 1], c='red', marker='X', s=200, label='Cluster Centers')
-        plt.xlabel("X")
-        plt.ylabel("Y")
-        plt.title("KMeans Clustering Analysis")
-        plt.legend()
-        plt.tight_layout()
-        plt.savefig(output_image)
-        plt.close()
-        logging.info(f"Clustering analysis plot saved as '{output_image}'")
+        plot_clustering(X, labels, result["centers"], output_image)
     except Exception as e:
         logging.error(f"Error generating clustering plot: {e}")
 
+    save_to_result_store(store, "clustering", fingerprint, params, result, csv_file, output_image)
+    return result
+
 def main():
     logging.basicConfig(
         level=logging.INFO,
@@ -55,7 +82,7 @@ def main():
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     logging.info("Starting Clustering Analyzer")
-    analyze_clustering()
+    analyze_clustering(store=ResultStore())
     logging.info("Clustering analysis completed.")
 
 if __name__ == "__main__":
@@ -0,0 +1,152 @@
+import os
+import sys
+import logging
+import argparse
+
+# CSV / JSON テキストの代わりに Parquet と Arrow IPC（Feather v2）で入出力する。
+# - read_frame() は拡張子で形式を選び、columns で必要な列だけを読む（CSV では usecols）
+# - filters（[(列, 演算子, 値), ...]）は Parquet / Arrow では読み込み時に適用し、行グループの統計で読み飛ばす。
+#   CSV では読んだ後に同じ条件で絞り込む
+# pyarrow は Parquet / Arrow を扱うときにだけ import する（未インストールでも CSV はこれまでどおり読める）。
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+ARROW_EXTENSIONS = (".arrow", ".feather", ".ipc")
+COLUMNAR_EXTENSIONS = PARQUET_EXTENSIONS + ARROW_EXTENSIONS
+DEFAULT_COMPRESSION = "zstd"
+DEFAULT_BATCH_SIZE = 64 * 1024
+
+_OPERATORS = {
+    "==": lambda s, v: s == v, "=": lambda s, v: s == v, "!=": lambda s, v: s != v,
+    "<": lambda s, v: s < v, "<=": lambda s, v: s <= v, ">": lambda s, v: s > v, ">=": lambda s, v: s >= v,
+    "in": lambda s, v: s.isin(list(v)), "not in": lambda s, v: ~s.isin(list(v)),
+}
+
+def require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("pyarrow is required for Parquet / Arrow files (pip install pyarrow)") from e
+    return pyarrow
+
+def is_columnar(path) -> bool:
+    return os.path.splitext(path)[1].lower() in COLUMNAR_EXTENSIONS
+
+def _format(path):
+    return "parquet" if os.path.splitext(path)[1].lower() in PARQUET_EXTENSIONS else "ipc"
+
+def _dataset(path):
+    require_pyarrow()
+    import pyarrow.dataset as ds
+    return ds.dataset(path, format=_format(path))
+
+def _projection(names, columns):
+    """columns のうちファイルにある列（ない列は無視し、解析側の列チェックに任せる）"""
+    return None if columns is None else [c for c in columns if c in names]
+
+def _expression(filters):
+    if not filters:
+        return None
+    import pyarrow.parquet as pq
+    return pq.filters_to_expression(filters)
+
+def read_table(path, columns=None, filters=None):
+    """Parquet / Arrow IPC ファイルを pyarrow.Table として読む（列の射影と述語の押し下げ付き）"""
+    dataset = _dataset(path)
+    return dataset.to_table(columns=_projection(dataset.schema.names, columns), filter=_expression(filters))
+
+def iter_batches(path, columns=None, filters=None, batch_size=DEFAULT_BATCH_SIZE):
+    """read_table() と同じ条件で pyarrow.RecordBatch を順に返す（ファイル全体をメモリに載せない）"""
+    dataset = _dataset(path)
+    yield from dataset.to_batches(columns=_projection(dataset.schema.names, columns), filter=_expression(filters),
+                                  batch_size=batch_size)
+
+def _filter_frame(frame, filters):
+    mask = None
+    for column, op, value in filters:
+        condition = _OPERATORS[op](frame[column], value)
+        mask = condition if mask is None else mask & condition
+    return frame[mask].reset_index(drop=True)
+
+def read_frame(path, columns=None, filters=None, parse_dates=None, index_col=None):
+    """
+    CSV / Parquet / Arrow IPC ファイルを pandas.DataFrame として読む。
+    columns: 読む列（None なら全列）。parse_dates: 日時に変換する列。index_col: インデックスにする列。
+    """
+    import pandas as pd
+    if is_columnar(path):
+        frame = read_table(path, columns, filters).to_pandas()
+        for column in parse_dates or ():
+            if column in frame.columns and not pd.api.types.is_datetime64_any_dtype(frame[column]):
+                frame[column] = pd.to_datetime(frame[column])
+    else:
+        wanted = None if columns is None else set(columns)
+        frame = pd.read_csv(path, usecols=None if wanted is None else (lambda c: c in wanted),
+                            parse_dates=list(parse_dates) if parse_dates else None)
+        if filters:
+            frame = _filter_frame(frame, filters)
+    # write_frame(index=True) で書いたファイルは to_pandas() の時点でインデックスが戻っている
+    if index_col is not None and frame.index.name != index_col:
+        frame = frame.set_index(index_col)
+    return frame
+
+def write_frame(frame, path, index=False, compression=DEFAULT_COMPRESSION):
+    """DataFrame を拡張子に応じて Parquet または Arrow IPC で書く"""
+    pa = require_pyarrow()
+    table = pa.Table.from_pandas(frame, preserve_index=index)
+    write_table(table, path, compression)
+
+def write_table(table, path, compression=DEFAULT_COMPRESSION):
+    require_pyarrow()
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    if _format(path) == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, tmp, compression=compression)
+    else:
+        import pyarrow.feather as feather
+        feather.write_feather(table, tmp, compression=compression)
+    os.replace(tmp, path)
+
+def write_results(results, path, compression=DEFAULT_COMPRESSION):
+    """
+    解析結果の辞書（1 件または複数）を 1 行 1 結果の列形式ファイルに書く。
+    列は全行のキーの和集合で、キーを持たない行は null になる（種類の違う解析の結果を 1 ファイルにまとめられる）。
+    """
+    pa = require_pyarrow()
+    rows = [results] if isinstance(results, dict) else list(results)
+    # from_pylist は先頭行のキーだけでスキーマを決めるため、全行に全列をそろえてから渡す
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    table = pa.Table.from_pylist([{key: row.get(key) for key in columns} for row in rows])
+    write_table(table, path, compression)
+
+def convert(src, dst, columns=None, compression=DEFAULT_COMPRESSION):
+    """CSV / Parquet / Arrow を別の形式に変換する。CSV はストリーミングで読む"""
+    pa = require_pyarrow()
+    if is_columnar(src):
+        table = read_table(src, columns)
+    else:
+        import pyarrow.csv as pacsv
+        options = pacsv.ConvertOptions(include_columns=columns) if columns else None
+        table = pacsv.read_csv(src, convert_options=options)
+    if is_columnar(dst):
+        write_table(table, dst, compression)
+    else:
+        import pyarrow.csv as pacsv
+        pacsv.write_csv(table, dst)
+    logging.info(f"Converted {src} -> {dst} ({table.num_rows} rows, {table.num_columns} columns)")
+    return table.num_rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CSV / Parquet / Arrow IPC を相互に変換する")
+    parser.add_argument("src")
+    parser.add_argument("dst")
+    parser.add_argument("--columns", help="カンマ区切りの列名（指定した列だけを書き出す）")
+    parser.add_argument("--compression", default=DEFAULT_COMPRESSION)
+    args = parser.parse_args(argv)
+    columns = args.columns.split(",") if args.columns else None
+    rows = convert(args.src, args.dst, columns, args.compression)
+    print(f"{args.src} -> {args.dst}: {rows} 行 ({os.path.getsize(args.src):,} -> {os.path.getsize(args.dst):,} バイト)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,115 @@
+import os
 import json
+import time
 import logging
+import threading
+from types import MappingProxyType
+from collections.abc import Mapping
 from interfaces import IConfigManager
 
+# config.json の既知キー: キー -> (型, 既定値)
+# 既定値が None のキーは、ファイルに無ければスナップショットにも含めない
+CONFIG_SCHEMA = {
+    "log_dir": (str, ""),
+    "log_level": (str, "INFO"),
+    "db_path": (str, "app.db"),
+    "plugin_dir": (str, "plugins"),
+    "private_log_file": (str, "private_app.log"),
+    "gist_id": (str, None),
+    "gist_files": (list, None),
+    "gist_command": (list, None),  # 既定は gh gist edit（modules/update_gist.py）
+    "gist_manifest": (str, ".gist_manifest.json"),
+    "gist_workers": (int, 4),
+    "gist_retries": (int, 3),
+    "gist_backoff": (float, 1.0),
+    "ts_period": (int, 12),
+    "profile": (bool, False),
+    "profile_memory": (bool, False),
+    "profile_dir": (str, "profiles"),
+    "analysis_cache_enabled": (bool, False),  # 解析結果のメモ化（modules/analysis_cache.py）
+    "analysis_cache_dir": (str, ".analysis_cache"),
+    "analysis_cache_max_bytes": (int, 256 * 1024 * 1024),
+    "workflow": (dict, None),  # main.py の非対話ポリシー（modules/workflow_policy.py の POLICY_SCHEMA）
+}
+
+def _coerce(value, expected_type):
+    if isinstance(value, expected_type) and not (expected_type is int and isinstance(value, bool)):
+        return value
+    if expected_type is bool and isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in ("1", "true", "yes", "on"):
+            return True
+        if lowered in ("0", "false", "no", "off"):
+            return False
+        raise ValueError(f"not a boolean: {value!r}")
+    if expected_type in (int, float, str):
+        return expected_type(value)
+    raise ValueError(f"expected {expected_type.__name__}, got {type(value).__name__}")
+
+def validate_config(raw: dict, schema: dict = CONFIG_SCHEMA) -> dict:
+    """
+    スキーマに従って型を検証・変換し、欠けているキーを既定値で補った辞書を返す。
+    変換できない値はエラーをログに出して既定値を使う。スキーマにないキーはそのまま残す。
+    """
+    if not isinstance(raw, dict):
+        raise ValueError("config root must be a JSON object")
+    validated = dict(raw)
+    for key, (expected_type, default) in schema.items():
+        if key not in raw:
+            if default is not None:
+                validated[key] = default
+            continue
+        try:
+            validated[key] = _coerce(raw[key], expected_type)
+        except (TypeError, ValueError) as e:
+            logging.error(f"Invalid config value for '{key}': {e}. Using default {default!r}")
+            if default is None:
+                del validated[key]
+            else:
+                validated[key] = default
+    return validated
+
+class ConfigSnapshot(Mapping):
+    """検証済み設定の読み取り専用スナップショット。snapshot["ts_period"] / snapshot.ts_period で参照できる"""
+    __slots__ = ("_data", "path", "mtime_ns")
+
+    def __init__(self, data: dict, path: str = None, mtime_ns: int = None):
+        object.__setattr__(self, "_data", MappingProxyType(dict(data)))
+        object.__setattr__(self, "path", path)
+        object.__setattr__(self, "mtime_ns", mtime_ns)
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    def __getattr__(self, key):
+        if key.startswith("_"):
+            raise AttributeError(key)
+        try:
+            return self._data[key]
+        except KeyError:
+            raise AttributeError(key) from None
+
+    def __setattr__(self, key, value):
+        raise AttributeError("ConfigSnapshot is immutable")
+
+    def __repr__(self):
+        return f"ConfigSnapshot({dict(self._data)!r})"
+
 class ConfigManager(IConfigManager):
+    """
+    config.json を 1 回だけパースして ConfigSnapshot として保持するシングルトン。
+    get() は poll_interval 秒に 1 回だけファイルの mtime を確認し、変更があれば再読み込みする。
+    start_watching() を呼ぶとバックグラウンドスレッドが監視を引き受け、get() はファイルを見なくなる。
+    """
     _instance = None
 
     def __new__(cls, *args, **kwargs):
@@ -10,18 +117,123 @@ class ConfigManager(IConfigManager):
             cls._instance = super(ConfigManager, cls).__new__(cls)
         return cls._instance
 
-    def __init__(self):
-        self.config = {}
+    def __init__(self, poll_interval: float = 1.0):
+        if getattr(self, "_initialized", False):
+            return
+        self._initialized = True
+        self.poll_interval = poll_interval
+        self.path = None
+        self.config = ConfigSnapshot(validate_config({}))
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stop_event = threading.Event()
+
+    @property
+    def snapshot(self) -> ConfigSnapshot:
+        self._maybe_reload()
+        return self.config
 
     def load_config(self, path: str) -> None:
-        try:
-            with open(path, 'r', encoding='utf-8') as f:
-                self.config = json.load(f)
-            logging.info(f"Config loaded successfully from {path}")
-        except Exception as e:
-            logging.error(f"Failed to load config from {path}: {e}")
+        self.path = os.path.abspath(path)
+        self._reload(force=True)
+
+    def _reload(self, force: bool = False) -> bool:
+        """ファイルの mtime が変わっていれば読み込み直す。読み込んだら True"""
+        path = self.path
+        with self._lock:
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError as e:
+                if force:
+                    logging.warning(f"Could not load config file {path}: {e}. Using default settings.")
+                return False
+            if not force and mtime_ns == self.config.mtime_ns:
+                return False
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = validate_config(json.load(f))
+            except Exception as e:
+                # 編集途中の壊れたファイルなどは無視し、直前のスナップショットを使い続ける
+                logging.error(f"Failed to load config from {path}: {e}")
+                return False
+            self.config = ConfigSnapshot(data, path, mtime_ns)
+        logging.info(f"Config loaded successfully from {path}")
+        return True
+
+    def _maybe_reload(self):
+        if self.path is None or self._watcher is not None:
+            return
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.poll_interval
+            self._reload()
+
+    def reload(self) -> bool:
+        """mtime を確認して、変更があれば直ちに読み込み直す"""
+        if self.path is None:
+            return False
+        return self._reload()
+
+    def start_watching(self, interval: float = None) -> None:
+        """バックグラウンドスレッドで mtime をポーリングし、変更を自動で反映する"""
+        if self._watcher is not None:
+            return
+        interval = interval or self.poll_interval
+        self._stop_event.clear()
+
+        def watch():
+            while not self._stop_event.wait(interval):
+                if self.path is not None:
+                    self._reload()
+
+        self._watcher = threading.Thread(target=watch, name="ConfigWatcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        if self._watcher is not None:
+            self._stop_event.set()
+            self._watcher.join()
+            self._watcher = None
 
     def get(self, key: str, default=None):
+        self._maybe_reload()
         value = self.config.get(key, default)
-        logging.debug(f"Config get: key={key}, value={value}")
+        if logging.root.isEnabledFor(logging.DEBUG):
+            logging.debug("Config get: key=%s, value=%s", key, value)
         return value
+
+    def _get_typed(self, key, expected_type, default):
+        value = self.get(key, default)
+        if value is None or value is default:
+            return value
+        try:
+            return _coerce(value, expected_type)
+        except (TypeError, ValueError):
+            logging.warning(f"Config value for '{key}' is not {expected_type.__name__}: {value!r}")
+            return default
+
+    def get_str(self, key: str, default: str = None) -> str:
+        return self._get_typed(key, str, default)
+
+    def get_int(self, key: str, default: int = None) -> int:
+        return self._get_typed(key, int, default)
+
+    def get_float(self, key: str, default: float = None) -> float:
+        return self._get_typed(key, float, default)
+
+    def get_bool(self, key: str, default: bool = None) -> bool:
+        return self._get_typed(key, bool, default)
+
+    def get_list(self, key: str, default: list = None) -> list:
+        return self._get_typed(key, list, default)
+
+def get_config(path: str = "config.json") -> ConfigManager:
+    """
+    読み込み済みの ConfigManager を返す。まだ何も読み込んでいなければ path を読み込む。
+    各モジュールはこの関数経由で設定を参照する。
+    """
+    manager = ConfigManager()
+    if manager.path is None:
+        manager.load_config(path)
+    return manager
@@ -1,53 +1,226 @@
 import os
+import csv
+import heapq
 import logging
 import matplotlib.pyplot as plt
+from json_stream import iter_json_items
 
-def visualize_data_from_csv(csv_file="sample.csv", output_image="analysis_chart_csv.png"):
-    import csv
+# 集計モード:
+#   "raw"  : 従来どおり 1 行 1 本の棒グラフ（全行をメモリに保持）
+#   "bins" : id を数値とみなし、最大 max_bins 本のビンに集計
+#   "top"  : 集計値の上位 top_n 件のみを描画
+#   "auto" : raw_limit 行までは raw、それを超えたら bins（id が数値でなければ top）に切り替え
+VISUALIZE_MODES = ("auto", "raw", "bins", "top")
+AGGREGATIONS = ("sum", "mean", "count")
+
+def _metric(total, count, agg):
+    if agg == "sum":
+        return total
+    if agg == "mean":
+        return total / count if count else 0.0
+    return count
+
+def _to_number(key):
     try:
-        with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            ids = []
-            values = []
-            for row in reader:
-                # 'id' と 'value' が存在することを前提
-                ids.append(row.get("id"))
-                values.append(float(row.get("value", 0)))
-            if not ids or not values:
-                logging.warning(f"No data found in {csv_file} for visualization.")
-                return
-        plt.figure(figsize=(10, 6))
-        plt.bar(ids, values, color='skyblue')
+        return float(key)
+    except (TypeError, ValueError):
+        return None
+
+class _BinnedAggregator:
+    """
+    id を数値とみなし、sum/count をビンごとに 1 パスで集計する。
+    ビン数が max_bins を超えたらビン幅を倍にして隣接ビンを併合するため、
+    メモリ使用量は行数によらず O(max_bins) に収まる。
+    """
+    def __init__(self, max_bins=50):
+        self.max_bins = max(1, int(max_bins))
+        self.origin = None
+        self.width = 1.0
+        self.bins = {}  # ビン番号 -> [合計, 件数]
+        self.lo = None
+        self.hi = None
+
+    def add(self, key, value):
+        x = _to_number(key)
+        if x is None:
+            return False
+        if self.origin is None:
+            self.origin = x
+        idx = int((x - self.origin) // self.width)
+        stat = self.bins.get(idx)
+        if stat is None:
+            self.bins[idx] = [value, 1]
+            self.lo = idx if self.lo is None else min(self.lo, idx)
+            self.hi = idx if self.hi is None else max(self.hi, idx)
+            while self.hi - self.lo + 1 > self.max_bins:
+                self._merge()
+        else:
+            stat[0] += value
+            stat[1] += 1
+        return True
+
+    def _merge(self):
+        # ビン幅を倍にし、ビン番号 i を i // 2 に寄せる（負の番号も floor で正しく併合される）
+        merged = {}
+        for idx, (total, count) in self.bins.items():
+            stat = merged.setdefault(idx // 2, [0.0, 0])
+            stat[0] += total
+            stat[1] += count
+        self.bins = merged
+        self.width *= 2
+        self.lo //= 2
+        self.hi //= 2
+
+    def result(self, agg):
+        labels = []
+        values = []
+        for idx in sorted(self.bins):
+            total, count = self.bins[idx]
+            start = self.origin + idx * self.width
+            end = start + self.width
+            if float(start).is_integer() and float(self.width).is_integer():
+                labels.append(f"{int(start)}-{int(end) - 1}")
+            else:
+                labels.append(f"{start:g}-{end:g}")
+            values.append(_metric(total, count, agg))
+        return labels, values
+
+class _TopNAggregator:
+    """
+    キーごとの sum/count を保持し、上位 top_n 件を返す。
+    保持キー数が 2 * capacity を超えたら集計値の上位 capacity 件に刈り込むため、
+    メモリ使用量は O(capacity) に収まる（キーが一意な入力では結果は厳密）。
+    """
+    def __init__(self, top_n=20, agg="sum", capacity=None):
+        self.top_n = max(1, int(top_n))
+        self.agg = agg
+        self.capacity = capacity or max(self.top_n * 20, 1000)
+        self.stats = {}  # キー -> [合計, 件数]
+
+    def add(self, key, value):
+        stat = self.stats.get(key)
+        if stat is None:
+            if len(self.stats) >= 2 * self.capacity:
+                self._prune(self.capacity)
+            self.stats[key] = [value, 1]
+        else:
+            stat[0] += value
+            stat[1] += 1
+        return True
+
+    def _prune(self, size):
+        agg = self.agg
+        self.stats = dict(heapq.nlargest(size, self.stats.items(),
+                                         key=lambda kv: _metric(kv[1][0], kv[1][1], agg)))
+
+    def result(self, agg):
+        top = heapq.nlargest(self.top_n, self.stats.items(),
+                             key=lambda kv: _metric(kv[1][0], kv[1][1], agg))
+        labels = [str(key) for key, _ in top]
+        values = [_metric(total, count, agg) for _, (total, count) in top]
+        return labels, values
+
+def _aggregate(records, mode="auto", agg="sum", max_bins=50, top_n=20, raw_limit=1000):
+    """
+    (id, value) のイテレータを 1 パスで消費し、描画用の (labels, values, 実際のモード) を返す。
+    raw 以外のモードではメモリ使用量が行数に依存しない。
+    """
+    if mode not in VISUALIZE_MODES:
+        raise ValueError(f"Unknown visualization mode: {mode}")
+    if agg not in AGGREGATIONS:
+        raise ValueError(f"Unknown aggregation: {agg}")
+
+    raw = [] if mode in ("auto", "raw") else None
+    aggregator = None
+    if mode == "bins":
+        aggregator = _BinnedAggregator(max_bins)
+    elif mode == "top":
+        aggregator = _TopNAggregator(top_n, agg)
+    skipped = 0
+
+    for key, value in records:
+        if aggregator is None:
+            raw.append((key, value))
+            if mode == "auto" and len(raw) > raw_limit:
+                # 件数が多いので集計モードへ切り替え、バッファ済みの行を再投入する
+                if all(_to_number(k) is not None for k, _ in raw):
+                    aggregator, mode = _BinnedAggregator(max_bins), "bins"
+                else:
+                    aggregator, mode = _TopNAggregator(top_n, agg), "top"
+                for k, v in raw:
+                    aggregator.add(k, v)
+                raw = None
+            continue
+        if not aggregator.add(key, value):
+            skipped += 1
+
+    if skipped:
+        logging.warning("%d rows with non-numeric ids were skipped in '%s' mode.", skipped, mode)
+    if aggregator is None:
+        return [key for key, _ in raw], [value for _, value in raw], "raw"
+    labels, values = aggregator.result(agg)
+    return labels, values, mode
+
+def _render_bar_chart(labels, values, output_image, title, color, mode, agg):
+    plt.figure(figsize=(10, 6))
+    plt.bar([str(label) for label in labels], values, color=color)
+    if mode == "raw":
         plt.xlabel("ID")
         plt.ylabel("Value")
-        plt.title("CSV Data Visualization")
-        plt.tight_layout()
-        plt.savefig(output_image)
-        plt.close()
-        logging.info(f"CSV visualization saved as {output_image}")
+        plt.title(title)
+    else:
+        plt.xlabel("ID range" if mode == "bins" else "ID")
+        plt.ylabel(f"Value ({agg})")
+        plt.title(f"{title} ({mode}, {agg})")
+        plt.xticks(rotation=45, ha="right")
+    plt.tight_layout()
+    plt.savefig(output_image)
+    plt.close()
+
+def _iter_csv_records(csv_file):
+    with open(csv_file, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            # 'id' と 'value' が存在することを前提
+            yield row.get("id"), float(row.get("value", 0))
+
+def _iter_json_records(json_file):
+    for item in iter_json_items(json_file):
+        yield item.get("id"), float(item.get("value", 0))
+
+def visualize_data_from_csv(csv_file="sample.csv", output_image="analysis_chart_csv.png",
+                            mode="auto", agg="sum", max_bins=50, top_n=20, raw_limit=1000):
+    """
+    CSV ('id', 'value' 列) を 1 行ずつ読み込みながら集計し、棒グラフを output_image に保存する。
+    mode="auto" では raw_limit 行を超えた時点でビン集計（または上位 N 件集計）に切り替えるため、
+    大きな入力でもメモリ使用量と描画時間は一定に収まる。
+    """
+    try:
+        labels, values, used_mode = _aggregate(_iter_csv_records(csv_file), mode, agg,
+                                               max_bins, top_n, raw_limit)
+        if not labels or not values:
+            logging.warning(f"No data found in {csv_file} for visualization.")
+            return
+        _render_bar_chart(labels, values, output_image, "CSV Data Visualization",
+                          'skyblue', used_mode, agg)
+        logging.info(f"CSV visualization saved as {output_image} (mode={used_mode}, bars={len(labels)})")
     except Exception as e:
         logging.error(f"Error visualizing CSV data: {e}")
 
-def visualize_data_from_json(json_file="sample.json", output_image="analysis_chart_json.png"):
-    import json
+def visualize_data_from_json(json_file="sample.json", output_image="analysis_chart_json.png",
+                             mode="auto", agg="sum", max_bins=50, top_n=20, raw_limit=1000):
+    """
+    JSON ({"items": [{'id', 'value'}, ...]}) の items をストリーミングで読み込みながら集計し、
+    棒グラフを output_image に保存する。集計モードは visualize_data_from_csv と同じ。
+    """
     try:
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        items = data.get("items", [])
-        if not items:
+        labels, values, used_mode = _aggregate(_iter_json_records(json_file), mode, agg,
+                                               max_bins, top_n, raw_limit)
+        if not labels or not values:
             logging.warning(f"No items found in {json_file} for visualization.")
             return
-        ids = [item.get("id") for item in items]
-        values = [float(item.get("value", 0)) for item in items]
-        plt.figure(figsize=(10, 6))
-        plt.bar(ids, values, color='lightgreen')
-        plt.xlabel("ID")
-        plt.ylabel("Value")
-        plt.title("JSON Data Visualization")
-        plt.tight_layout()
-        plt.savefig(output_image)
-        plt.close()
-        logging.info(f"JSON visualization saved as {output_image}")
+        _render_bar_chart(labels, values, output_image, "JSON Data Visualization",
+                          'lightgreen', used_mode, agg)
+        logging.info(f"JSON visualization saved as {output_image} (mode={used_mode}, bars={len(labels)})")
     except Exception as e:
         logging.error(f"Error visualizing JSON data: {e}")
 
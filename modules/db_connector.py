@@ -1,45 +1,255 @@
 import sqlite3
 import logging
+import threading
+import weakref
+from itertools import chain, islice
+from contextlib import contextmanager
 from interfaces import IDBConnector
+from metrics import stage, record_metrics
+
+# 接続ごとに適用する PRAGMA（WAL で読み書きを並行させ、書き込みの fsync 回数を抑える）
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -20000,      # 負値は KiB 単位（約 20MB）
+    "mmap_size": 268435456,    # 256MB
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,      # ロック待ちはミリ秒単位でリトライする
+}
+
+# executemany 1 回（= 1 トランザクション）あたりの行数
+DEFAULT_BATCH_SIZE = 50000
+
+def _quote_identifier(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
 
 class DBConnector(IDBConnector):
-    def __init__(self):
-        self.connection = None
+    """
+    スレッドごとに専用の sqlite3 接続を割り当てる接続プール付きコネクタ。
+    同じインスタンスを複数スレッドから共有でき、各スレッドは初回アクセス時にプールから接続を取得する。
+    スレッドが終了すると接続はプールに戻され、別スレッドで再利用される。
+    """
+    def __init__(self, pragmas: dict = None, timeout: float = 30.0, cached_statements: int = 256):
+        self.db_path = None
+        self.pragmas = dict(DEFAULT_PRAGMAS)
+        if pragmas:
+            self.pragmas.update(pragmas)
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._idle = []
+        self._all = set()
+
+    @property
+    def connection(self):
+        """現在のスレッドに割り当てられた接続（未接続なら None）"""
+        if self.db_path is None:
+            return getattr(self._local, "connection", None)
+        return self._acquire()
 
     def connect(self, db_path: str):
         try:
-            self.connection = sqlite3.connect(db_path)
+            if self.db_path is not None and self.db_path != db_path:
+                self.close()
+            self.db_path = db_path
+            connection = self._acquire()
             logging.info(f"Connected to DB at {db_path}")
-            return self.connection
+            return connection
         except Exception as e:
             logging.error(f"DB connection failed for {db_path}: {e}")
             raise
 
+    def _open(self):
+        # 接続はプール経由でスレッド間を移動するため check_same_thread は無効にする
+        # （同時に使うのは常に 1 スレッドのみ）
+        # cached_statements は接続ごとのプリペアドステートメントキャッシュの大きさ
+        connection = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False,
+                                     cached_statements=self.cached_statements)
+        for name, value in self.pragmas.items():
+            connection.execute(f"PRAGMA {name}={value}").fetchall()
+        return connection
+
+    def _acquire(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            return connection
+        if self.db_path is None:
+            raise RuntimeError("DBConnector is not connected. Call connect(db_path) first.")
+        with self._lock:
+            connection = self._idle.pop() if self._idle else None
+        if connection is None:
+            connection = self._open()
+            with self._lock:
+                self._all.add(connection)
+            logging.debug("Opened pooled DB connection for thread %s", threading.current_thread().name)
+        self._local.connection = connection
+        # スレッドオブジェクトが破棄されたら接続をプールへ返却する
+        self._local.finalizer = weakref.finalize(threading.current_thread(),
+                                                 self._return_to_pool, connection)
+        return connection
+
+    def _return_to_pool(self, connection):
+        with self._lock:
+            if connection not in self._all:
+                return
+            try:
+                if connection.in_transaction:
+                    connection.rollback()
+            except sqlite3.Error:
+                self._all.discard(connection)
+                return
+            self._idle.append(connection)
+
+    def release(self) -> None:
+        """現在のスレッドの接続をプールへ返す（長寿命のワーカースレッドで処理が終わったときに使う）"""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            self._local.finalizer.detach()
+            self._local.connection = None
+            self._return_to_pool(connection)
+
     def execute(self, query: str, params: tuple = ()):
         try:
-            cursor = self.connection.cursor()
-            cursor.execute(query, params)
-            logging.debug(f"Executed query: {query} with params {params}")
+            with stage("db.execute", query=query[:80]):
+                cursor = self._acquire().execute(query, params)
+                if cursor.rowcount >= 0:
+                    record_metrics(rows=cursor.rowcount)
+            logging.debug("Executed query: %s with params %s", query, params)
             return cursor
         except Exception as e:
             logging.error(f"Query execution failed: {query}, params {params}: {e}")
             raise
 
+    def executemany(self, query: str, seq_of_params, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """
+        seq_of_params（リストでもイテレータでもよい）を batch_size 件ずつ executemany で実行する。
+        各バッチは 1 つの明示的なトランザクション内で実行され、ステートメントは 1 回だけ準備されて再利用される。
+        戻り値は実行した行数。
+        """
+        total = 0
+        try:
+            with stage("db.executemany", query=query[:80]):
+                for batch in _batched(seq_of_params, batch_size):
+                    with self.transaction() as connection:
+                        connection.executemany(query, batch)
+                    total += len(batch)
+                record_metrics(rows=total)
+            logging.debug("Executed many: %s (%d rows)", query, total)
+            return total
+        except Exception as e:
+            logging.error(f"Bulk execution failed after {total} rows: {query}: {e}")
+            raise
+
+    def bulk_insert(self, table: str, rows, columns: list = None,
+                    batch_size: int = DEFAULT_BATCH_SIZE, create_table: bool = True) -> int:
+        """
+        rows（辞書またはシーケンスのイテレータ）を table に一括挿入する。
+        columns 省略時は先頭行（辞書）のキーを列名とし、create_table=True ならテーブルがなければ作成する。
+        rows は 1 回しか走査しないため、パーサーのジェネレータをそのまま渡せる。
+        """
+        iterator = iter(rows)
+        first = next(iterator, None)
+        if first is None:
+            return 0
+        if columns is None:
+            if not isinstance(first, dict):
+                raise ValueError("columns must be given when rows are not dicts")
+            columns = list(first.keys())
+        quoted = ", ".join(_quote_identifier(c) for c in columns)
+        if create_table:
+            self.execute(f"CREATE TABLE IF NOT EXISTS {_quote_identifier(table)} ({quoted})")
+            self.commit()
+        placeholders = ", ".join("?" for _ in columns)
+        query = f"INSERT INTO {_quote_identifier(table)} ({quoted}) VALUES ({placeholders})"
+
+        def as_params():
+            for row in chain((first,), iterator):
+                if isinstance(row, dict):
+                    yield tuple(row.get(c) for c in columns)
+                else:
+                    yield tuple(row)
+
+        total = self.executemany(query, as_params(), batch_size)
+        logging.info(f"Bulk inserted {total} rows into {table}")
+        return total
+
+    def load_file(self, parser, file_path: str, table: str, encoding: str = 'utf-8',
+                  batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """
+        パーサープラグイン（IParser）の出力を、全件をリストに溜めずに table へストリーミング投入する。
+        """
+        return self.bulk_insert(table, parser.iter_parse(file_path, encoding), batch_size=batch_size)
+
     def commit(self) -> None:
-        if self.connection:
+        connection = getattr(self._local, "connection", None)
+        if connection:
             try:
-                self.connection.commit()
-                logging.info("DB commit successful")
+                with stage("db.commit"):
+                    connection.commit()
+                logging.debug("DB commit successful")
             except Exception as e:
                 logging.error(f"DB commit failed: {e}")
                 raise
 
-    def close(self) -> None:
-        if self.connection:
+    @contextmanager
+    def transaction(self, immediate: bool = True):
+        """
+        with db.transaction() as conn: の形で使う明示的なトランザクション。
+        immediate=True では BEGIN IMMEDIATE で最初に書き込みロックを取得し、
+        WAL 下での読み取り→書き込みへの昇格時に発生する "database is locked" を避ける。
+        例外時はロールバックする。
+        """
+        connection = self._acquire()
+        with stage("db.transaction", immediate=immediate):
+            if connection.in_transaction:
+                connection.commit()
+            connection.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
             try:
-                self.connection.close()
-                logging.info("DB connection closed")
-                self.connection = None
-            except Exception as e:
-                logging.error(f"Failed to close DB connection: {e}")
+                yield connection
+            except Exception:
+                connection.rollback()
                 raise
+            else:
+                connection.commit()
+
+    @contextmanager
+    def cursor(self):
+        """with db.cursor() as cur: の形で使い、終了時にカーソルを閉じる"""
+        cur = self._acquire().cursor()
+        try:
+            yield cur
+        finally:
+            cur.close()
+
+    def close(self) -> None:
+        with self._lock:
+            connections = list(self._all)
+            self._all.clear()
+            self._idle.clear()
+        self._local = threading.local()
+        self.db_path = None
+        if not connections:
+            return
+        try:
+            for connection in connections:
+                connection.close()
+            logging.info(f"DB connection closed ({len(connections)} pooled)")
+        except Exception as e:
+            logging.error(f"Failed to close DB connection: {e}")
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -1,35 +1,241 @@
+import time
 import logging
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# ライフタイム
+#   singleton: プロセスで 1 つ（最初の resolve で、ロックの下で 1 回だけ生成する）
+#   transient: resolve のたびに生成する
+#   thread:    スレッドごとに 1 つ
+#   scoped:    DIContainer.scope() の中で 1 つ（リクエスト単位。スコープを抜けると close() を呼ぶ）
+SINGLETON = "singleton"
+TRANSIENT = "transient"
+THREAD = "thread"
+SCOPED = "scoped"
+LIFETIMES = (SINGLETON, TRANSIENT, THREAD, SCOPED)
+
+_current_scope = contextvars.ContextVar("di_scope", default=None)
+
+class Scope:
+    """scoped なサービスのインスタンスを保持する。DIContainer.scope() で作る"""
+
+    def __init__(self):
+        self.instances = {}
+        self._order = []
+        self._lock = threading.Lock()
+
+    def get_or_create(self, interface, create):
+        try:
+            return self.instances[interface]
+        except KeyError:
+            pass
+        with self._lock:
+            if interface not in self.instances:
+                self.instances[interface] = create()
+                self._order.append(interface)
+            return self.instances[interface]
+
+    def close(self):
+        """生成と逆の順に close() を持つインスタンスを閉じる"""
+        for interface in reversed(self._order):
+            close = getattr(self.instances[interface], "close", None)
+            if callable(close):
+                try:
+                    close()
+                except Exception as e:
+                    logging.error(f"Failed to close scoped instance for {interface}: {e}")
+        self.instances.clear()
+        self._order.clear()
+
+class _Registration:
+    __slots__ = ("interface", "implementation", "lifetime", "lock", "instance", "fast",
+                 "resolutions", "constructions", "construct_time")
+
+    def __init__(self, interface, implementation, lifetime):
+        self.interface = interface
+        self.implementation = implementation
+        self.lifetime = lifetime
+        self.lock = threading.Lock()
+        self.instance = None
+        self.fast = None  # 統計を取らないときの解決関数
+        self.resolutions = 0
+        self.constructions = 0
+        self.construct_time = 0.0
 
 class DIContainer:
+    """
+    インターフェース -> 実装の登録と解決。登録時にライフタイムごとの解決関数を組み立てておき、
+    resolve() は辞書を 1 回引いてその関数を呼ぶだけにする（ログの整形もしない）。
+    生成済みの singleton は itertools.repeat(instance).__next__ に置き換えるので、以降は
+    Python の関数呼び出しも挟まない。ループ内では resolver() で解決関数を取り出して直接呼ぶとさらに速い。
+    """
     _services = {}
+    _resolvers = {}
+    _lock = threading.RLock()
+    _stats_lock = threading.Lock()
+    _collect_stats = False
 
     @classmethod
-    def register(cls, interface, implementation, *, singleton=True):
-        cls._services[interface] = {
-            'implementation': implementation,
-            'singleton': singleton,
-            'instance': None
-        }
-        logging.debug(f"Service registered for {interface} with singleton={singleton}")
+    def register(cls, interface, implementation, *, singleton=True, lifetime=None):
+        """
+        implementation がクラスなら引数なしで生成し、それ以外（インスタンスやファクトリでない値）はそのまま返す。
+        lifetime を省略すると singleton=True なら "singleton"、False なら "transient"。
+        """
+        lifetime = lifetime or (SINGLETON if singleton else TRANSIENT)
+        if lifetime not in LIFETIMES:
+            raise ValueError(f"Unknown lifetime {lifetime!r}. Expected one of {LIFETIMES}")
+        reg = _Registration(interface, implementation, lifetime)
+        with cls._lock:
+            cls._services[interface] = reg
+            cls._install(reg, cls._compile(reg))
+        logging.debug("Service registered for %s with lifetime=%s", interface, lifetime)
 
     @classmethod
     def resolve(cls, interface):
-        service = cls._services.get(interface)
-        if service is None:
+        try:
+            resolver = cls._resolvers[interface]
+        except KeyError:
             error_msg = f"Service for interface {interface} not registered."
             logging.error(error_msg)
-            raise ValueError(error_msg)
-        if service['singleton']:
-            if service['instance'] is None:
-                if isinstance(service['implementation'], type):
-                    service['instance'] = service['implementation']()
-                else:
-                    service['instance'] = service['implementation']
-                logging.debug(f"Created singleton instance for {interface}")
-            return service['instance']
+            raise ValueError(error_msg) from None
+        return resolver()
+
+    @classmethod
+    def resolver(cls, interface):
+        """interface の解決関数（引数なしで呼ぶとインスタンスを返す）。登録し直すと古い関数は使えない"""
+        cls.resolve(interface)  # 未登録ならここで ValueError、singleton なら生成して高速版に置き換える
+        return cls._resolvers[interface]
+
+    @classmethod
+    def is_registered(cls, interface) -> bool:
+        return interface in cls._resolvers
+
+    @classmethod
+    def unregister(cls, interface):
+        with cls._lock:
+            cls._services.pop(interface, None)
+            cls._resolvers.pop(interface, None)
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._services.clear()
+            cls._resolvers.clear()
+
+    @classmethod
+    @contextmanager
+    def scope(cls):
+        """scoped なサービスの有効範囲（リクエスト 1 件など）。contextvars なので asyncio のタスクごとにも分かれる"""
+        scope = Scope()
+        token = _current_scope.set(scope)
+        try:
+            yield scope
+        finally:
+            _current_scope.reset(token)
+            scope.close()
+
+    # ---- 統計 ----
+
+    @classmethod
+    def enable_stats(cls, enabled=True):
+        """resolve の回数を数えるかどうか（数えない間は解決関数に計数処理を入れない）"""
+        with cls._lock:
+            cls._collect_stats = enabled
+            for reg in cls._services.values():
+                cls._install(reg, reg.fast)
+
+    @classmethod
+    def stats(cls) -> dict:
+        """サービス名 -> {lifetime, resolutions, constructions, construct_time_s}"""
+        with cls._lock:
+            regs = list(cls._services.values())
+        return {
+            getattr(reg.interface, "__name__", repr(reg.interface)): {
+                "lifetime": reg.lifetime,
+                "resolutions": reg.resolutions,
+                "constructions": reg.constructions,
+                "construct_time_s": round(reg.construct_time, 6),
+            }
+            for reg in regs
+        }
+
+    @classmethod
+    def reset_stats(cls):
+        with cls._stats_lock:
+            for reg in cls._services.values():
+                reg.resolutions = reg.constructions = 0
+                reg.construct_time = 0.0
+
+    # ---- 解決関数の組み立て ----
+
+    @classmethod
+    def _install(cls, reg, fast):
+        """reg の解決関数を差し替える（統計を取るときは計数用の関数で包む）"""
+        reg.fast = fast
+        if cls._collect_stats:
+            stats_lock = cls._stats_lock
+
+            def counted():
+                with stats_lock:
+                    reg.resolutions += 1
+                return reg.fast()
+            cls._resolvers[reg.interface] = counted
         else:
-            if isinstance(service['implementation'], type):
-                logging.debug(f"Created new instance for {interface}")
-                return service['implementation']()
-            else:
-                return service['implementation']
+            cls._resolvers[reg.interface] = fast
+
+    @classmethod
+    def _construct(cls, reg):
+        implementation = reg.implementation
+        if not isinstance(implementation, type):
+            return implementation
+        start = time.perf_counter()
+        instance = implementation()
+        elapsed = time.perf_counter() - start
+        with cls._stats_lock:
+            reg.constructions += 1
+            reg.construct_time += elapsed
+        logging.debug("Created %s instance for %s in %.3f ms", reg.lifetime, reg.interface, elapsed * 1000)
+        return instance
+
+    @classmethod
+    def _compile(cls, reg):
+        construct = cls._construct
+
+        if reg.lifetime == TRANSIENT:
+            if not isinstance(reg.implementation, type):
+                return itertools.repeat(reg.implementation).__next__
+            return lambda: construct(reg)
+
+        if reg.lifetime == SINGLETON:
+            def resolve_singleton():
+                with reg.lock:
+                    # 複数スレッドが同時に来ても、生成するのは最初の 1 つだけ
+                    if reg.instance is None:
+                        reg.instance = construct(reg)
+                with cls._lock:
+                    if cls._services.get(reg.interface) is reg and reg.fast is resolve_singleton:
+                        cls._install(reg, itertools.repeat(reg.instance).__next__)
+                return reg.instance
+            return resolve_singleton
+
+        if reg.lifetime == THREAD:
+            local = threading.local()
+
+            def resolve_thread():
+                try:
+                    return local.instance
+                except AttributeError:
+                    local.instance = construct(reg)
+                    return local.instance
+            return resolve_thread
+
+        interface = reg.interface
+
+        def resolve_scoped():
+            scope = _current_scope.get()
+            if scope is None:
+                raise RuntimeError(f"Service for interface {interface} is scoped; resolve it inside DIContainer.scope().")
+            return scope.get_or_create(interface, lambda: construct(reg))
+        return resolve_scoped
@@ -0,0 +1,176 @@
+import os
+import shutil
+import subprocess
+from collections import namedtuple
+
+# main.py の後片付け（__pycache__ / desktop.ini / バックアップの削除）とファイル移動
+# （test を含む .py は test/ へ、それ以外の .py は modules/ へ）を、ツリーを 1 回だけ走査して
+# 「計画」（Action のリスト）にまとめ、まとめて実行する。dry_run なら計画を表示するだけ。
+
+# kind: "rmtree" / "remove" / "untrack"（git rm --cached）/ "mkdir" / "move" / "skip"（移動先が既にある）
+Action = namedtuple("Action", ["kind", "path", "dest", "group"])
+
+CLEANUP = "cleanup"
+MOVE_TESTS = "move_tests"
+MOVE_MODULES = "move_modules"
+ALL_GROUPS = (CLEANUP, MOVE_TESTS, MOVE_MODULES)
+
+BACKUP_DIRS = ("modules.bak",)
+BACKUP_FILES = ("config.json.bak",)
+KEEP_AT_ROOT = ("main.py", "config.json")
+# 走査しないディレクトリ（中身の判定が不要なもの）
+_PRUNE_DIRS = {".git", ".snapshots"}
+_GIT_ARG_CHUNK = 1000  # git ls-files に一度に渡すパス数（コマンドライン長の上限対策）
+
+def _is_test_file(name):
+    return name.endswith(".py") and "test" in name.lower()
+
+def _scan(root):
+    """
+    os.scandir でツリーを 1 回走査し、(直下のファイル名, modules 直下, modules.bak 直下,
+    __pycache__ ディレクトリ, desktop.ini) を返す。__pycache__ の中には入らない。
+    """
+    top_files, module_files, backup_files, pycache_dirs, desktop_ini = [], [], [], [], []
+    per_dir = {".": top_files, "modules": module_files, "modules.bak": backup_files}
+    stack = ["."]
+    while stack:
+        rel_dir = stack.pop()
+        listing = per_dir.get(rel_dir)
+        try:
+            with os.scandir(os.path.join(root, rel_dir)) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        for entry in entries:
+            rel = entry.name if rel_dir == "." else os.path.join(rel_dir, entry.name)
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name == "__pycache__":
+                    pycache_dirs.append(rel)
+                elif entry.name not in _PRUNE_DIRS:
+                    stack.append(rel)
+            elif entry.name.lower() == "desktop.ini":
+                desktop_ini.append(rel)
+            elif listing is not None and entry.is_file():
+                listing.append(entry.name)
+    return sorted(top_files), sorted(module_files), sorted(backup_files), sorted(pycache_dirs), sorted(desktop_ini)
+
+def tracked_files(paths, root="."):
+    """paths のうち git で追跡されているものを、git ls-files の一括呼び出しで求める"""
+    tracked = set()
+    paths = list(paths)
+    for i in range(0, len(paths), _GIT_ARG_CHUNK):
+        chunk = paths[i:i + _GIT_ARG_CHUNK]
+        try:
+            result = subprocess.run(["git", "ls-files", "-z", "--"] + chunk, cwd=root, capture_output=True,
+                                    text=True, encoding="utf-8")
+        except OSError:
+            return set()
+        if result.returncode != 0:
+            return set()
+        tracked.update(os.path.normpath(p) for p in result.stdout.split("\0") if p)
+    return tracked
+
+def plan_maintenance(root=".", groups=ALL_GROUPS):
+    """groups（cleanup / move_tests / move_modules）の処理を Action のリストにまとめる"""
+    top_files, module_files, backup_files, pycache_dirs, desktop_ini = _scan(root)
+    exists = lambda rel: os.path.exists(os.path.join(root, rel))
+    plan = []
+    removed_dirs = set()
+
+    if CLEANUP in groups:
+        for d in BACKUP_DIRS:
+            if exists(d):
+                plan.append(Action("rmtree", d, None, CLEANUP))
+                removed_dirs.add(d)
+        for f in BACKUP_FILES:
+            if exists(f):
+                plan.append(Action("remove", f, None, CLEANUP))
+        for d in pycache_dirs:
+            if not any(d.startswith(r + os.sep) for r in removed_dirs):
+                plan.append(Action("rmtree", d, None, CLEANUP))
+        tracked = tracked_files(desktop_ini, root) if desktop_ini else set()
+        for f in desktop_ini:
+            plan.append(Action("remove", f, None, CLEANUP))
+        for f in desktop_ini:
+            if f in tracked:
+                plan.append(Action("untrack", f, None, CLEANUP))
+
+    if MOVE_TESTS in groups:
+        if not os.path.isdir(os.path.join(root, "test")):
+            plan.append(Action("mkdir", "test", None, MOVE_TESTS))
+        sources = [(".", [f for f in top_files if f not in KEEP_AT_ROOT]), ("modules", module_files)]
+        if "modules.bak" not in removed_dirs:
+            sources.append(("modules.bak", backup_files))
+        for directory, names in sources:
+            for name in names:
+                if _is_test_file(name):
+                    src = name if directory == "." else os.path.join(directory, name)
+                    plan.append(Action("move", src, os.path.join("test", name), MOVE_TESTS))
+
+    if MOVE_MODULES in groups:
+        if not os.path.isdir(os.path.join(root, "modules")):
+            plan.append(Action("mkdir", "modules", None, MOVE_MODULES))
+        existing = set(module_files)
+        for name in top_files:
+            if name.endswith(".py") and name not in KEEP_AT_ROOT and not _is_test_file(name):
+                kind = "skip" if name in existing else "move"
+                plan.append(Action(kind, name, os.path.join("modules", name), MOVE_MODULES))
+    return plan
+
+def format_action(action):
+    if action.kind in ("rmtree", "remove"):
+        return f"削除: {action.path}"
+    if action.kind == "untrack":
+        return f"Git インデックスから除外: {action.path}"
+    if action.kind == "mkdir":
+        return f"作成: {action.path}/"
+    if action.kind == "skip":
+        return f"スキップ: {action.dest} が既に存在するため {action.path} は移動しない"
+    return f"移動: {action.path} -> {action.dest}"
+
+def format_plan(plan):
+    if not plan:
+        return "実行する処理はありません。"
+    return "\n".join(format_action(action) for action in plan)
+
+def execute_plan(plan, root=".", dry_run=False):
+    """
+    計画を実行し、失敗した Action のリストを返す。git rm --cached は最後に 1 回でまとめて実行する。
+    dry_run なら何もせず計画を表示する。
+    """
+    if dry_run:
+        print(format_plan(plan))
+        return []
+    failed = []
+    untrack = []
+    for action in plan:
+        path = os.path.join(root, action.path)
+        try:
+            if action.kind == "rmtree":
+                shutil.rmtree(path)
+                print(f"{action.path} を削除しました。")
+            elif action.kind == "remove":
+                os.remove(path)
+                print(f"{action.path} を削除しました。")
+            elif action.kind == "mkdir":
+                os.makedirs(path, exist_ok=True)
+                print(f"{action.path}/ フォルダを作成しました。")
+            elif action.kind == "move":
+                shutil.move(path, os.path.join(root, action.dest))
+                print(f"{action.path} を {action.dest} に移動しました。")
+            elif action.kind == "skip":
+                print(f"{action.dest} が既に存在します。{action.path} の移動をスキップします。")
+            elif action.kind == "untrack":
+                untrack.append(action)
+        except Exception as e:
+            print(f"{action.path} の処理中にエラーが発生しました: {e}")
+            failed.append(action)
+    if untrack:
+        try:
+            subprocess.run(["git", "rm", "--cached", "-f", "-q", "--"] + [a.path for a in untrack], cwd=root,
+                           check=True, text=True, encoding="utf-8")
+            print("Gitインデックスから desktop.ini ファイルを除外しました。")
+        except Exception as e:
+            print(f"Gitインデックスからの desktop.ini 除外に失敗: {e}")
+            failed.extend(untrack)
+    return failed
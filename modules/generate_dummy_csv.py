@@ -1,16 +1,12 @@
-import csv
+from generate_dummy_datasets import generate_dataset, DEFAULT_CHUNK_SIZE
 
-def generate_dummy_csv(filename="sample.csv", num_rows=10):
-    fieldnames = ['id', 'name', 'value']
-    data = [
-        {'id': i, 'name': f"Item_{i}", 'value': i * 10}
-        for i in range(1, num_rows + 1)
-    ]
-    with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for row in data:
-            writer.writerow(row)
+def generate_dummy_csv(filename="sample.csv", num_rows=10, shards=1, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    'id', 'name', 'value' 列のダミー CSV を生成する（value = id * 10）。
+    行はチャンク単位で書き出すため、行数が多くてもメモリ使用量は一定。
+    shards > 1 なら <名前>_00000.csv ... に分割して並列に生成する。
+    """
+    generate_dataset("items", filename, num_rows, shards=shards, workers=workers, chunk_size=chunk_size)
     print(f"Dummy CSV file '{filename}' generated with {num_rows} rows.")
 
 if __name__ == "__main__":
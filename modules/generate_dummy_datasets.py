@@ -0,0 +1,212 @@
+import os
+import math
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# 各解析モジュールが読む形式のダミーデータを生成する。
+# 行は NumPy でチャンク単位に生成し、書式文字列でまとめて整形してから追記するため、
+# メモリ使用量はチャンクサイズ程度で一定になる。shards > 1 なら複数ファイルを並列に生成する。
+
+DEFAULT_CHUNK_SIZE = 100_000
+LINE_END = "\r\n"  # csv モジュール（generate_dummy_csv の従来出力）と同じ改行
+DISTRIBUTIONS = ("normal", "uniform", "lognormal", "exponential")
+
+def sample(rng, dist, loc, scale, size):
+    """
+    平均 loc・標準偏差 scale になるよう標準化した分布から size 個の乱数を返す。
+    dist: normal / uniform / lognormal / exponential（後ろ 2 つは右に裾の長い分布）
+    """
+    if dist == "normal":
+        return rng.normal(loc, scale, size)
+    if dist == "uniform":
+        half = scale * math.sqrt(3.0)
+        return rng.uniform(loc - half, loc + half, size)
+    if dist == "lognormal":
+        mean, std = math.exp(0.5), math.sqrt((math.e - 1) * math.e)
+        return loc + scale * (rng.lognormal(0.0, 1.0, size) - mean) / std
+    if dist == "exponential":
+        return loc + scale * (rng.exponential(1.0, size) - 1.0)
+    raise ValueError(f"Unknown distribution: {dist} (choose from {', '.join(DISTRIBUTIONS)})")
+
+def _format_rows(template, columns):
+    """columns（同じ長さの配列のリスト）を行ごとに template で整形して 1 つの文字列にする"""
+    n = len(columns[0])
+    if n == 0:
+        return ""
+    flat = np.empty(n * len(columns), dtype=object)
+    for i, column in enumerate(columns):
+        flat[i::len(columns)] = column
+    return (template * n) % tuple(flat.tolist())
+
+def _group_labels(num_groups):
+    return np.array([chr(ord('A') + i % 26) + (str(i // 26) if i >= 26 else "") for i in range(num_groups)],
+                    dtype=object)
+
+# ---- スキーマごとのチャンク生成関数: (rng, 先頭行の通し番号, 行数, パラメータ) -> 整形済み文字列 ----
+
+def _items_chunk(rng, start, n, params):
+    ids = np.arange(start + 1, start + n + 1, dtype=np.int64)
+    return _format_rows("%d,Item_%d,%d" + LINE_END, [ids, ids, ids * 10])
+
+_ITEM_JSON = '    {\n      "id": %d,\n      "name": "Item_%d",\n      "value": %d\n    },\n'
+
+def _items_json_chunk(rng, start, n, params):
+    ids = np.arange(start + 1, start + n + 1, dtype=np.int64)
+    return _format_rows(_ITEM_JSON, [ids, ids, ids * 10])
+
+def _anova_chunk(rng, start, n, params):
+    num_groups = params.get("num_groups", 3)
+    g = (np.arange(start, start + n) % num_groups)
+    values = sample(rng, params.get("dist", "normal"), 0.0, params.get("noise", 1.5), n)
+    values += params.get("base", 10.0) + params.get("group_step", 2.0) * g
+    return _format_rows("%s,%.3f" + LINE_END, [_group_labels(num_groups)[g], values])
+
+def _regression_chunk(rng, start, n, params):
+    x = np.arange(start + 1, start + n + 1) / 10
+    noise = sample(rng, params.get("dist", "normal"), 0.0, params.get("noise", 1.0), n)
+    y = params.get("slope", 2.0) * x + params.get("intercept", 1.0) + noise
+    return _format_rows("%.1f,%.3f" + LINE_END, [x, y])
+
+def _clustering_chunk(rng, start, n, params):
+    centers = np.asarray(params["centers"])
+    c = np.arange(start, start + n) % len(centers)
+    dist = params.get("dist", "normal")
+    spread = params.get("noise", 5.0)
+    x = centers[c, 0] + sample(rng, dist, 0.0, spread, n)
+    y = centers[c, 1] + sample(rng, dist, 0.0, spread, n)
+    return _format_rows("%.3f,%.3f" + LINE_END, [x, y])
+
+def _timeseries_chunk(rng, start, n, params):
+    i = np.arange(start, start + n)
+    period = params.get("period", 12)
+    dates = (np.datetime64(params.get("start", "2000-01-01"), "D") + i).astype(str)
+    seasonal = params.get("amplitude", 10.0) * ((i % period) - period / 2) / period
+    noise = sample(rng, params.get("dist", "normal"), 0.0, params.get("noise", 1.0), n)
+    values = params.get("base", 100.0) + params.get("trend", 0.1) * i + seasonal + noise
+    return _format_rows("%s,%.3f" + LINE_END, [dates, values])
+
+def _stat_chunk(rng, start, n, params):
+    dist = params.get("dist", "normal")
+    g1 = sample(rng, dist, params.get("mean1", 12.0), params.get("std", 2.0), n)
+    g2 = sample(rng, dist, params.get("mean2", 15.0), params.get("std", 2.0), n)
+    return _format_rows("%.3f,%.3f" + LINE_END, [g1, g2])
+
+# スキーマ名 -> (先頭, チャンク生成関数, 末尾)。末尾が関数なら (行数) を受け取って文字列を返す
+SCHEMAS = {
+    "items": ("id,name,value" + LINE_END, _items_chunk, ""),
+    "items_json": ('{\n  "items": [\n', _items_json_chunk, None),
+    "anova": ("group,value" + LINE_END, _anova_chunk, ""),
+    "regression": ("x,y" + LINE_END, _regression_chunk, ""),
+    "clustering": ("x,y" + LINE_END, _clustering_chunk, ""),
+    "timeseries": ("date,value" + LINE_END, _timeseries_chunk, ""),
+    "stat": ("group1,group2" + LINE_END, _stat_chunk, ""),
+}
+
+def _write_dataset(kind, filename, num_rows, seed, start=0, chunk_size=DEFAULT_CHUNK_SIZE, params=None):
+    """1 ファイル分を生成する。seed は整数または np.random.SeedSequence"""
+    header, chunk_fn, _ = SCHEMAS[kind]
+    params = dict(params or {})
+    rng = np.random.default_rng(seed)
+    if kind == "clustering" and "centers" not in params:
+        # 中心はシャードをまたいで共通にするため、呼び出し側で決めていなければ seed から決める
+        params["centers"] = np.random.default_rng(0 if seed is None else seed).uniform(
+            0, 100, (params.get("num_centers", 3), 2))
+    with open(filename, "w", encoding="utf-8", newline="") as f:
+        if kind == "items_json" and num_rows == 0:
+            f.write('{\n  "items": []\n}')
+            return filename
+        f.write(header)
+        pending = ""
+        for offset in range(0, num_rows, chunk_size):
+            n = min(chunk_size, num_rows - offset)
+            text = chunk_fn(rng, start + offset, n, params)
+            if kind == "items_json":
+                # 最後の要素の後ろにはカンマを付けないため、1 チャンク遅らせて書く
+                f.write(pending)
+                pending, text = text[-2:], text[:-2]
+            f.write(text)
+        if kind == "items_json":
+            f.write("\n  ]\n}")
+    return filename
+
+def _shard_task(args):
+    return _write_dataset(*args)
+
+def shard_paths(filename, shards):
+    base, ext = os.path.splitext(filename)
+    return [f"{base}_{i:05d}{ext}" for i in range(shards)]
+
+def generate_dataset(kind, filename, num_rows, seed=0, shards=1, workers=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE, **params):
+    """
+    kind のスキーマで num_rows 行を生成する。shards > 1 なら <名前>_00000<拡張子> ... に分割し、
+    workers 個のプロセスで並列に書き出す（各シャードの乱数列は SeedSequence.spawn で独立させる）。
+    生成したファイルパスのリストを返す。
+    """
+    if kind not in SCHEMAS:
+        raise ValueError(f"Unknown dataset kind: {kind} (choose from {', '.join(SCHEMAS)})")
+    if shards <= 1:
+        return [_write_dataset(kind, filename, num_rows, seed, 0, chunk_size, params)]
+    if kind == "clustering" and "centers" not in params:
+        params["centers"] = np.random.default_rng(seed).uniform(0, 100, (params.get("num_centers", 3), 2))
+    seeds = np.random.SeedSequence(seed).spawn(shards)
+    per_shard = -(-num_rows // shards)
+    tasks = []
+    for i, path in enumerate(shard_paths(filename, shards)):
+        start = i * per_shard
+        rows = max(0, min(per_shard, num_rows - start))
+        tasks.append((kind, path, rows, seeds[i], start, chunk_size, params))
+    with ProcessPoolExecutor(max_workers=workers or min(shards, os.cpu_count() or 1)) as executor:
+        return list(executor.map(_shard_task, tasks))
+
+def generate_anova_csv(filename="sample_anova.csv", num_rows=30, num_groups=3, seed=0, dist="normal", **options):
+    """'group', 'value' 列。グループごとに平均を group_step ずつずらす"""
+    generate_dataset("anova", filename, num_rows, seed, num_groups=num_groups, dist=dist, **options)
+    print(f"Dummy ANOVA CSV file '{filename}' generated with {num_rows} rows.")
+
+def generate_regression_csv(filename="sample_regression.csv", num_rows=30, slope=2.0, intercept=1.0, seed=0,
+                            dist="normal", **options):
+    """'x', 'y' 列。y = slope * x + intercept にノイズを加える"""
+    generate_dataset("regression", filename, num_rows, seed, slope=slope, intercept=intercept, dist=dist, **options)
+    print(f"Dummy regression CSV file '{filename}' generated with {num_rows} rows.")
+
+def generate_clustering_csv(filename="sample_clustering.csv", num_rows=30, num_centers=3, seed=0, dist="normal",
+                            **options):
+    """'x', 'y' 列。num_centers 個の中心の周りに点を散らす"""
+    generate_dataset("clustering", filename, num_rows, seed, num_centers=num_centers, dist=dist, **options)
+    print(f"Dummy clustering CSV file '{filename}' generated with {num_rows} rows.")
+
+def generate_timeseries_csv(filename="sample_timeseries.csv", num_rows=48, period=12, start="2000-01-01", seed=0,
+                            dist="normal", **options):
+    """'date', 'value' 列。日次の日付に、トレンド + 周期 period の季節性 + ノイズを与える"""
+    generate_dataset("timeseries", filename, num_rows, seed, period=period, start=str(start), dist=dist, **options)
+    print(f"Dummy time series CSV file '{filename}' generated with {num_rows} rows.")
+
+def generate_stat_csv(filename="sample_stat.csv", num_rows=30, seed=0, dist="normal", **options):
+    """'group1', 'group2' 列（t 検定用）。平均の異なる 2 群"""
+    generate_dataset("stat", filename, num_rows, seed, dist=dist, **options)
+    print(f"Dummy t-test CSV file '{filename}' generated with {num_rows} rows.")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="解析モジュール向けのダミーデータを生成する")
+    parser.add_argument("kind", choices=sorted(SCHEMAS), help="データの形式")
+    parser.add_argument("output", help="出力ファイル（シャード分割時は <名前>_00000<拡張子> ...）")
+    parser.add_argument("--rows", type=int, default=1000, help="生成する行数")
+    parser.add_argument("--seed", type=int, default=0, help="乱数の種")
+    parser.add_argument("--dist", default="normal", choices=DISTRIBUTIONS, help="値・ノイズの分布")
+    parser.add_argument("--noise", type=float, help="ノイズの標準偏差（形式ごとの既定値を上書き）")
+    parser.add_argument("--shards", type=int, default=1, help="出力ファイルの分割数")
+    parser.add_argument("--workers", type=int, help="並列に動かすプロセス数（既定: CPU 数とシャード数の小さい方）")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="1 回に生成する行数")
+    args = parser.parse_args(argv)
+
+    params = {"dist": args.dist}
+    if args.noise is not None:
+        params["noise"] = args.noise
+    paths = generate_dataset(args.kind, args.output, args.rows, args.seed, args.shards, args.workers,
+                             args.chunk_size, **params)
+    print(f"Generated {args.rows} rows of '{args.kind}' data in {len(paths)} file(s).")
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,14 @@
-import json
+from generate_dummy_datasets import generate_dataset, DEFAULT_CHUNK_SIZE
 
-def generate_dummy_json(filename="sample.json", num_items=10):
+def generate_dummy_json(filename="sample.json", num_items=10, shards=1, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
     """
     指定された件数のダミーデータを JSON ファイルとして生成する。
     データは "items" というキーの下に、各アイテムが辞書形式で格納される。
+    出力は json.dump(indent=2) と同じ形式だが、チャンク単位で書き出すため件数が多くてもメモリ使用量は一定。
+    shards > 1 なら <名前>_00000.json ... に分割し、それぞれを独立した JSON として並列に生成する。
     """
-    data = {
-        "items": [
-            {
-                "id": i,
-                "name": f"Item_{i}",
-                "value": i * 10
-            } for i in range(1, num_items + 1)
-        ]
-    }
     try:
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        generate_dataset("items_json", filename, num_items, shards=shards, workers=workers, chunk_size=chunk_size)
         print(f"Dummy JSON file '{filename}' generated with {num_items} items.")
     except Exception as e:
         print(f"Failed to generate dummy JSON file: {e}")
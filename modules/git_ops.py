@@ -0,0 +1,188 @@
+import os
+import time
+import subprocess
+from collections import namedtuple
+
+# main.py から使う git 操作のまとめ役。
+# - 状態は `git status --porcelain=v2 -z --branch` の 1 回の呼び出しで読み、変更操作をするまで使い回す
+#   （現在のブランチ・upstream・ahead/behind・変更/未追跡/コンフリクトのファイルが一度に分かる）
+# - ファイルごとのコマンド（checkout --ours / add）はまとめて 1 回で実行する
+# 失敗時は subprocess.CalledProcessError を送出する（stdout / stderr を含む）。
+# deadline（time.monotonic() の時刻）を過ぎそうなコマンドは subprocess.TimeoutExpired で打ち切る。
+
+GitStatus = namedtuple("GitStatus", ["branch", "upstream", "ahead", "behind", "changed", "untracked", "unmerged"])
+
+_ARG_CHUNK = 1000  # 一度に渡すパス数（コマンドライン長の上限対策）
+
+def parse_porcelain_v2(output: str) -> GitStatus:
+    """git status --porcelain=v2 -z --branch の出力を解析する"""
+    branch = upstream = None
+    ahead = behind = 0
+    changed, untracked, unmerged = [], [], []
+    fields = output.split("\0")
+    i = 0
+    while i < len(fields):
+        record = fields[i]
+        i += 1
+        if not record:
+            continue
+        kind = record[0]
+        if kind == "#":
+            _, key, value = record.split(" ", 2)
+            if key == "branch.head":
+                branch = None if value == "(detached)" else value
+            elif key == "branch.upstream":
+                upstream = value
+            elif key == "branch.ab":
+                a, b = value.split()
+                ahead, behind = int(a), -int(b)
+        elif kind == "1":
+            parts = record.split(" ", 8)
+            changed.append((parts[1], parts[8]))
+        elif kind == "2":
+            parts = record.split(" ", 9)
+            changed.append((parts[1], parts[9]))
+            i += 1  # -z では移動元のパスが次のフィールドになる
+        elif kind == "u":
+            unmerged.append(record.split(" ", 10)[10])
+        elif kind == "?":
+            untracked.append(record[2:])
+    return GitStatus(branch, upstream, ahead, behind, changed, untracked, unmerged)
+
+class GitRepo:
+    """1 回の実行の間、リポジトリの状態をキャッシュしながら git コマンドを実行する"""
+
+    def __init__(self, path=".", git="git", deadline=None):
+        self.path = path
+        self.git = git
+        self.deadline = deadline
+        self.calls = 0  # 起動した git プロセスの数
+        self._status = None
+
+    def run(self, *args, check=True, capture=True):
+        """git を 1 回起動する。capture=False なら出力をそのまま端末に流す"""
+        self.calls += 1
+        env = dict(os.environ, GIT_OPTIONAL_LOCKS="0")
+        if capture:
+            env["LC_ALL"] = "C"  # 出力を解析するため、メッセージを英語に固定する
+        timeout = None if self.deadline is None else max(0.001, self.deadline - time.monotonic())
+        return subprocess.run([self.git, *args], cwd=self.path, check=check, capture_output=capture,
+                              text=True, encoding="utf-8", errors="replace", env=env, timeout=timeout)
+
+    def _run_paths(self, args, paths):
+        for i in range(0, len(paths), _ARG_CHUNK):
+            self.run(*args, "--", *paths[i:i + _ARG_CHUNK])
+
+    def invalidate(self):
+        """状態を変える操作の後に呼び、次の status() で読み直させる"""
+        self._status = None
+
+    # ---- 状態の読み取り ----
+
+    def status(self, refresh=False) -> GitStatus:
+        if self._status is None or refresh:
+            result = self.run("status", "--porcelain=v2", "-z", "--branch", "--untracked-files=all")
+            self._status = parse_porcelain_v2(result.stdout)
+        return self._status
+
+    def current_branch(self):
+        return self.status().branch
+
+    def conflicted_files(self):
+        return list(self.status().unmerged)
+
+    def is_clean(self) -> bool:
+        status = self.status()
+        return not (status.changed or status.untracked or status.unmerged)
+
+    def format_status(self) -> str:
+        """status() の内容を表示用に整形する（git status をもう一度起動しない）"""
+        status = self.status()
+        lines = [f"ブランチ: {status.branch or '(detached)'}"]
+        if status.upstream:
+            lines.append(f"upstream: {status.upstream} (ahead {status.ahead}, behind {status.behind})")
+        for xy, path in status.changed:
+            lines.append(f"  {xy} {path}")
+        for path in status.unmerged:
+            lines.append(f"  UU {path}")
+        for path in status.untracked:
+            lines.append(f"  ?? {path}")
+        if len(lines) == 1 + bool(status.upstream):
+            lines.append("変更はありません。")
+        return "\n".join(lines)
+
+    # ---- 変更操作 ----
+
+    def add_all(self):
+        self.run("add", "-A")
+        self.invalidate()
+
+    def add(self, paths):
+        self._run_paths(["add"], list(paths))
+        self.invalidate()
+
+    def commit(self, message) -> bool:
+        """コミットする。コミットするものがなければ False"""
+        result = self.run("commit", "-m", message, check=False)
+        self.invalidate()
+        if result.returncode == 0:
+            return True
+        output = (result.stdout + result.stderr).lower()
+        if "nothing to commit" in output or "no changes added" in output:
+            return False
+        raise subprocess.CalledProcessError(result.returncode, result.args, result.stdout, result.stderr)
+
+    def commit_all(self, message) -> bool:
+        """全変更をステージしてコミットする。変更がないことが分かっていれば git を起動しない"""
+        if self._status is not None and self.is_clean():
+            return False
+        self.add_all()
+        return self.commit(message)
+
+    def checkout_ours(self, paths):
+        """コンフリクトしたファイルをまとめて ours 側で解決する"""
+        self._run_paths(["checkout", "--ours"], list(paths))
+        self.invalidate()
+
+    def resolve_ours(self, message):
+        """すべてのコンフリクトを ours 側で解決してコミットする。解決したファイルのリストを返す"""
+        conflicted = self.conflicted_files()
+        if conflicted:
+            self.checkout_ours(conflicted)
+            self.add(conflicted)
+            self.commit(message)
+        return conflicted
+
+    def checkout(self, branch):
+        self.run("checkout", branch, capture=False)
+        self.invalidate()
+
+    def merge(self, branch):
+        self.run("merge", branch, capture=False)
+        self.invalidate()
+
+    def merge_abort(self):
+        self.run("merge", "--abort")
+        self.invalidate()
+
+    def pull(self, remote, branch):
+        self.run("pull", remote, branch, capture=False)
+        self.invalidate()
+
+    def push(self, *refspec):
+        return self.run("push", *refspec)
+
+    def rename_branch(self, new_name):
+        self.run("branch", "-m", new_name)
+        self.invalidate()
+
+    def delete_branch(self, branch):
+        self.run("branch", "-d", branch)
+        self.invalidate()
+
+    def clean(self, excludes=(), dry_run=False):
+        args = ["clean", "-xdn" if dry_run else "-xdf"]
+        for pattern in excludes:
+            args += ["-e", pattern]
+        self.run(*args, capture=False)
+        self.invalidate()
@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 
 class IConfigManager(ABC):
@@ -22,6 +23,17 @@ class ILogger(ABC):
         """指定されたレベルでメッセージをログ出力する"""
         pass
 
+    def setup_async_logging(self, log_dir: str, log_level: str, **options) -> None:
+        """
+        キューと書き込みスレッドを使う非同期ログを初期化する。
+        非同期に対応しない実装では setup_logging にフォールバックする。
+        """
+        self.setup_logging(log_dir, log_level)
+
+    def shutdown(self) -> None:
+        """バッファ済みのログを書き出して終了する（非同期ログを使う実装で上書きする）"""
+        pass
+
 class IDBConnector(ABC):
     @abstractmethod
     def connect(self, db_path: str):
@@ -54,6 +66,20 @@ class IParser(ABC):
         """このパーサーがサポートする拡張子のリストを返す"""
         pass
 
+    def iter_parse(self, file_path: str, encoding: str = 'utf-8'):
+        """
+        レコード（辞書）を 1 件ずつ返すイテレータ。
+        デフォルトは parse() の結果を順に返すだけなので、大きなファイルを扱うパーサーはストリーミング実装で上書きする。
+        """
+        yield from self.parse(file_path, encoding)
+
+    async def aparse(self, file_path: str, encoding: str = 'utf-8'):
+        """
+        parse() の非同期版。デフォルトはループの既定の executor（スレッド）で parse() を実行するので、
+        同期パーサーのままでも I/O 待ちを他のファイルと重ねられる。ネイティブな非同期 I/O を使うパーサーは上書きする。
+        """
+        return await asyncio.to_thread(self.parse, file_path, encoding)
+
 # interfaces.py の末尾あたりに追記
 
 class IAnalysis(ABC):
@@ -65,3 +91,10 @@ class IAnalysis(ABC):
         戻り値は、解析結果を辞書形式で返す想定。
         """
         pass
+
+    async def aanalyze(self, data: list, **kwargs) -> dict:
+        """
+        analyze() の非同期版。デフォルトはループの既定の executor（スレッド）で analyze() を実行する。
+        DB など I/O を待つ解析はネイティブな非同期実装で上書きする。
+        """
+        return await asyncio.to_thread(self.analyze, data, **kwargs)
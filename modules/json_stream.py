@@ -0,0 +1,96 @@
+import re
+import json
+
+# 配列の要素間にある空白とカンマ / 値の前の空白
+_SEPARATORS = re.compile(r"[\s,]*")
+_WHITESPACE = re.compile(r"\s*")
+
+class _Reader:
+    """ファイルを chunk_size 文字ずつ読み、バッファ上の位置 pos を進めながら JSON の値を取り出す"""
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+
+    def fill(self) -> bool:
+        chunk = self.f.read(self.chunk_size)
+        # 読み終えた部分は捨て、バッファが要素 1 件分程度に収まるようにする
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return bool(chunk)
+
+    def peek(self, skip=_WHITESPACE) -> str:
+        """skip に一致する文字を読み飛ばし、次の 1 文字を返す（終端なら ""）"""
+        while True:
+            self.pos = skip.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self.buf, self.pos)
+        self.pos += 1
+
+    def decode(self):
+        if not self.peek():
+            raise json.JSONDecodeError("Expecting value", self.buf, self.pos)
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # バッファ末尾で終わった値（数値など）は続きがあるかもしれないので読み足してやり直す
+            if end >= len(self.buf) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+    def iter_array(self):
+        """'[' の直後から、配列の要素を 1 件ずつ返す"""
+        while True:
+            char = self.peek(_SEPARATORS)
+            if char == "]":
+                self.pos += 1
+                return
+            if not char:
+                raise json.JSONDecodeError("Unterminated array", self.buf, self.pos)
+            yield self.decode()
+
+def iter_json_items(path, key="items", encoding="utf-8", chunk_size=1 << 16):
+    """
+    JSON ファイルのレコードを 1 件ずつ返す。ファイル全体を json.load しないため、
+    メモリ使用量は要素 1 件分程度に収まる。
+    - トップレベルが配列ならその要素を返す
+    - トップレベルがオブジェクトなら、キー key の配列の要素を返す（key は値ではなくトップレベルのキーとしてだけ探す）。
+      key より前にある他のキーの値は 1 つずつ読み込んで読み飛ばす
+    それ以外（key がない、key の値が配列でない、スカラー）の場合は何も返さない。
+    """
+    with open(path, "r", encoding=encoding) as f:
+        reader = _Reader(f, chunk_size)
+        char = reader.peek()
+        if char == "[":
+            reader.pos += 1
+            yield from reader.iter_array()
+            return
+        if char != "{":
+            return
+        reader.pos += 1
+        while True:
+            char = reader.peek(_SEPARATORS)
+            if char == "}" or not char:
+                return
+            name = reader.decode()
+            if not isinstance(name, str):
+                raise json.JSONDecodeError("Expecting property name", reader.buf, reader.pos)
+            reader.expect(":")
+            if name == key and reader.peek() == "[":
+                reader.pos += 1
+                yield from reader.iter_array()
+                return
+            reader.decode()
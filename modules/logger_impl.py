@@ -1,7 +1,149 @@
+import time
+import queue
+import atexit
 import logging
+import threading
+import logging.handlers
 from interfaces import ILogger
 
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+# 書き込みスレッドで遅れて整形しても結果が変わらない引数の型
+_IMMUTABLE_ARG_TYPES = (str, int, float, bool, bytes, complex, type(None))
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+class RateLimitFilter(logging.Filter):
+    """
+    同じ呼び出し箇所 (pathname, lineno) からのレコードを interval 秒あたり burst 件に制限するフィルタ。
+    上限を超えたレコードは sample_every 件に 1 件だけ通し（0 なら全て捨てる）、
+    捨てた件数は次のウィンドウで最初に通過したレコードの末尾に付記する。
+    WARNING 以上のレコードは制限しない。
+    """
+    def __init__(self, burst: int = 20, interval: float = 1.0, sample_every: int = 0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.sample_every = sample_every
+        self._windows = {}  # 呼び出し箇所 -> [ウィンドウ開始時刻, 通過件数, 抑制件数]
+        self._lock = threading.Lock()  # filter() はログを出す全スレッドから呼ばれる
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        with self._lock:
+            return self._filter(record)
+
+    def _filter(self, record):
+        key = (record.pathname, record.lineno)
+        window = self._windows.get(key)
+        if window is None or record.created - window[0] >= self.interval:
+            suppressed = window[2] if window else 0
+            self._windows[key] = [record.created, 1, 0]
+            if suppressed:
+                record.msg = f"{record.msg} [{suppressed} similar messages suppressed]"
+            return True
+        if window[1] < self.burst:
+            window[1] += 1
+            return True
+        window[2] += 1
+        if self.sample_every and window[2] % self.sample_every == 0:
+            return True
+        return False
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    レコードをキューに積む QueueHandler。
+    標準の QueueHandler は呼び出し元スレッドでメッセージを整形するが、
+    引数が全て不変の値（文字列・数値など）なら msg % args の評価は書き込みスレッドに任せる。
+    リストや辞書などの引数は呼び出し後に変更されうるため、ここで getMessage() して確定させる。
+    例外情報は exc_text に文字列化し、トレースバック（フレーム）をキューに残さない。
+    """
+    def prepare(self, record):
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        args = record.args
+        if not isinstance(record.msg, str) or (args and not (
+                isinstance(args, tuple) and all(type(arg) in _IMMUTABLE_ARG_TYPES for arg in args))):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+class _BufferedFileHandler(logging.FileHandler):
+    """emit ごとに flush しない FileHandler（flush は書き込みスレッドがバッチ単位で行う）"""
+    def emit(self, record):
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+class BatchingQueueListener:
+    """
+    キューからレコードをまとめて取り出して handlers に渡す書き込みスレッド。
+    batch_size 件ごと、または flush_interval 秒ごと（ERROR 以上を含むバッチは即時）に flush する。
+    """
+    _SENTINEL = None
+
+    def __init__(self, log_queue, handlers, batch_size: int = 256, flush_interval: float = 0.5):
+        self.queue = log_queue
+        self.handlers = list(handlers)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="LogWriter", daemon=True)
+        self._thread.start()
+
+    def _flush(self):
+        for handler in self.handlers:
+            handler.flush()
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                record = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._flush()
+                last_flush = time.monotonic()
+                continue
+            batch = [record]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = False
+            urgent = False
+            for record in batch:
+                if record is self._SENTINEL:
+                    stop = True
+                    continue
+                urgent = urgent or record.levelno >= logging.ERROR
+                for handler in self.handlers:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+            now = time.monotonic()
+            if stop or urgent or now - last_flush >= self.flush_interval:
+                self._flush()
+                last_flush = now
+            if stop:
+                return
+
+    def stop(self):
+        if self._thread is not None:
+            self.queue.put_nowait(self._SENTINEL)
+            self._thread.join()
+            self._thread = None
+
 class Logger(ILogger):
+    def __init__(self):
+        self._listener = None
+
     def setup_logging(self, log_dir: str, log_level: str, private: bool = True) -> None:
         try:
             # privateフラグがTrueの場合、サブフォルダを作成せず、カレントディレクトリにログファイルを作成
@@ -12,8 +154,8 @@ class Logger(ILogger):
 
             logging.basicConfig(
                 level=getattr(logging, log_level.upper(), logging.INFO),
-                format='%(asctime)s - %(levelname)s - %(message)s',
-                datefmt='%Y-%m-%d %H:%M:%S',
+                format=LOG_FORMAT,
+                datefmt=DATE_FORMAT,
                 handlers=[logging.FileHandler(log_file, encoding='utf-8'),
                           logging.StreamHandler()]
             )
@@ -21,14 +163,57 @@ class Logger(ILogger):
         except Exception as e:
             print(f"Logging initialization failed: {e}")
 
+    def setup_async_logging(self, log_dir: str, log_level: str, private: bool = True,
+                            batch_size: int = 256, flush_interval: float = 0.5,
+                            rate_limit_burst: int = 20, rate_limit_interval: float = 1.0,
+                            sample_every: int = 0) -> None:
+        """
+        キュー経由の非同期ログを初期化する。呼び出し元スレッドはレコードをキューに積むだけで、
+        整形・ファイル書き込み・flush は書き込みスレッドがバッチ単位で行う。
+        同じ箇所から繰り返し出るログは RateLimitFilter で間引く（rate_limit_burst=0 で無効）。
+        """
+        try:
+            log_file = "private_app.log" if private else "app.log"
+            formatter = logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
+            file_handler = _BufferedFileHandler(log_file, encoding='utf-8')
+            console_handler = logging.StreamHandler()
+            for handler in (file_handler, console_handler):
+                handler.setFormatter(formatter)
+
+            log_queue = queue.SimpleQueue()
+            queue_handler = _DeferredQueueHandler(log_queue)
+            if rate_limit_burst:
+                queue_handler.addFilter(RateLimitFilter(rate_limit_burst, rate_limit_interval, sample_every))
+            self._listener = BatchingQueueListener(log_queue, [file_handler, console_handler],
+                                                   batch_size, flush_interval)
+            self._listener.start()
+            atexit.register(self.shutdown)
+
+            logging.basicConfig(
+                level=getattr(logging, log_level.upper(), logging.INFO),
+                handlers=[queue_handler]
+            )
+            logging.info(f"Async logging initialized in {log_file} at level {log_level}")
+        except Exception as e:
+            print(f"Logging initialization failed: {e}")
+
+    def shutdown(self) -> None:
+        """キューに残ったログを書き出して書き込みスレッドを止める"""
+        if self._listener is not None:
+            listener, self._listener = self._listener, None
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+
     def log(self, level: str, message: str) -> None:
+        # stacklevel=2 でレコードの呼び出し箇所を log() の呼び出し元にする（RateLimitFilter のキーになる）
         if level.lower() == 'info':
-            logging.info(message)
+            logging.info(message, stacklevel=2)
         elif level.lower() == 'error':
-            logging.error(message)
+            logging.error(message, stacklevel=2)
         elif level.lower() == 'warning':
-            logging.warning(message)
+            logging.warning(message, stacklevel=2)
         elif level.lower() == 'debug':
-            logging.debug(message)
+            logging.debug(message, stacklevel=2)
         else:
-            logging.info(message)
+            logging.info(message, stacklevel=2)
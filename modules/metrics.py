@@ -0,0 +1,216 @@
+import os
+import sys
+import json
+import math
+import time
+import inspect
+import argparse
+import logging
+import threading
+import functools
+import contextvars
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource  # Unix のみ
+except ImportError:
+    resource = None
+
+# 各パイプライン段階（パーサー・解析・プラグイン読み込み・DB 呼び出し）の計測イベントを
+# JSON Lines で書き出す。出力先は環境変数 PIPELINE_METRICS_FILE か configure_metrics() で指定し、
+# 未指定のときは stage() / timed() はほぼ何もしない。
+METRICS_ENV = "PIPELINE_METRICS_FILE"
+TRACEMALLOC_ENV = "PIPELINE_METRICS_TRACEMALLOC"
+
+_lock = threading.Lock()
+_path = os.environ.get(METRICS_ENV) or None
+_stream = None
+_current_stage = contextvars.ContextVar("current_stage", default=None)
+# 実行中の段階の [tracemalloc のピーク]。内側の段階が reset_peak() で消す前のピークを外側へ退避する
+_stage_peak = contextvars.ContextVar("stage_peak", default=None)
+
+if _path and os.environ.get(TRACEMALLOC_ENV) == "1":
+    tracemalloc.start()
+
+def configure_metrics(path: str = None, track_memory: bool = False) -> None:
+    """
+    計測イベントの出力先を設定する（None で無効化）。
+    track_memory=True なら tracemalloc を開始し、段階ごとの Python ヒープの増加のピークも記録する。
+    """
+    global _path, _stream
+    with _lock:
+        if _stream is not None:
+            _stream.close()
+            _stream = None
+        _path = path
+    if path and track_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+def metrics_enabled() -> bool:
+    return _path is not None
+
+def emit(event: dict) -> None:
+    """イベント 1 件を 1 行の JSON として追記する"""
+    global _stream
+    if _path is None:
+        return
+    event.setdefault("ts", time.time())
+    event.setdefault("pid", os.getpid())
+    line = json.dumps(event, ensure_ascii=False, default=str) + "\n"
+    with _lock:
+        if _stream is None:
+            _stream = open(_path, "a", encoding="utf-8")
+        _stream.write(line)
+        _stream.flush()
+
+def record_metrics(**fields) -> None:
+    """実行中の段階に rows / bytes_read などの値を追加する（段階の外や無効時は何もしない）"""
+    current = _current_stage.get()
+    if current is not None:
+        current.update(fields)
+
+def _max_rss_kb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS はバイト単位、Linux は KiB 単位
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+@contextmanager
+def stage(name: str, **fields):
+    """
+    with stage("parse.csv", bytes_read=size): の形で処理時間などを計測し、終了時にイベントを書き出す。
+    ブロック内では record_metrics(rows=...) で値を追加できる。
+    tracemalloc が有効なら peak_traced_bytes（段階の開始時からの Python ヒープ増加の最大値。入れ子の段階を含む）、
+    process_max_rss_kb（その時点までのプロセス全体の最大 RSS。段階ごとの値ではない）も記録する。
+    """
+    if _path is None:
+        yield fields
+        return
+    event = {"stage": name}
+    event.update(fields)
+    token = _current_stage.set(event)
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        traced_start, peak_before = tracemalloc.get_traced_memory()
+        outer = _stage_peak.get()
+        if outer is not None:
+            outer[0] = max(outer[0], peak_before)
+        tracemalloc.reset_peak()
+        peak_holder = [0]
+        peak_token = _stage_peak.set(peak_holder)
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield event
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        event["duration_ms"] = (time.perf_counter() - start) * 1000.0
+        event["status"] = status
+        if tracing:
+            # reset_peak() 以降のピークと、入れ子の段階の開始時に退避したピークの大きい方
+            peak = max(tracemalloc.get_traced_memory()[1], peak_holder[0])
+            event["peak_traced_bytes"] = max(0, peak - traced_start)
+            _stage_peak.reset(peak_token)
+        max_rss = _max_rss_kb()
+        if max_rss is not None:
+            event["process_max_rss_kb"] = max_rss
+        _current_stage.reset(token)
+        emit(event)
+
+def timed(name: str, input_arg: str = None):
+    """
+    関数呼び出しを 1 つの段階として計測するデコレータ。
+    input_arg に入力ファイルパスの引数名を渡すと、そのファイルサイズを bytes_read として記録する。
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _path is None:
+                return func(*args, **kwargs)
+            fields = {}
+            if input_arg is not None:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                path = bound.arguments.get(input_arg)
+                fields["input"] = path
+                try:
+                    fields["bytes_read"] = os.path.getsize(path)
+                except (OSError, TypeError):
+                    pass
+            with stage(name, **fields):
+                return func(*args, **kwargs)
+
+        return wrapper
+    return decorator
+
+def _percentile(sorted_values, q):
+    """最近傍順位法によるパーセンタイル"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def summarize(paths) -> dict:
+    """計測ファイルを読み、段階ごとの件数・p50/p95/最大レイテンシ・行数・バイト数を集計する"""
+    durations = {}
+    totals = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                name = event.get("stage")
+                if name is None or "duration_ms" not in event:
+                    continue
+                durations.setdefault(name, []).append(event["duration_ms"])
+                t = totals.setdefault(name, {"rows": 0, "bytes_read": 0, "errors": 0, "process_max_rss_kb": 0})
+                t["rows"] += event.get("rows", 0) or 0
+                t["bytes_read"] += event.get("bytes_read", 0) or 0
+                t["errors"] += event.get("status") == "error"
+                t["process_max_rss_kb"] = max(t["process_max_rss_kb"], event.get("process_max_rss_kb", 0) or 0)
+    summary = {}
+    for name, values in durations.items():
+        values.sort()
+        summary[name] = {
+            "count": len(values),
+            "p50_ms": _percentile(values, 50),
+            "p95_ms": _percentile(values, 95),
+            "max_ms": values[-1],
+            "total_ms": sum(values),
+            **totals[name],
+        }
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="パイプライン計測ファイル (JSON Lines) の段階別レイテンシを集計する")
+    parser.add_argument("files", nargs="+", help="計測ファイル (PIPELINE_METRICS_FILE の出力)")
+    parser.add_argument("--json", action="store_true", help="集計結果を JSON で出力する")
+    parser.add_argument("--sort", default="total_ms", choices=["total_ms", "p50_ms", "p95_ms", "count"],
+                        help="並べ替えに使う列（降順）")
+    args = parser.parse_args(argv)
+
+    summary = summarize(args.files)
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return
+    header = f"{'stage':<32} {'count':>7} {'p50_ms':>10} {'p95_ms':>10} {'max_ms':>10} {'rows':>10} {'bytes':>12} {'errors':>6}"
+    print(header)
+    print("-" * len(header))
+    for name, s in sorted(summary.items(), key=lambda kv: kv[1][args.sort], reverse=True):
+        print(f"{name:<32} {s['count']:>7} {s['p50_ms']:>10.2f} {s['p95_ms']:>10.2f} {s['max_ms']:>10.2f} "
+              f"{s['rows']:>10} {s['bytes_read']:>12} {s['errors']:>6}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
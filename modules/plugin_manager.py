@@ -1,10 +1,15 @@
 import os
 import importlib.util
 import logging
+from metrics import stage, record_metrics
+from profiling import instrument_plugin_module
 
 class PluginManager:
     def __init__(self):
         self.plugins = {}
+        self.directories = []
+        self.worker_pool = None
+        self._analyses = {}
         logging.debug("PluginManager initialized")
 
     def register_plugin(self, name: str, plugin):
@@ -21,16 +26,55 @@ class PluginManager:
 
     def load_plugins_from_directory(self, directory: str, file_suffix: str = "_plugin.py"):
         logging.info(f"Loading plugins from directory: {directory}")
+        if directory not in self.directories:
+            self.directories.append(directory)
         try:
-            for filename in os.listdir(directory):
-                if filename.endswith(file_suffix):
-                    filepath = os.path.join(directory, filename)
-                    module_name = os.path.splitext(filename)[0]
-                    spec = importlib.util.spec_from_file_location(module_name, filepath)
-                    module = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(module)
-                    plugin_name = getattr(module, "PLUGIN_NAME", module_name)
-                    self.register_plugin(plugin_name, module)
+            with stage("plugins.load", directory=directory):
+                for filename in os.listdir(directory):
+                    if filename.endswith(file_suffix):
+                        filepath = os.path.join(directory, filename)
+                        module_name = os.path.splitext(filename)[0]
+                        with stage("plugins.load_module", module=module_name):
+                            spec = importlib.util.spec_from_file_location(module_name, filepath)
+                            module = importlib.util.module_from_spec(spec)
+                            spec.loader.exec_module(module)
+                        # IAnalysis 実装の analyze をプロファイリング可能にする（無効時はそのまま呼ばれる）
+                        instrument_plugin_module(module)
+                        plugin_name = getattr(module, "PLUGIN_NAME", module_name)
+                        self.register_plugin(plugin_name, module)
+                record_metrics(plugins=len(self.plugins))
             logging.info(f"Total plugins loaded: {len(self.plugins)}")
         except Exception as e:
             logging.error(f"Failed to load plugins from {directory}: {e}")
+
+    def start_workers(self, workers: int = None, task_timeout: float = None):
+        """
+        読み込んだディレクトリの解析プラグインを、常駐ワーカープロセスのプールで実行するようにする。
+        以降の run_analysis() はワーカーで動き、プラグインが GIL を握ったり落ちたりしても本体は止まらない。
+        """
+        from plugin_workers import PluginWorkerPool
+        self.stop_workers()
+        self.worker_pool = PluginWorkerPool(self.directories, workers=workers, task_timeout=task_timeout)
+        logging.info(f"Started {self.worker_pool.size} plugin worker(s) for {self.worker_pool.plugins}")
+        return self.worker_pool
+
+    def stop_workers(self):
+        if self.worker_pool is not None:
+            self.worker_pool.close()
+            self.worker_pool = None
+
+    def run_analysis(self, name: str, data: list, **kwargs) -> dict:
+        """解析プラグイン name の analyze を実行する（start_workers() 後はワーカープロセスで）"""
+        if self.worker_pool is not None:
+            return self.worker_pool.analyze(name, data, **kwargs)
+        analysis = self._analyses.get(name)
+        if analysis is None:
+            from async_engine import collect_plugins
+            module = self.get_plugin(name)
+            if module is None:
+                raise KeyError(f"analysis plugin {name!r} not found")
+            analysis = collect_plugins([module])[1].get(name)
+            if analysis is None:
+                raise KeyError(f"plugin {name!r} has no IAnalysis implementation")
+            self._analyses[name] = analysis
+        return analysis.analyze(data, **kwargs)
@@ -0,0 +1,406 @@
+import os
+import sys
+import time
+import queue
+import pickle
+import logging
+import threading
+import multiprocessing
+from array import array
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+try:
+    import resource  # Unix のみ
+except ImportError:
+    resource = None
+
+# 解析プラグイン（IAnalysis）を常駐ワーカープロセスのプールで実行する。
+# - ワーカーは起動時にプラグインを読み込み、ファイルをまたいで使い回す（spawn で起動するため親のスレッドの影響を受けない）
+# - パース済みデータは行の辞書を pickle せず、列ごとに詰めて共有メモリに 1 回だけ書き、複数の解析で共有する
+# - プラグインごとに呼び出し回数・失敗数・CPU 時間・経過時間と、呼び出し中に増えたワーカーの最大 RSS を集計する
+# ワーカーが落ちた・制限時間を超えた場合は、そのタスクを失敗にしてワーカーを起動し直す。
+DEFAULT_TASK_TIMEOUT = None
+_ALIGN = 8
+_SEP = "\0"
+
+class PluginWorkerError(RuntimeError):
+    """ワーカーでの解析の失敗（プラグインの例外・ワーカーの異常終了・タイムアウト）"""
+
+# ---- 列形式のエンコード ----
+
+def _column_kind(values):
+    if all(type(v) is int for v in values):
+        return "q"
+    # int と float が混ざった列を "d" で詰めると int が float で戻るため、全て float のときだけ使う
+    if all(type(v) is float for v in values):
+        return "d"
+    if all(type(v) is str for v in values):
+        return "s"
+    return "p"
+
+def _encode_column(values):
+    kind = _column_kind(values)
+    if kind in ("q", "d"):
+        try:
+            return kind, array(kind, values).tobytes()
+        except OverflowError:
+            kind = "p"
+    if kind == "s":
+        joined = _SEP.join(values)
+        # 値の中に区切り文字があれば分割で復元できないので pickle する
+        if joined.count(_SEP) == max(len(values) - 1, 0):
+            return kind, joined.encode("utf-8", "surrogatepass")
+    return "p", pickle.dumps(values, protocol=pickle.HIGHEST_PROTOCOL)
+
+def encode_rows(rows):
+    """
+    行の辞書のリストを列ごとのバイト列にする。(メタデータ, [バイト列]) を返す。
+    一部の行にしかないキーは、行ごとの有無（1 バイト/行）を別に持つ。
+    """
+    names = {}
+    for row in rows:
+        for key in row:
+            names.setdefault(key, None)
+    columns, blobs = [], []
+    for name in names:
+        present = None
+        if all(name in row for row in rows):
+            values = [row[name] for row in rows]
+        else:
+            present = bytes(name in row for row in rows)
+            values = [row.get(name) for row in rows]
+            # 欠けている行は列の型に合わせた値で埋めて詰め方をそろえる（復元時は present で除く）
+            kind = _column_kind([v for v, p in zip(values, present) if p])
+            if kind != "p":
+                filler = {"s": "", "d": 0.0}.get(kind, 0)
+                values = [v if p else filler for v, p in zip(values, present)]
+        kind, blob = _encode_column(values)
+        columns.append([name, kind, len(blob), present is not None])
+        blobs.append(blob)
+        if present is not None:
+            blobs.append(present)
+    return {"rows": len(rows), "columns": columns}, blobs
+
+def _padded(size):
+    return (size + _ALIGN - 1) // _ALIGN * _ALIGN
+
+def decode_rows(buf, meta):
+    """encode_rows / write_shared の逆。buf は共有メモリの memoryview など"""
+    n = meta["rows"]
+    names, columns, masks = [], [], []
+    offset = 0
+    for name, kind, size, has_mask in meta["columns"]:
+        data = buf[offset:offset + size]
+        offset += _padded(size)
+        if kind in ("q", "d"):
+            values = data.cast(kind).tolist() if size else []
+        elif kind == "s":
+            values = bytes(data).decode("utf-8", "surrogatepass").split(_SEP) if n else []
+        else:
+            values = pickle.loads(data)
+        mask = None
+        if has_mask:
+            mask = bytes(buf[offset:offset + n])
+            offset += _padded(n)
+        names.append(name)
+        columns.append(values)
+        masks.append(mask)
+    if not any(masks):
+        return [dict(zip(names, values)) for values in zip(*columns)] if names else [{} for _ in range(n)]
+    rows = []
+    for i in range(n):
+        rows.append({name: values[i] for name, values, mask in zip(names, columns, masks) if mask is None or mask[i]})
+    return rows
+
+def write_shared(rows):
+    """rows を共有メモリに書き、(SharedMemory, メタデータ) を返す。使い終わったら close() と unlink() を呼ぶ"""
+    meta, blobs = encode_rows(rows)
+    total = sum(_padded(len(b)) for b in blobs)
+    shm = shared_memory.SharedMemory(create=True, size=max(total, 1))
+    offset = 0
+    for blob in blobs:
+        shm.buf[offset:offset + len(blob)] = blob
+        offset += _padded(len(blob))
+    meta["name"] = shm.name
+    return shm, meta
+
+# ---- ワーカープロセス ----
+
+def _max_rss_kb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+def _reset_peak_rss() -> bool:
+    """Linux ではプロセスの最大 RSS (VmHWM) を現在の RSS に戻す。戻せたら True"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _rss_kb():
+    """
+    (現在の RSS, 最大 RSS) を KiB で返す。/proc がなければ (None, ru_maxrss)。
+    ru_maxrss は exec 前の親プロセスの最大値も引き継ぐため、呼び出しごとの計測には /proc を優先する。
+    """
+    try:
+        values = {}
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    values[line[:5]] = int(line.split()[1])
+        return values["VmRSS"], values["VmHWM"]
+    except (OSError, KeyError, ValueError, IndexError):
+        return None, _max_rss_kb()
+
+def _worker_main(conn, plugin_dirs):
+    from plugin_manager import PluginManager
+    from async_engine import collect_plugins
+
+    manager = PluginManager()
+    for directory in plugin_dirs:
+        manager.load_plugins_from_directory(directory)
+    _, analyses = collect_plugins(manager.plugins.values())
+    conn.send(("ready", sorted(analyses)))
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if message is None:
+            break
+        plugin, meta, kwargs = message
+        reset = _reset_peak_rss()
+        rss_before, peak_before = _rss_kb()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            analysis = analyses.get(plugin)
+            if analysis is None:
+                raise KeyError(f"analysis plugin {plugin!r} not found")
+            # 共有メモリは親が作って消す。ここでは読むだけ
+            shm = shared_memory.SharedMemory(name=meta["name"])
+            try:
+                data = decode_rows(shm.buf, meta)
+            finally:
+                shm.close()
+            outcome = (True, analysis.analyze(data, **kwargs))
+        except Exception as e:
+            outcome = (False, f"{type(e).__name__}: {e}")
+        _, peak_after = _rss_kb()
+        if peak_after is None:
+            growth = None
+        elif reset and rss_before is not None:
+            # 最大 RSS を呼び出し前に戻してあるので、呼び出し中のピークから開始時の RSS を引いた分がこの呼び出しの増加
+            growth = max(0, peak_after - rss_before)
+        else:
+            # 戻せない環境では、ワーカーの最大 RSS がこの呼び出しで押し上げられた分（下限の目安）
+            growth = max(0, peak_after - peak_before)
+        usage = {"cpu_s": time.process_time() - cpu, "wall_s": time.perf_counter() - wall,
+                 "rss_growth_kb": growth, "peak_rss_kb": peak_after}
+        try:
+            conn.send((*outcome, usage))
+        except Exception as e:  # 結果を pickle できない場合など
+            conn.send((False, f"{type(e).__name__}: {e}", usage))
+
+class _Worker:
+    def __init__(self, ctx, plugin_dirs, start_timeout):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child, plugin_dirs), daemon=True,
+                                   name="plugin-worker")
+        self.process.start()
+        child.close()
+        if not self.conn.poll(start_timeout):
+            self.stop()
+            raise PluginWorkerError("plugin worker did not start in time")
+        _, self.plugins = self.conn.recv()
+
+    def call(self, plugin, meta, kwargs, timeout):
+        """タスクを 1 件実行して (成功したか, 結果またはエラー, 使用量) を返す。ワーカーが使えなくなったら例外"""
+        self.conn.send((plugin, meta, kwargs))
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = 0.5 if deadline is None else min(0.5, max(0.0, deadline - time.monotonic()))
+            if self.conn.poll(wait):
+                try:
+                    return self.conn.recv()
+                except EOFError:
+                    raise PluginWorkerError(f"plugin worker crashed (exit code {self.process.exitcode})") from None
+            if not self.process.is_alive():
+                raise PluginWorkerError(f"plugin worker crashed (exit code {self.process.exitcode})")
+            if deadline is not None and time.monotonic() >= deadline:
+                raise PluginWorkerError(f"plugin {plugin!r} timed out after {timeout}s")
+
+    def stop(self, timeout=5):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+class _Segment:
+    """複数のタスクで共有する共有メモリ。最後のタスクが終わったら消す"""
+
+    def __init__(self, rows, users):
+        self.shm, self.meta = write_shared(rows)
+        self.users = users
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            self.users -= 1
+            if self.users:
+                return
+        self.shm.close()
+        self.shm.unlink()
+
+class PluginWorkerPool:
+    """
+    解析プラグインを実行する常駐ワーカープロセスのプール。
+    analyze_all(data) はデータを共有メモリに 1 回書き、各プラグインをワーカーに振り分ける。
+    """
+
+    def __init__(self, plugin_dirs=("plugins",), workers=None, task_timeout=DEFAULT_TASK_TIMEOUT,
+                 start_timeout=60.0):
+        if isinstance(plugin_dirs, str):
+            plugin_dirs = [plugin_dirs]
+        self.plugin_dirs = [os.path.abspath(d) for d in plugin_dirs]
+        self.size = max(1, workers or os.cpu_count() or 1)
+        self.task_timeout = task_timeout
+        self.start_timeout = start_timeout
+        self._ctx = multiprocessing.get_context("spawn")
+        self._tasks = queue.Queue()
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        self._workers = [_Worker(self._ctx, self.plugin_dirs, start_timeout) for _ in range(self.size)]
+        self.plugins = list(self._workers[0].plugins)
+        self.restarts = 0
+        self._closed = False
+        self._threads = [threading.Thread(target=self._dispatch, args=(i,), daemon=True, name=f"plugin-dispatch-{i}")
+                         for i in range(self.size)]
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, plugin, data, **kwargs) -> Future:
+        """plugin の analyze(data, **kwargs) をワーカーで実行する Future を返す"""
+        return self._submit(plugin, _Segment(data, 1), kwargs)
+
+    def analyze(self, plugin, data, **kwargs):
+        return self.submit(plugin, data, **kwargs).result()
+
+    def analyze_all(self, data, plugins=None, plugin_kwargs=None) -> dict:
+        """
+        plugins（既定は全解析プラグイン）を並行に実行し、名前 -> 結果の辞書を返す。
+        失敗したプラグインの値は PluginWorkerError のインスタンスになる。
+        """
+        plugins = list(plugins or self.plugins)
+        if not plugins:
+            return {}
+        segment = _Segment(data, len(plugins))
+        futures = {name: self._submit(name, segment, (plugin_kwargs or {}).get(name, {})) for name in plugins}
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except PluginWorkerError as e:
+                results[name] = e
+        return results
+
+    def _submit(self, plugin, segment, kwargs):
+        if self._closed:
+            segment.release()
+            raise RuntimeError("PluginWorkerPool is closed")
+        future = Future()
+        self._tasks.put((future, plugin, segment, kwargs))
+        return future
+
+    def _dispatch(self, index):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            future, plugin, segment, kwargs = task
+            if not future.set_running_or_notify_cancel():
+                segment.release()
+                continue
+            try:
+                ok, value, usage = self._workers[index].call(plugin, segment.meta, kwargs, self.task_timeout)
+            except PluginWorkerError as e:
+                logging.error(f"Plugin worker failed running {plugin}: {e}")
+                self._record(plugin, False, None)
+                self._restart(index)
+                future.set_exception(e)
+                continue
+            except Exception as e:
+                self._record(plugin, False, None)
+                self._restart(index)
+                future.set_exception(PluginWorkerError(str(e)))
+                continue
+            finally:
+                segment.release()
+            self._record(plugin, ok, usage)
+            if ok:
+                future.set_result(value)
+            else:
+                logging.error(f"Plugin {plugin} failed in worker: {value}")
+                future.set_exception(PluginWorkerError(value))
+
+    def _restart(self, index):
+        self._workers[index].stop(timeout=1)
+        if self._closed:
+            return
+        try:
+            self._workers[index] = _Worker(self._ctx, self.plugin_dirs, self.start_timeout)
+            self.restarts += 1
+        except Exception as e:
+            logging.error(f"Failed to restart plugin worker: {e}")
+
+    def _record(self, plugin, ok, usage):
+        with self._stats_lock:
+            stats = self._stats.setdefault(plugin, {"calls": 0, "failures": 0, "cpu_s": 0.0, "wall_s": 0.0,
+                                                    "max_rss_growth_kb": None, "peak_rss_kb": None})
+            stats["calls"] += 1
+            if not ok:
+                stats["failures"] += 1
+            if usage:
+                stats["cpu_s"] += usage["cpu_s"]
+                stats["wall_s"] += usage["wall_s"]
+                for key, value in (("max_rss_growth_kb", usage["rss_growth_kb"]),
+                                   ("peak_rss_kb", usage["peak_rss_kb"])):
+                    if value is not None:
+                        stats[key] = max(stats[key] or 0, value)
+
+    def stats(self) -> dict:
+        """
+        プラグイン名 -> {calls, failures, cpu_s, wall_s, max_rss_growth_kb, peak_rss_kb}。
+        max_rss_growth_kb は 1 回の呼び出し中に RSS が開始時から増えた量の最大値、
+        peak_rss_kb は呼び出し中のワーカーの RSS の最大値（ワーカー自身の常駐分を含む）。
+        Linux 以外では呼び出しごとに最大 RSS を戻せないため、peak_rss_kb はワーカーの起動以来の最大値になり、
+        max_rss_growth_kb はその最大値を押し上げた分（下限）になる。
+        """
+        with self._stats_lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._tasks.put(None)
+        for thread in self._threads:
+            thread.join()
+        for worker in self._workers:
+            worker.stop()
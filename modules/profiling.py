@@ -0,0 +1,230 @@
+import os
+import re
+import sys
+import time
+import pstats
+import cProfile
+import argparse
+import logging
+import threading
+import functools
+import itertools
+import tracemalloc
+from interfaces import IAnalysis
+from config_manager import get_config
+
+# 解析関数・IAnalysis プラグインの呼び出しごとに cProfile の結果 (.prof) と
+# tracemalloc のスナップショット (.tracemalloc) をプロファイルディレクトリへ書き出す。
+# 有効化は環境変数 PIPELINE_PROFILE=1 か config.json の "profile": true（環境変数が優先）。
+PROFILE_ENV = "PIPELINE_PROFILE"
+PROFILE_DIR_ENV = "PIPELINE_PROFILE_DIR"
+PROFILE_MEMORY_ENV = "PIPELINE_PROFILE_MEMORY"
+DEFAULT_PROFILE_DIR = "profiles"
+
+_TRUE_VALUES = ("1", "true", "yes", "on")
+_state = threading.local()  # 実行中のプロファイル（cProfile は入れ子にできないため外側だけ計測する）
+_sequence = itertools.count()
+
+def _env_flag(name):
+    value = os.environ.get(name)
+    if value is None:
+        return None
+    return value.strip().lower() in _TRUE_VALUES
+
+def profiling_enabled() -> bool:
+    flag = _env_flag(PROFILE_ENV)
+    if flag is not None:
+        return flag
+    return bool(get_config().get_bool("profile", False))
+
+def memory_profiling_enabled() -> bool:
+    flag = _env_flag(PROFILE_MEMORY_ENV)
+    if flag is not None:
+        return flag
+    return bool(get_config().get_bool("profile_memory", False))
+
+def profile_dir() -> str:
+    return os.environ.get(PROFILE_DIR_ENV) or get_config().get_str("profile_dir", DEFAULT_PROFILE_DIR)
+
+def _output_base(name):
+    safe = re.sub(r"[^\w.-]", "_", name)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{safe}-{stamp}-{os.getpid()}-{next(_sequence)}")
+
+def profiled(name: str):
+    """
+    関数呼び出しを cProfile で計測するデコレータ。プロファイリングが無効なら関数をそのまま呼ぶ。
+    計測中の関数から呼ばれた別の profiled 関数は、外側のプロファイルに含まれる。
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if getattr(_state, "active", False) or not profiling_enabled():
+                return func(*args, **kwargs)
+            base = _output_base(name)
+            track_memory = memory_profiling_enabled()
+            started_tracing = track_memory and not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start(25)
+            profiler = cProfile.Profile()
+            _state.active = True
+            try:
+                profiler.enable()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    profiler.disable()
+            finally:
+                _state.active = False
+                try:
+                    if track_memory:
+                        # cProfile の集計処理自体の確保が混ざらないよう、先にスナップショットを取る
+                        snapshot = tracemalloc.take_snapshot().filter_traces(
+                            [tracemalloc.Filter(False, tracemalloc.__file__)])
+                        snapshot.dump(base + ".tracemalloc")
+                    profiler.dump_stats(base + ".prof")
+                    logging.debug("Profile written to %s.prof", base)
+                except OSError as e:
+                    logging.warning(f"Failed to write profile for {name}: {e}")
+                if started_tracing:
+                    tracemalloc.stop()
+
+        wrapper.__wrapped_profiled__ = True
+        return wrapper
+    return decorator
+
+def instrument_plugin_module(module) -> int:
+    """プラグインモジュール内の IAnalysis 実装の analyze を profiled で包む。包んだクラス数を返す"""
+    count = 0
+    for obj in vars(module).values():
+        if (isinstance(obj, type) and issubclass(obj, IAnalysis) and obj is not IAnalysis
+                and obj.__module__ == module.__name__):
+            analyze = obj.__dict__.get("analyze")
+            if analyze is not None and not getattr(analyze, "__wrapped_profiled__", False):
+                obj.analyze = profiled(f"plugin.{obj.__name__}")(analyze)
+                count += 1
+    return count
+
+# ---- 集計 CLI ----
+
+def _profile_files(paths, suffix, name=None):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for entry in sorted(os.listdir(path)):
+                if entry.endswith(suffix) and (name is None or entry.startswith(name)):
+                    files.append(os.path.join(path, entry))
+        elif path.endswith(suffix):
+            files.append(path)
+    return files
+
+def _frame_label(func):
+    filename, lineno, funcname = func
+    if filename == "~":
+        return funcname  # 組み込み関数 ("<built-in method ...>")
+    return f"{funcname} ({os.path.basename(filename)}:{lineno})"
+
+def folded_stacks(stats: pstats.Stats, max_depth: int = 64, min_fraction: float = 1e-4) -> dict:
+    """
+    cProfile の呼び出し関係（呼び出し元 → 呼び出し先の累積時間）から、
+    flamegraph.pl / speedscope が読める "a;b;c 自己時間(μs)" 形式のスタックを近似的に組み立てる。
+    関数の自己時間は、呼び出し元ごとの累積時間の比率で各スタックへ配分する。
+    配分後の累積時間が全体の min_fraction 未満になる枝は辿らない（経路数の爆発を防ぐ）。
+    """
+    raw = stats.stats  # func -> (cc, nc, tt, ct, callers{caller: (cc, nc, tt, ct)})
+    callees = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+    roots = [func for func, entry in raw.items() if not entry[4]]
+    min_time = sum(raw[root][3] for root in roots) * min_fraction
+    stacks = {}
+
+    def walk(func, path, share):
+        _, _, tt, ct, _ = raw[func]
+        labels = path + [_frame_label(func)]
+        self_us = tt * share * 1e6
+        if self_us >= 1:
+            key = ";".join(labels)
+            stacks[key] = stacks.get(key, 0) + self_us
+        if len(labels) >= max_depth or ct <= 0:
+            return
+        for child, edge_ct in callees.get(func, ()):
+            if _frame_label(child) in labels:
+                continue  # 再帰は打ち切る
+            child_ct = raw[child][3]
+            if child_ct <= 0 or edge_ct <= 0:
+                continue
+            child_share = share * min(1.0, edge_ct / child_ct)
+            if child_ct * child_share >= min_time:
+                walk(child, labels, child_share)
+
+    for root in roots:
+        walk(root, [], 1.0)
+    return {key: int(value) for key, value in stacks.items() if int(value) > 0}
+
+def _cmd_top(args):
+    files = _profile_files(args.paths, ".prof", args.name)
+    if not files:
+        print("No profiles found")
+        return 1
+    stats = pstats.Stats(*files, stream=sys.stdout)
+    stats.strip_dirs().sort_stats(args.sort).print_stats(args.limit)
+    return 0
+
+def _cmd_folded(args):
+    files = _profile_files(args.paths, ".prof", args.name)
+    if not files:
+        print("No profiles found")
+        return 1
+    stacks = folded_stacks(pstats.Stats(*files))
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for key, value in sorted(stacks.items()):
+            out.write(f"{key} {value}\n")
+    finally:
+        if args.output:
+            out.close()
+    return 0
+
+def _cmd_memory(args):
+    files = _profile_files(args.paths, ".tracemalloc", args.name)
+    if not files:
+        print("No memory snapshots found")
+        return 1
+    totals = {}
+    for path in files:
+        for stat in tracemalloc.Snapshot.load(path).statistics("lineno"):
+            frame = stat.traceback[0]
+            key = f"{frame.filename}:{frame.lineno}"
+            size, count = totals.get(key, (0, 0))
+            totals[key] = (max(size, stat.size), count + stat.count)
+    print(f"{'location':<70} {'max_bytes':>12} {'blocks':>10}")
+    for key, (size, count) in sorted(totals.items(), key=lambda kv: kv[1][0], reverse=True)[:args.limit]:
+        print(f"{key[-70:]:<70} {size:>12} {count:>10}")
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="プロファイルディレクトリの計測結果を集計する")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    top = sub.add_parser("top", help="複数の .prof をまとめて関数別の時間を表示する")
+    top.add_argument("--sort", default="cumulative", help="pstats の並べ替えキー (cumulative, tottime など)")
+    folded = sub.add_parser("folded", help="フレームグラフ用の folded スタックを出力する")
+    folded.add_argument("-o", "--output", help="出力ファイル（省略時は標準出力）")
+    memory = sub.add_parser("memory", help="tracemalloc スナップショットの確保量が多い行を表示する")
+    for p in (top, folded, memory):
+        p.add_argument("paths", nargs="*", default=[DEFAULT_PROFILE_DIR], help="プロファイルのファイルまたはディレクトリ")
+        p.add_argument("--name", help="この名前で始まるプロファイルだけを対象にする（例: analyze.anova）")
+    for p in (top, memory):
+        p.add_argument("--limit", type=int, default=30, help="表示する行数")
+
+    args = parser.parse_args(argv)
+    handlers = {"top": _cmd_top, "folded": _cmd_folded, "memory": _cmd_memory}
+    return handlers[args.command](args)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
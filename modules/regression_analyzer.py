@@ -3,14 +3,55 @@ import csv
 import logging
 import numpy as np
 import matplotlib.pyplot as plt
+from result_store import ResultStore, check_result_store, save_to_result_store
+from analysis_cache import memoize_analysis
+from metrics import timed, record_metrics
+from profiling import profiled
 
-def analyze_regression(csv_file="sample_regression.csv", output_image="regression_analysis.png"):
+def fit_regression(x, y) -> dict:
+    """x, y（numpy 配列）の線形回帰。傾き・切片・決定係数 (R²)・点数を返す"""
+    # 線形回帰: np.polyfit で1次関数のフィッティング
+    slope, intercept = np.polyfit(x, y, 1)
+    # 回帰直線の予測値を計算
+    y_pred = slope * x + intercept
+    # 決定係数 R^2 を計算
+    ss_res = np.sum((y - y_pred) ** 2)
+    ss_tot = np.sum((y - np.mean(y)) ** 2)
+    r2 = 1 - (ss_res / ss_tot) if ss_tot != 0 else 0
+
+    logging.info(f"Linear Regression Results: slope = {slope:.3f}, intercept = {intercept:.3f}, R² = {r2:.3f}")
+    return {"slope": float(slope), "intercept": float(intercept), "r2": float(r2), "n": int(len(x))}
+
+def plot_regression(x, y, result, output_image):
+    """データ点と fit_regression() の回帰直線をプロットして output_image に保存する"""
+    y_pred = result["slope"] * x + result["intercept"]
+    plt.figure(figsize=(8, 6))
+    plt.scatter(x, y, label="Data Points", color="blue")
+    plt.plot(x, y_pred, label="Regression Line", color="red")
+    plt.xlabel("X")
+    plt.ylabel("Y")
+    plt.title("Linear Regression Analysis")
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(output_image)
+    plt.close()
+    logging.info(f"Regression analysis plot saved as {output_image}")
+
+@timed("analyze.regression", input_arg="csv_file")
+@memoize_analysis("regression", artifact_args=("output_image",))
+@profiled("analyze.regression")
+def analyze_regression(csv_file="sample_regression.csv", output_image="regression_analysis.png", store=None):
     """
     CSVファイル内の "x" と "y" の2変量データに対して線形回帰分析を実施します。
     - CSVファイルはヘッダーに "x", "y" を持つ形式で、各行がデータ点となります。
     - 線形回帰を行い、回帰直線の傾き、切片、決定係数 (R²) を計算します。
     - データ点と回帰直線をプロットし、結果を画像ファイルに保存します。
+    - store (ResultStore) を渡すと保存済みの結果があればそれを返し、なければ計算結果を保存します。
     """
+    fingerprint, cached = check_result_store(store, "regression", csv_file, {}, output_image)
+    if cached is not None:
+        return cached
+
     x_values = []
     y_values = []
     try:
@@ -22,6 +63,7 @@ def analyze_regression(csv_file="sample_regression.csv", output_image="regressio
                     y_values.append(float(row["y"]))
                 except ValueError:
                     continue  # 数値変換できなければスキップ
+        record_metrics(rows=len(x_values))
         if not x_values or not y_values:
             logging.error("No data found in CSV for regression analysis.")
             return
@@ -32,30 +74,10 @@ def analyze_regression(csv_file="sample_regression.csv", output_image="regressio
     # numpy 配列に変換
     x = np.array(x_values)
     y = np.array(y_values)
-
-    # 線形回帰: np.polyfit で1次関数のフィッティング
-    slope, intercept = np.polyfit(x, y, 1)
-    # 回帰直線の予測値を計算
-    y_pred = slope * x + intercept
-    # 決定係数 R^2 を計算
-    ss_res = np.sum((y - y_pred) ** 2)
-    ss_tot = np.sum((y - np.mean(y)) ** 2)
-    r2 = 1 - (ss_res / ss_tot) if ss_tot != 0 else 0
-
-    logging.info(f"Linear Regression Results: slope = {slope:.3f}, intercept = {intercept:.3f}, R² = {r2:.3f}")
-
-    # プロット作成
-    plt.figure(figsize=(8, 6))
-    plt.scatter(x, y, label="Data Points", color="blue")
-    plt.plot(x, y_pred, label="Regression Line", color="red")
-    plt.xlabel("X")
-    plt.ylabel("Y")
-    plt.title("Linear Regression Analysis")
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(output_image)
-    plt.close()
-    logging.info(f"Regression analysis plot saved as {output_image}")
+    result = fit_regression(x, y)
+    plot_regression(x, y, result, output_image)
+    save_to_result_store(store, "regression", fingerprint, {}, result, csv_file, output_image)
+    return result
 
 def main():
     logging.basicConfig(
@@ -64,7 +86,7 @@ def main():
         datefmt="%Y-%m-%d %H:%M:%S"
     )
     logging.info("Starting Regression Analyzer")
-    analyze_regression()
+    analyze_regression(store=ResultStore())
     logging.info("Regression analysis completed.")
 
 if __name__ == "__main__":
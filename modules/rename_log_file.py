@@ -1,26 +1,176 @@
 import os
+import re
+import glob
+import gzip
+import time
+import shutil
 import logging
 
-def rename_log_file_with_summary(log_file="private_app.log"):
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# '%(asctime)s - %(levelname)s - %(message)s' 形式の行のレベル名。
+# タイムスタンプ部分は数字と区切り文字だけに限定し、メッセージ中の " - ERROR - " は数えない
+_LEVEL_PATTERN = re.compile(rb"^[\d\-:,. T]* - (" + b"|".join(l.encode() for l in LEVELS) + rb") - ", re.M)
+_TIMESTAMP_PATTERN = re.compile(rb"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})")
+# チャンク境界をまたぐ行について持ち越す先頭のバイト数（タイムスタンプ + レベル名が収まる長さ）
+_PREFIX_LIMIT = 256
+
+def count_log_levels(log_file: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict:
     """
-    指定したログファイルを読み込み、"ERROR" という文字列があれば、
-    ファイル名に "ERROR" を付加し、なければ "OK" を付加してリネームする。
-    既に同名のファイルが存在する場合は削除して上書きする。
+    ログファイルを chunk_size バイトずつ読み、レベルごとの行数と総行数を 1 パスで数える。
+    チャンク境界をまたぐ行は先頭 _PREFIX_LIMIT バイト（レベル名の判定に使う部分）だけを持ち越すため、
+    改行のない非常に長い行があってもメモリ使用量はチャンクサイズ程度で一定。
     """
+    counts = dict.fromkeys(LEVELS, 0)
+    lines = 0
+    head = b""       # 改行で終わっていない行の先頭部分
+    pending = False  # 前のチャンクから行が続いているか
+    with open(log_file, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            first = chunk.find(b"\n")
+            if first < 0:
+                if len(head) < _PREFIX_LIMIT:
+                    head += chunk[:_PREFIX_LIMIT - len(head)]
+                pending = True
+                continue
+            start = 0
+            if pending:
+                # 持ち越した行をこのチャンクの最初の改行までで閉じる
+                line_head = head + chunk[:min(first, max(0, _PREFIX_LIMIT - len(head)))]
+                lines += 1
+                match = _LEVEL_PATTERN.match(line_head)
+                if match:
+                    counts[match.group(1).decode()] += 1
+                start = first + 1
+            end = chunk.rfind(b"\n") + 1
+            block = chunk[start:end]
+            lines += block.count(b"\n")
+            for level in _LEVEL_PATTERN.findall(block):
+                counts[level.decode()] += 1
+            head = chunk[end:end + _PREFIX_LIMIT]
+            pending = end < len(chunk)
+    if pending:
+        lines += 1
+        match = _LEVEL_PATTERN.match(head)
+        if match:
+            counts[match.group(1).decode()] += 1
+    counts["lines"] = lines
+    return counts
+
+def summarize_counts(counts: dict) -> str:
+    """レベル別の件数から ERROR / WARNING / OK の判定を返す"""
+    if counts.get("ERROR") or counts.get("CRITICAL"):
+        return "ERROR"
+    if counts.get("WARNING"):
+        return "WARNING"
+    return "OK"
+
+def format_counts(counts: dict) -> str:
+    return ", ".join(f"{level}={counts.get(level, 0)}" for level in LEVELS) + f", lines={counts.get('lines', 0)}"
+
+def _first_record_time(log_file: str):
+    """先頭レコードのタイムスタンプ（UNIX 時刻）。読み取れなければ None"""
+    with open(log_file, "rb") as f:
+        match = _TIMESTAMP_PATTERN.match(f.read(64))
+    if match is None:
+        return None
     try:
-        with open(log_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-        if "ERROR" in content:
-            summary = "ERROR"
-        elif "WARNING" in content:
-            summary = "WARNING"
-        else:
-            summary = "OK"
+        return time.mktime(time.strptime(match.group(1).decode(), TIMESTAMP_FORMAT))
+    except ValueError:
+        return None
+
+def _compress_file(src: str, dst: str) -> None:
+    """src を gzip 圧縮して dst に書き出し、src を削除する（ストリーミングで処理する）"""
+    tmp = dst + ".tmp"
+    with open(src, "rb") as fin, gzip.open(tmp, "wb", compresslevel=6) as fout:
+        shutil.copyfileobj(fin, fout, DEFAULT_CHUNK_SIZE)
+    os.replace(tmp, dst)
+    os.remove(src)
+
+def _prune_backups(pattern: str, backup_count: int) -> None:
+    backups = sorted(glob.glob(pattern), key=os.path.getmtime, reverse=True)
+    for old in backups[backup_count:]:
+        os.remove(old)
+        logging.debug(f"Old rotated log {old} removed.")
+
+def should_rotate(log_file: str, max_bytes: int = None, max_age: float = None) -> bool:
+    """サイズが max_bytes 以上、または先頭レコードが max_age 秒より古ければ True"""
+    if not os.path.exists(log_file):
+        return False
+    if max_bytes is not None and os.path.getsize(log_file) >= max_bytes:
+        return True
+    if max_age is not None:
+        started = _first_record_time(log_file)
+        if started is not None and time.time() - started >= max_age:
+            return True
+    return False
+
+def rotate_log_file(log_file="private_app.log", max_bytes: int = None, max_age: float = None,
+                    backup_count: int = 5, compress: bool = True, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    サイズまたは経過時間の条件を満たしたログを <名前>_<判定>_<日時>.log(.gz) に移し、
+    backup_count 個より古いローテーション済みファイルを削除する。
+    条件を満たさない場合は何もせず None、ローテーションした場合はレベル別件数の辞書を返す。
+    max_bytes と max_age のどちらも指定しなければ常にローテーションする。
+    """
+    try:
+        if not os.path.exists(log_file):
+            return None
+        if (max_bytes is not None or max_age is not None) and not should_rotate(log_file, max_bytes, max_age):
+            return None
+        counts = count_log_levels(log_file, chunk_size)
+        summary = summarize_counts(counts)
+        base = os.path.splitext(log_file)[0]
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        rotated = f"{base}_{summary}_{stamp}.log"
+        n = 1
+        while os.path.exists(rotated) or os.path.exists(rotated + ".gz"):
+            rotated = f"{base}_{summary}_{stamp}-{n}.log"
+            n += 1
+        os.replace(log_file, rotated)
+        if compress:
+            _compress_file(rotated, rotated + ".gz")
+            rotated += ".gz"
+        _prune_backups(f"{glob.escape(base)}_*_*.log*", backup_count)
+        logging.info(f"Log file rotated to {rotated} ({summary}: {format_counts(counts)})")
+        counts["summary"] = summary
+        counts["path"] = rotated
+        return counts
+    except Exception as e:
+        logging.error(f"Failed to rotate log file: {e}")
+        return None
+
+def rename_log_file_with_summary(log_file="private_app.log", compress: bool = False,
+                                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    指定したログファイルをチャンク単位で読み込んでレベル別の行数を数え、
+    ERROR（CRITICAL を含む）があればファイル名に "ERROR"、WARNING があれば "WARNING"、
+    どちらもなければ "OK" を付加してリネームする。
+    既に同名のファイルが存在する場合は削除して上書きする。compress=True なら gzip 圧縮する。
+    レベル別の件数（"summary" に判定、"path" に新しいファイル名）を返す。失敗時は None。
+    """
+    try:
+        counts = count_log_levels(log_file, chunk_size)
+        summary = summarize_counts(counts)
         new_log_file = f"private_app_{summary}.log"
+        if compress:
+            new_log_file += ".gz"
         if os.path.exists(new_log_file):
             os.remove(new_log_file)
             logging.debug(f"Existing file {new_log_file} removed.")
-        os.rename(log_file, new_log_file)
-        logging.info(f"Log file renamed to {new_log_file} based on summary: {summary}")
+        if compress:
+            _compress_file(log_file, new_log_file)
+        else:
+            os.replace(log_file, new_log_file)
+        logging.info(f"Log file renamed to {new_log_file} based on summary: {summary} ({format_counts(counts)})")
+        counts["summary"] = summary
+        counts["path"] = new_log_file
+        return counts
     except Exception as e:
         logging.error(f"Failed to rename log file: {e}")
+        return None
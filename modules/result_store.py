@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from db_connector import DBConnector
+from config_manager import get_config
+
+# 解析結果テーブル。(analysis_type, input_fingerprint, params_key) で一意になり、
+# 同じ入力・同じパラメータの解析結果は 1 行だけ保持される。
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS analysis_results (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        analysis_type TEXT NOT NULL,
+        input_fingerprint TEXT NOT NULL,
+        params_key TEXT NOT NULL,
+        result TEXT NOT NULL,
+        input_path TEXT,
+        artifact_path TEXT,
+        created_at REAL NOT NULL,
+        UNIQUE (analysis_type, input_fingerprint, params_key)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_analysis_results_type_created "
+    "ON analysis_results (analysis_type, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_analysis_results_fingerprint "
+    "ON analysis_results (input_fingerprint)",
+)
+
+# (パス, サイズ, mtime) -> ハッシュ。同一プロセス内で変更のないファイルを再ハッシュしない
+_fingerprint_cache = {}
+
+def fingerprint_file(path: str, chunk_size: int = 1 << 20) -> str:
+    """ファイル内容の SHA-256 を返す。ファイルは chunk_size ずつ読むためメモリ使用量は一定"""
+    stat = os.stat(path)
+    cache_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    digest = _fingerprint_cache.get(cache_key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        _fingerprint_cache[cache_key] = digest
+    return digest
+
+def make_params_key(params: dict) -> str:
+    """パラメータ辞書をキー順に正規化した JSON 文字列にする"""
+    return json.dumps(params or {}, sort_keys=True, ensure_ascii=False, default=str)
+
+class ResultStore:
+    """
+    DBConnector（app.db）上の解析結果ストア。
+    解析の種類・入力ファイルのフィンガープリント・パラメータをキーに結果を JSON で保存し、
+    インデックス付きで引けるようにする。
+    """
+    def __init__(self, db: DBConnector = None, db_path: str = None):
+        if db is None:
+            if db_path is None:
+                db_path = get_config().get_str("db_path", "app.db")
+            db = DBConnector()
+            db.connect(db_path)
+        self.db = db
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        with self.db.transaction() as conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+
+    def lookup(self, analysis_type: str, input_fingerprint: str, params: dict = None):
+        """保存済みの結果（辞書）を返す。なければ None"""
+        row = self.db.execute(
+            "SELECT result FROM analysis_results "
+            "WHERE analysis_type = ? AND input_fingerprint = ? AND params_key = ?",
+            (analysis_type, input_fingerprint, make_params_key(params))
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def save(self, analysis_type: str, input_fingerprint: str, params: dict, result: dict,
+             input_path: str = None, artifact_path: str = None) -> None:
+        """結果を保存する（同じキーの結果があれば置き換える）"""
+        with self.db.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO analysis_results "
+                "(analysis_type, input_fingerprint, params_key, result, input_path, artifact_path, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (analysis_type, input_fingerprint, make_params_key(params),
+                 json.dumps(result, ensure_ascii=False, default=str),
+                 input_path, artifact_path, time.time())
+            )
+        logging.debug("Stored %s result for %s", analysis_type, input_fingerprint)
+
+    def query(self, analysis_type: str = None, since: float = None, limit: int = 100) -> list:
+        """解析結果を新しい順に返す。analysis_type と since（UNIX 時刻）で絞り込める"""
+        conditions = []
+        params = []
+        if analysis_type is not None:
+            conditions.append("analysis_type = ?")
+            params.append(analysis_type)
+        if since is not None:
+            conditions.append("created_at >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        rows = self.db.execute(
+            "SELECT analysis_type, input_fingerprint, params_key, result, input_path, artifact_path, created_at "
+            f"FROM analysis_results {where}ORDER BY created_at DESC LIMIT ?",
+            tuple(params) + (limit,)
+        ).fetchall()
+        return [
+            {
+                "analysis_type": r[0],
+                "input_fingerprint": r[1],
+                "params": json.loads(r[2]),
+                "result": json.loads(r[3]),
+                "input_path": r[4],
+                "artifact_path": r[5],
+                "created_at": r[6],
+            }
+            for r in rows
+        ]
+
+def check_result_store(store, analysis_type: str, input_file: str, params: dict, artifact_path: str = None):
+    """
+    解析関数の先頭で呼び出し、(フィンガープリント, キャッシュ済み結果) を返す。
+    store が None、入力が読めない、または artifact_path（出力画像）が存在しない場合、結果は None になる。
+    """
+    if store is None:
+        return None, None
+    try:
+        fingerprint = fingerprint_file(input_file)
+        cached = store.lookup(analysis_type, fingerprint, params)
+    except Exception as e:
+        logging.warning(f"Result store lookup failed for '{input_file}': {e}")
+        return None, None
+    if cached is not None and (artifact_path is None or os.path.exists(artifact_path)):
+        logging.info(f"Using stored {analysis_type} result for '{input_file}'")
+        return fingerprint, cached
+    return fingerprint, None
+
+def save_to_result_store(store, analysis_type: str, fingerprint: str, params: dict, result: dict,
+                         input_file: str = None, artifact_path: str = None) -> None:
+    """解析結果をストアに保存する。store が None のときは何もしない"""
+    if store is None or fingerprint is None:
+        return
+    try:
+        store.save(analysis_type, fingerprint, params, result, input_file, artifact_path)
+    except Exception as e:
+        logging.warning(f"Failed to store {analysis_type} result: {e}")
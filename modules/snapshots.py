@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+
+# modules/ や config.json のスナップショットを .snapshots/<世代番号>/ に保存する。
+# 各世代には manifest.json（パス -> [サイズ, mtime_ns, sha256]）を置き、前の世代と内容が同じファイルは
+# ハードリンクで共有し、変わったファイルだけをコピーする。復元はディレクトリを組み立ててから入れ替える。
+DEFAULT_STORE = ".snapshots"
+DEFAULT_KEEP = 5
+MANIFEST = "manifest.json"
+SNAPSHOT_VERSION = 1
+_SKIP_DIRS = {"__pycache__"}
+_HASH_CHUNK = 1 << 20
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_CHUNK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _fingerprint(path, previous=None):
+    """[サイズ, mtime_ns, ハッシュ]。サイズと mtime が previous と同じならハッシュを計算し直さない"""
+    st = os.stat(path)
+    if previous and previous[0] == st.st_size and previous[1] == st.st_mtime_ns:
+        return previous
+    return [st.st_size, st.st_mtime_ns, _file_hash(path)]
+
+def _iter_files(root, source):
+    """source（ファイルまたはディレクトリ）以下のファイルの、root からの相対パス"""
+    path = os.path.join(root, source)
+    if os.path.isfile(path):
+        yield source
+        return
+    stack = [source]
+    while stack:
+        current = stack.pop()
+        with os.scandir(os.path.join(root, current)) as it:
+            for entry in it:
+                rel = os.path.join(current, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in _SKIP_DIRS:
+                        stack.append(rel)
+                elif entry.is_file(follow_symlinks=False):
+                    yield rel
+
+def _generation_numbers(store):
+    """世代ディレクトリの番号（古い順）。マニフェストが壊れた世代も含む"""
+    if not os.path.isdir(store):
+        return []
+    return sorted(int(name) for name in os.listdir(store) if name.isdigit())
+
+def list_snapshots(store=DEFAULT_STORE):
+    """完成済みの世代番号（古い順）"""
+    return [generation for generation in _generation_numbers(store)
+            if os.path.exists(os.path.join(_generation_dir(store, generation), MANIFEST))]
+
+def _read_manifest(store, generation):
+    path = os.path.join(_generation_dir(store, generation), MANIFEST)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("version") != SNAPSHOT_VERSION:
+        return None
+    return manifest
+
+def load_manifest(store=DEFAULT_STORE, generation=None):
+    """
+    (世代番号, マニフェスト) を返す。読めなければ (None, None)。
+    generation を省略すると、マニフェストを読める世代のうち最新のもの（壊れた世代は飛ばす）。
+    """
+    if generation is not None:
+        manifest = _read_manifest(store, generation)
+        return (generation, manifest) if manifest is not None else (None, None)
+    for candidate in reversed(list_snapshots(store)):
+        manifest = _read_manifest(store, candidate)
+        if manifest is not None:
+            return candidate, manifest
+        logging.warning(f"Skipping snapshot {candidate}: unreadable manifest")
+    return None, None
+
+def _generation_dir(store, generation):
+    return os.path.join(store, f"{generation:06d}")
+
+def take_snapshot(sources, root=".", store=DEFAULT_STORE, keep=DEFAULT_KEEP):
+    """
+    sources（root からの相対パス。ディレクトリまたはファイル）のスナップショットを作り、
+    (世代番号, 統計 {"linked", "copied"}) を返す。keep 世代より古いものは削除する。
+    """
+    store = os.path.join(root, store)
+    os.makedirs(store, exist_ok=True)
+    # ハードリンクの元にするのは読める最新の世代だが、番号は壊れた世代も含めた最大値の次にする
+    # （壊れた世代の番号と重なったり、古い番号で作って直後に prune されたりしないように）
+    previous_generation, previous = load_manifest(store)
+    previous_files = previous["files"] if previous else {}
+    generation = max(_generation_numbers(store), default=0) + 1
+    staging = os.path.join(store, f"{generation:06d}.tmp-{os.getpid()}")
+    shutil.rmtree(staging, ignore_errors=True)
+    files, directories, stats = {}, [], {"linked": 0, "copied": 0}
+    for source in sources:
+        if not os.path.exists(os.path.join(root, source)):
+            continue
+        if os.path.isdir(os.path.join(root, source)):
+            directories.append(source)
+        for rel in _iter_files(root, source):
+            src = os.path.join(root, rel)
+            old = previous_files.get(rel)
+            fp = _fingerprint(src, old)
+            dst = os.path.join(staging, rel)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            if old is not None and old[2] == fp[2]:
+                # 内容が前の世代と同じなら、前の世代のファイルをハードリンクで共有する
+                try:
+                    os.link(os.path.join(_generation_dir(store, previous_generation), rel), dst)
+                    stats["linked"] += 1
+                    files[rel] = fp
+                    continue
+                except OSError:
+                    pass
+            shutil.copy2(src, dst)
+            stats["copied"] += 1
+            files[rel] = fp
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "sources": list(sources),
+        "directories": directories,
+        "files": files,
+    }
+    with open(os.path.join(staging, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, sort_keys=True)
+    # マニフェストまで書き終えてから名前を変えるため、途中で止まっても壊れた世代は残らない
+    os.rename(staging, _generation_dir(store, generation))
+    prune_snapshots(store, keep)
+    logging.info(f"Snapshot {generation} of {', '.join(sources)}: {stats}")
+    return generation, stats
+
+def prune_snapshots(store=DEFAULT_STORE, keep=DEFAULT_KEEP):
+    """
+    読める世代のうち新しい keep 世代だけを残し、それより古い世代は壊れたものも含めて消す
+    （ハードリンクなので、残る世代のファイルは消えない）
+    """
+    valid = [generation for generation in list_snapshots(store) if _read_manifest(store, generation) is not None]
+    if keep > 0 and len(valid) > keep:
+        oldest_kept = valid[-keep]
+        for generation in _generation_numbers(store):
+            if generation < oldest_kept:
+                shutil.rmtree(_generation_dir(store, generation), ignore_errors=True)
+    for name in os.listdir(store):
+        if ".tmp-" in name:
+            shutil.rmtree(os.path.join(store, name), ignore_errors=True)
+
+def _same_content(path, fp):
+    try:
+        return _fingerprint(path, fp)[2] == fp[2]
+    except OSError:
+        return False
+
+def _restore_directory(root, directory, snapshot_dir, files, stats):
+    """
+    作業ディレクトリの directory を、スナップショットの内容で組み立て直したディレクトリと入れ替える。
+    内容が変わっていないファイルは作業中のファイルをハードリンクし、変わったものだけをコピーする。
+    """
+    target = os.path.join(root, directory)
+    staging = f"{target}.restore-{os.getpid()}"
+    old = f"{target}.old-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    prefix = directory + os.sep
+    for rel, fp in files.items():
+        if not rel.startswith(prefix):
+            continue
+        current = os.path.join(root, rel)
+        dst = os.path.join(staging, rel[len(prefix):])
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        if _same_content(current, fp):
+            try:
+                os.link(current, dst)
+                stats["kept"] += 1
+                continue
+            except OSError:
+                pass
+        # スナップショットのファイルはハードリンクせずにコピーする（作業中の書き換えでスナップショットを壊さない）
+        shutil.copy2(os.path.join(snapshot_dir, rel), dst)
+        stats["copied"] += 1
+    os.makedirs(staging, exist_ok=True)
+    if os.path.exists(target):
+        os.rename(target, old)
+    try:
+        os.rename(staging, target)
+    except OSError:
+        if os.path.exists(old):
+            os.rename(old, target)
+        raise
+    shutil.rmtree(old, ignore_errors=True)
+
+def restore_snapshot(root=".", store=DEFAULT_STORE, generation=None, sources=None):
+    """
+    スナップショット（既定は最新）を復元し、統計 {"kept", "copied"} を返す。スナップショットがなければ None。
+    sources を渡すと、スナップショットのソースのうちそこに含まれるものだけを復元する（既定は全ソース）。
+    ディレクトリは入れ替え、ファイルは一時ファイルを書いてから os.replace する。
+    スナップショット時に存在しなかったパスには触れない。
+    """
+    store = os.path.join(root, store)
+    generation, manifest = load_manifest(store, generation)
+    if manifest is None:
+        return None
+    snapshot_dir = _generation_dir(store, generation)
+    files = manifest["files"]
+    stats = {"kept": 0, "copied": 0}
+    for source in manifest["sources"]:
+        if sources is not None and source not in sources:
+            continue
+        if source in manifest["directories"]:
+            _restore_directory(root, source, snapshot_dir, files, stats)
+        elif source in files:
+            target = os.path.join(root, source)
+            if _same_content(target, files[source]):
+                stats["kept"] += 1
+                continue
+            tmp = f"{target}.restore-{os.getpid()}"
+            shutil.copy2(os.path.join(snapshot_dir, source), tmp)
+            os.replace(tmp, target)
+            stats["copied"] += 1
+    logging.info(f"Restored snapshot {generation}: {stats}")
+    return stats
@@ -2,12 +2,30 @@ import os
 import csv
 import logging
 from scipy import stats
+from result_store import ResultStore, check_result_store, save_to_result_store
+from analysis_cache import memoize_analysis
+from metrics import timed, record_metrics
+from profiling import profiled
 
-def analyze_t_test(csv_file="sample_stat.csv"):
+def compute_t_test(group1, group2) -> dict:
+    """2 群の独立サンプルの t 検定"""
+    t_stat, p_val = stats.ttest_ind(group1, group2)
+    logging.info(f"t検定結果: t統計量 = {t_stat:.3f}, p値 = {p_val:.3f}")
+    return {"t_statistic": float(t_stat), "p_value": float(p_val), "n1": len(group1), "n2": len(group2)}
+
+@timed("analyze.t_test", input_arg="csv_file")
+@memoize_analysis("t_test")
+@profiled("analyze.t_test")
+def analyze_t_test(csv_file="sample_stat.csv", store=None):
     """
     CSVファイルは、ヘッダーに "group1" と "group2" を持つ2群の数値データを含む形式であることを前提とします。
     各行は2群の対応する観測値となります。
+    store (ResultStore) を渡すと保存済みの結果があればそれを返し、なければ計算結果を保存します。
     """
+    fingerprint, cached = check_result_store(store, "t_test", csv_file, {})
+    if cached is not None:
+        return cached
+
     group1 = []
     group2 = []
     try:
@@ -20,14 +38,18 @@ def analyze_t_test(csv_file="sample_stat.csv"):
                         group2.append(float(row["group2"]))
                     except ValueError:
                         continue  # 数値に変換できない場合はスキップ
+        record_metrics(rows=len(group1))
         if not group1 or not group2:
             logging.error("t検定に必要なデータが不足しています。")
             return
         # 独立サンプルのt検定を実施
-        t_stat, p_val = stats.ttest_ind(group1, group2)
-        logging.info(f"t検定結果: t統計量 = {t_stat:.3f}, p値 = {p_val:.3f}")
+        result = compute_t_test(group1, group2)
     except Exception as e:
         logging.error(f"t検定解析中にエラーが発生しました: {e}")
+        return
+
+    save_to_result_store(store, "t_test", fingerprint, {}, result, csv_file)
+    return result
 
 def main():
     logging.basicConfig(
@@ -36,7 +58,7 @@ def main():
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     logging.info("Statistical Test Analyzer の開始")
-    analyze_t_test()
+    analyze_t_test(store=ResultStore())
     logging.info("Statistical Test Analysis 完了")
 
 if __name__ == "__main__":
@@ -3,34 +3,56 @@ import logging
 import pandas as pd
 import matplotlib.pyplot as plt
 from statsmodels.tsa.seasonal import seasonal_decompose
-import json
+from config_manager import get_config
+from result_store import ResultStore, check_result_store, save_to_result_store
+from analysis_cache import memoize_analysis
+from metrics import timed, record_metrics
+from profiling import profiled
+from columnar_io import read_frame, write_frame
 
 def load_config():
-    """config.json から設定を読み込む。存在しなければ空の辞書を返す。"""
-    config_path = os.path.join(os.getcwd(), "config.json")
-    try:
-        with open(config_path, "r", encoding="utf-8") as f:
-            config = json.load(f)
-        logging.info(f"Config loaded from {config_path}")
-        return config
-    except Exception as e:
-        logging.warning(f"Could not load config file: {e}. Using default settings.")
-        return {}
+    """
+    ConfigManager が保持する config.json のスナップショットを返す。
+    ファイルのパースは初回のみで、以降は変更があったときだけ読み込み直される。
+    """
+    return get_config().snapshot
 
-def analyze_time_series(csv_file="sample_timeseries.csv", output_dir="timeseries_plots"):
+@timed("analyze.time_series", input_arg="csv_file")
+# 分解結果の画像は output_dir 配下に固定名で保存され、period は config.json から読むためキーに含める
+# decomposition_file は出力先なのでキーに含めず成果物として扱う（指定の有無が変わると成果物の数が合わず再計算になる）
+@memoize_analysis(
+    "time_series",
+    artifact_paths=lambda args: [os.path.join(args["output_dir"], "seasonal_decompose.png")]
+    + ([args["decomposition_file"]] if args["decomposition_file"] else []),
+    ignore_args=("store", "decomposition_file"),
+    extra_key=lambda: {"ts_period": load_config().get("ts_period", 12)},
+    store_params=lambda args: {"period": load_config().get("ts_period", 12)},
+)
+@profiled("analyze.time_series")
+def analyze_time_series(csv_file="sample_timeseries.csv", output_dir="timeseries_plots", store=None,
+                        decomposition_file=None):
     """
     CSVファイルは、'date' 列（日付形式）と 'value' 列（数値）が含まれていることが前提です。
     config.json の 'ts_period' キーから季節サイクル期間を取得し、時系列データを季節性分解します。
     分解結果（トレンド、季節性、残差）のプロットを画像ファイルに保存します。
+    decomposition_file（.parquet / .arrow / .feather）を指定すると、分解した各系列を列形式で保存します。
+    store (ResultStore) を渡すと保存済みの結果があればそれを返し、なければ計算結果を保存します。
     """
     # 設定ファイルから period を取得（デフォルトは12）
     config = load_config()
     period = config.get("ts_period", 12)
     logging.info(f"Using period = {period} for time series decomposition.")
 
+    params = {"period": period}
+    output_file = os.path.join(output_dir, "seasonal_decompose.png")
+    fingerprint, cached = check_result_store(store, "time_series", csv_file, params, output_file)
+    if cached is not None and (decomposition_file is None or os.path.exists(decomposition_file)):
+        return cached
+
     try:
-        data = pd.read_csv(csv_file, parse_dates=['date'], index_col='date')
+        data = read_frame(csv_file, columns=['date', 'value'], parse_dates=['date'], index_col='date')
         logging.info(f"CSV file '{csv_file}' loaded successfully.")
+        record_metrics(rows=len(data))
     except Exception as e:
         logging.error(f"Failed to load CSV file '{csv_file}': {e}")
         return
@@ -43,13 +65,31 @@ def analyze_time_series(csv_file="sample_timeseries.csv", output_dir="timeseries
         decomposition = seasonal_decompose(data['value'], model='additive', period=period)
         fig = decomposition.plot()
         os.makedirs(output_dir, exist_ok=True)
-        output_file = os.path.join(output_dir, "seasonal_decompose.png")
         plt.tight_layout()
         plt.savefig(output_file)
         plt.close()
         logging.info(f"Time series decomposition plot saved as '{output_file}'")
+        if decomposition_file:
+            components = pd.DataFrame({
+                "observed": decomposition.observed, "trend": decomposition.trend,
+                "seasonal": decomposition.seasonal, "resid": decomposition.resid,
+            })
+            write_frame(components, decomposition_file, index=True)
+            logging.info(f"Time series components saved as '{decomposition_file}'")
     except Exception as e:
         logging.error(f"Error during time series analysis: {e}")
+        return
+
+    result = {
+        "period": period,
+        "observations": int(len(data)),
+        "trend_mean": float(decomposition.trend.mean()),
+        "seasonal_amplitude": float(decomposition.seasonal.max() - decomposition.seasonal.min()),
+        "resid_std": float(decomposition.resid.std()),
+        "output_file": output_file,
+    }
+    save_to_result_store(store, "time_series", fingerprint, params, result, csv_file, output_file)
+    return result
 
 def main():
     logging.basicConfig(
@@ -58,7 +98,7 @@ def main():
         datefmt="%Y-%m-%d %H:%M:%S"
     )
     logging.info("Starting Time Series Analyzer")
-    analyze_time_series()
+    analyze_time_series(store=ResultStore())
     logging.info("Time series analysis completed.")
 
 if __name__ == "__main__":
@@ -1,37 +1,176 @@
+import os
+import sys
 import json
-import subprocess
+import time
+import shlex
+import hashlib
 import logging
-import sys
-
-# ログ設定（エラーをファイルに記録）
-logging.basicConfig(filename='update_gist.log', level=logging.ERROR)
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 
-try:
-    with open('config.json', 'r', encoding='utf-8') as f:
-        config = json.load(f)
-except Exception as e:
-    logging.error(f"Failed to read config.json: {e}")
-    sys.exit(1)
+# config.json の gist_files を Gist に同期する。
+# 前回アップロードした内容を .gist_manifest.json（ファイル名 -> [サイズ, mtime_ns, sha256]）に記録し、
+# 内容が変わったファイルだけを、ワーカー数を制限して並列にアップロードする（失敗は指数バックオフで再試行）。
+# アップロードに使うコマンドは gist_command で差し替えられる（テストではローカルの代替スクリプトを使う）。
+DEFAULT_COMMAND = ("gh", "gist", "edit")
+DEFAULT_MANIFEST = ".gist_manifest.json"
+DEFAULT_WORKERS = 4
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 1.0
+MANIFEST_VERSION = 1
+_HASH_CHUNK = 1 << 20
 
-gist_id = config.get('gist_id')
-gist_files = config.get('gist_files', [])
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_CHUNK), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
-if not gist_id or not gist_files:
-    logging.error("Missing 'gist_id' or 'gist_files' in config.json.")
-    sys.exit(1)
+def _fingerprint(path, previous=None):
+    """[サイズ, mtime_ns, ハッシュ]。サイズと mtime が previous と同じならハッシュを計算し直さない"""
+    st = os.stat(path)
+    if previous and previous[0] == st.st_size and previous[1] == st.st_mtime_ns:
+        return previous
+    return [st.st_size, st.st_mtime_ns, _file_hash(path)]
 
-error_occurred = False
-for file_name in gist_files:
+def load_manifest(path, gist_id):
+    """前回アップロードした状態。Gist ID が違う・読めない場合は空（全ファイルをアップロードし直す）"""
     try:
-        # GitHub CLI を使用して各ファイルを Gist に追加（既存なら更新）
-        subprocess.run(['gh', 'gist', 'edit', gist_id, '--add', file_name], check=True)
-    except subprocess.CalledProcessError as e:
-        logging.error(f"Failed to update Gist with file '{file_name}': {e}")
-        error_occurred = True
-    except Exception as e:
-        logging.error(f"Unexpected error updating Gist with file '{file_name}': {e}")
-        error_occurred = True
-
-# エラーがあれば終了コード1で終了
-if error_occurred:
-    sys.exit(1)
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("gist_id") != gist_id:
+        return {}
+    return manifest.get("files", {})
+
+def save_manifest(path, gist_id, files):
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "gist_id": gist_id, "files": files}, f, sort_keys=True)
+    os.replace(tmp, path)
+
+def plan_sync(files, manifest, force=False):
+    """
+    (アップロードするファイル, 変更のないファイル, 存在しないファイル, 新しいフィンガープリント) を返す。
+    """
+    changed, unchanged, missing, fingerprints = [], [], [], {}
+    for name in files:
+        try:
+            fp = _fingerprint(name, manifest.get(name))
+        except OSError:
+            missing.append(name)
+            continue
+        fingerprints[name] = fp
+        old = manifest.get(name)
+        if not force and old is not None and old[2] == fp[2]:
+            unchanged.append(name)
+        else:
+            changed.append(name)
+    return changed, unchanged, missing, fingerprints
+
+def upload_file(command, gist_id, file_name, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, timeout=None):
+    """
+    command <gist_id> --add <file_name> を実行する。失敗したら backoff, 2*backoff, ... 秒待って
+    最大 retries 回まで再試行し、(成功したか, 試行回数, エラーメッセージ) を返す。
+    コマンドが見つからない場合は再試行しない。
+    """
+    args = [*command, gist_id, "--add", file_name]
+    error = None
+    for attempt in range(1, retries + 2):
+        try:
+            subprocess.run(args, check=True, capture_output=True, text=True, encoding="utf-8",
+                           errors="replace", timeout=timeout)
+            return True, attempt, None
+        except FileNotFoundError as e:
+            return False, attempt, str(e)
+        except subprocess.CalledProcessError as e:
+            error = f"exit status {e.returncode}: {(e.stderr or '').strip()}"
+        except subprocess.TimeoutExpired as e:
+            error = f"timed out after {e.timeout}s"
+        if attempt <= retries:
+            logging.warning(f"Retrying upload of '{file_name}' ({attempt}/{retries}): {error}")
+            time.sleep(backoff * (2 ** (attempt - 1)))
+    return False, retries + 1, error
+
+def sync_gist(gist_id, files, command=DEFAULT_COMMAND, manifest_path=DEFAULT_MANIFEST, workers=DEFAULT_WORKERS,
+              retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, timeout=None, force=False, dry_run=False):
+    """
+    変更のあったファイルだけを Gist にアップロードし、結果
+    {"uploaded", "unchanged", "missing", "failed": {ファイル: エラー}} を返す。
+    マニフェストには成功したファイルだけを記録する（失敗したものは次回もアップロード対象になる）。
+    """
+    manifest = load_manifest(manifest_path, gist_id)
+    changed, unchanged, missing, fingerprints = plan_sync(files, manifest, force)
+    result = {"uploaded": [], "unchanged": unchanged, "missing": missing, "failed": {}}
+    for name in missing:
+        logging.error(f"Gist file not found: '{name}'")
+    if dry_run:
+        result["uploaded"] = changed
+        return result
+
+    # 内容が同じで mtime だけ変わったファイルは、新しい mtime を記録して次回のハッシュ計算を省く
+    recorded = {name: fingerprints[name] for name in unchanged}
+    if changed:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(changed)))) as executor:
+            outcomes = executor.map(lambda name: upload_file(command, gist_id, name, retries, backoff, timeout),
+                                    changed)
+            for name, (ok, attempts, error) in zip(changed, outcomes):
+                if ok:
+                    result["uploaded"].append(name)
+                    recorded[name] = fingerprints[name]
+                else:
+                    result["failed"][name] = error
+                    logging.error(f"Failed to update Gist with file '{name}' after {attempts} attempt(s): {error}")
+    # 一覧から外れたファイルはマニフェストからも消す。何も変わらなければ書き直さない
+    if recorded != manifest:
+        save_manifest(manifest_path, gist_id, recorded)
+    return result
+
+def main(argv=None):
+    from config_manager import get_config
+
+    parser = argparse.ArgumentParser(description="config.json の gist_files のうち変更があったものを Gist に同期する")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--force", action="store_true", help="変更の有無にかかわらずすべてアップロードする")
+    parser.add_argument("--dry-run", action="store_true", help="アップロードするファイルを表示するだけ")
+    parser.add_argument("--workers", type=int, help="同時アップロード数")
+    parser.add_argument("--command", help="アップロードに使うコマンド（既定: gh gist edit）")
+    args = parser.parse_args(argv)
+
+    # ログ設定（エラーをファイルに記録）
+    logging.basicConfig(filename='update_gist.log', level=logging.ERROR)
+
+    config = get_config(args.config)
+    if config.path is None or config.snapshot.mtime_ns is None:
+        logging.error("Failed to read config.json")
+        return 1
+
+    gist_id = config.get_str('gist_id')
+    gist_files = config.get_list('gist_files', [])
+
+    if not gist_id or not gist_files:
+        logging.error("Missing 'gist_id' or 'gist_files' in config.json.")
+        return 1
+
+    command = shlex.split(args.command) if args.command else config.get_list('gist_command', list(DEFAULT_COMMAND))
+    result = sync_gist(
+        gist_id, gist_files,
+        command=command,
+        manifest_path=config.get_str('gist_manifest', DEFAULT_MANIFEST),
+        workers=args.workers or config.get_int('gist_workers', DEFAULT_WORKERS),
+        retries=config.get_int('gist_retries', DEFAULT_RETRIES),
+        backoff=config.get_float('gist_backoff', DEFAULT_BACKOFF),
+        force=args.force,
+        dry_run=args.dry_run,
+    )
+    verb = "アップロード予定" if args.dry_run else "アップロード"
+    print(f"Gist 同期: {verb} {len(result['uploaded'])} 件、変更なし {len(result['unchanged'])} 件、"
+          f"失敗 {len(result['failed'])} 件、見つからない {len(result['missing'])} 件")
+    # エラーがあれば終了コード1で終了
+    return 1 if result["failed"] or result["missing"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
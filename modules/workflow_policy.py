@@ -0,0 +1,178 @@
+import os
+import sys
+import json
+import time
+import logging
+
+# main.py のワークフローで input() により人に尋ねていた分岐を、宣言的なポリシーで決める。
+# ポリシーは config.json の "workflow" オブジェクトと CLI 引数（こちらが優先）から読み、
+# 各ステップの結果・判断・所要時間は JSON の実行レポートに書き出す。
+
+# キー -> (選択肢, 既定値)。"ask" は従来どおり対話で尋ねる（非対話モードでは NON_INTERACTIVE_DEFAULTS を使う）
+POLICY_SCHEMA = {
+    # push で upstream 不一致になったとき: branch = push origin HEAD:<ブランチ>, head = push origin HEAD
+    "push_fallback": (("ask", "branch", "head", "abort"), "ask"),
+    # マージコンフリクト時: ours = old ブランチ側の内容を採用してコミット
+    "on_conflict": (("ask", "ours", "abort"), "ask"),
+    # ターゲットブランチへの合流方法（merge_into_target のオプション 1-4、または skip）
+    "merge_option": (("ask", "skip", "temp_branch", "local_target", "remote_branch", "remote_target"), "ask"),
+}
+MERGE_OPTION_NUMBERS = {"temp_branch": 1, "local_target": 2, "remote_branch": 3, "remote_target": 4}
+# 人がいないときは、リモートや履歴を書き換えない側を選ぶ
+NON_INTERACTIVE_DEFAULTS = {"push_fallback": "abort", "on_conflict": "abort", "merge_option": "skip"}
+REPORT_VERSION = 1
+
+class BudgetExceeded(Exception):
+    """ワークフロー全体の制限時間を超えた"""
+
+class WorkflowPolicy:
+    """分岐の選び方と制限時間。choose() で決まった値は RunReport に記録する"""
+
+    def __init__(self, choices=None, interactive=True, time_budget=0.0, report_path=None):
+        self.choices = {key: default for key, (_, default) in POLICY_SCHEMA.items()}
+        self.choices.update(choices or {})
+        self.interactive = interactive
+        self.time_budget = float(time_budget or 0)
+        self.report_path = report_path
+        self.started = time.monotonic()
+        self.report = None
+
+    @property
+    def deadline(self):
+        return self.started + self.time_budget if self.time_budget > 0 else None
+
+    def remaining(self):
+        """残り時間（秒）。制限がなければ None"""
+        deadline = self.deadline
+        return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+    def check_budget(self, step):
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise BudgetExceeded(f"time budget of {self.time_budget:g}s exceeded before '{step}'")
+
+    def will_prompt(self, key) -> bool:
+        return self.choices[key] == "ask" and self.interactive
+
+    def choose(self, key, prompt=None, answers=None):
+        """
+        key の選択肢を返す。ポリシーが "ask" で対話モードなら prompt で尋ね、入力を answers で選択肢に
+        対応させる（対応しない入力は "abort" / "skip" 相当の非対話時の既定値）。
+        """
+        value = self.choices[key]
+        source = "policy"
+        if value == "ask":
+            if self.interactive and prompt is not None:
+                answer = input(prompt).strip().lower()
+                value = (answers or {}).get(answer, NON_INTERACTIVE_DEFAULTS[key])
+                source = "prompt"
+            else:
+                value = NON_INTERACTIVE_DEFAULTS[key]
+                source = "non-interactive default"
+        if self.report is not None:
+            self.report.decide(key, value, source)
+        logging.info(f"Workflow decision {key}={value} ({source})")
+        return value
+
+    def as_dict(self):
+        return {"choices": dict(self.choices), "interactive": self.interactive, "time_budget": self.time_budget}
+
+def load_policy(config_path="config.json", overrides=None, interactive=None, time_budget=None, report_path=None):
+    """
+    config.json の "workflow" と overrides（None の値は無視）からポリシーを作る。
+    不正な値はエラーをログに出して既定値を使う。interactive が None なら標準入力が端末かどうかで決める。
+    """
+    from config_manager import get_config
+    # ConfigManager 経由で読み、CONFIG_SCHEMA の検証（"workflow" はオブジェクト）と変更の再読み込みを効かせる
+    manager = get_config(config_path)
+    if manager.path != os.path.abspath(config_path):
+        manager.load_config(config_path)
+    section = manager.get("workflow") or {}
+    if not isinstance(section, dict):
+        logging.error("config 'workflow' must be an object; using defaults")
+        section = {}
+    merged = dict(section)
+    merged.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    choices = {}
+    for key, (allowed, default) in POLICY_SCHEMA.items():
+        value = merged.get(key, default)
+        if value not in allowed:
+            logging.error(f"Invalid workflow policy value for '{key}': {value!r}. Using default {default!r}")
+            value = default
+        choices[key] = value
+    if interactive is None:
+        interactive = bool(section.get("interactive", True)) and sys.stdin is not None and sys.stdin.isatty()
+    if time_budget is None:
+        time_budget = section.get("time_budget", 0)
+    if report_path is None:
+        report_path = section.get("report") or None
+    try:
+        time_budget = float(time_budget or 0)
+    except (TypeError, ValueError):
+        logging.error(f"Invalid workflow time_budget: {time_budget!r}. Using no limit")
+        time_budget = 0.0
+    return WorkflowPolicy(choices, interactive, time_budget, report_path)
+
+class RunReport:
+    """ステップごとの結果と判断を集め、finish() で JSON に書き出す"""
+
+    def __init__(self, policy, workdir="."):
+        self.policy = policy
+        policy.report = self
+        self.workdir = os.path.abspath(workdir)
+        self.started_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.steps = []
+        self.decisions = []
+        self._current = None
+
+    def start_step(self, name):
+        self.policy.check_budget(name)
+        self._current = {"name": name, "status": "running", "started": time.monotonic()}
+        self.steps.append(self._current)
+
+    def end_step(self, status="ok", **detail):
+        step = self._current
+        if step is None:
+            return
+        step["status"] = status
+        step["duration_s"] = round(time.monotonic() - step.pop("started"), 3)
+        if detail:
+            step["detail"] = detail
+        self._current = None
+
+    def decide(self, key, value, source):
+        self.decisions.append({"key": key, "value": value, "source": source,
+                               "step": self._current["name"] if self._current else None})
+
+    def to_dict(self, exit_code, status, error=None):
+        if self._current is not None:
+            self.end_step(status if status != "ok" else "failed")
+        data = {
+            "version": REPORT_VERSION,
+            "workdir": self.workdir,
+            "pid": os.getpid(),
+            "started_at": self.started_at,
+            "duration_s": round(time.monotonic() - self.policy.started, 3),
+            "status": status,
+            "exit_code": exit_code,
+            "policy": self.policy.as_dict(),
+            "steps": self.steps,
+            "decisions": self.decisions,
+        }
+        if error:
+            data["error"] = error
+        return data
+
+    def finish(self, exit_code, status=None, error=None, path=None):
+        """レポートを書き出して辞書を返す（path も policy.report_path もなければ書き出さない）"""
+        status = status or ("ok" if exit_code == 0 else "failed")
+        data = self.to_dict(exit_code, status, error)
+        path = path or self.policy.report_path
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            tmp = f"{path}.tmp-{os.getpid()}"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, path)
+        return data
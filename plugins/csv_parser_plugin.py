@@ -1,6 +1,9 @@
+import os
 import csv
+import time
 import logging
 from interfaces import IParser
+from metrics import stage, emit, metrics_enabled, record_metrics
 
 PLUGIN_NAME = "CSVParser"
 
@@ -8,14 +11,36 @@ class CSVParser(IParser):
     def parse(self, file_path: str, encoding: str = 'utf-8'):
         logging.info(f"Parsing CSV file: {file_path}")
         try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                reader = csv.DictReader(f)
-                data = list(reader)
+            with stage("parse.csv", input=file_path, bytes_read=os.path.getsize(file_path)):
+                with open(file_path, 'r', encoding=encoding) as f:
+                    reader = csv.DictReader(f)
+                    data = list(reader)
+                record_metrics(rows=len(data))
             logging.info(f"CSV parsing successful, {len(data)} records found")
             return data
         except Exception as e:
             logging.error(f"CSV parsing failed for {file_path}: {e}")
             raise
 
+    def iter_parse(self, file_path: str, encoding: str = 'utf-8'):
+        """行を 1 件ずつ返す。ファイル全体をリストに読み込まないため DB への一括投入に使う"""
+        logging.info(f"Streaming CSV file: {file_path}")
+        count = 0
+        start = time.perf_counter()
+        try:
+            with open(file_path, 'r', encoding=encoding, newline='') as f:
+                for row in csv.DictReader(f):
+                    count += 1
+                    yield row
+            logging.info(f"CSV streaming finished, {count} records read")
+            # ジェネレータは呼び出し側と交互に動くため stage() ではなく終了時に 1 件だけ記録する
+            if metrics_enabled():
+                emit({"stage": "parse.csv.stream", "input": file_path, "rows": count,
+                      "bytes_read": os.path.getsize(file_path),
+                      "duration_ms": (time.perf_counter() - start) * 1000.0, "status": "ok"})
+        except Exception as e:
+            logging.error(f"CSV parsing failed for {file_path}: {e}")
+            raise
+
     def supported_extensions(self) -> list:
         return ['.csv']
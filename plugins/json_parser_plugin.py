@@ -1,6 +1,10 @@
+import os
 import json
+import time
 import logging
 from interfaces import IParser
+from metrics import stage, emit, metrics_enabled, record_metrics
+from json_stream import iter_json_items
 
 PLUGIN_NAME = "JSONParser"
 
@@ -8,13 +12,38 @@ class JSONParser(IParser):
     def parse(self, file_path: str, encoding: str = 'utf-8'):
         logging.info(f"Parsing JSON file: {file_path}")
         try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                data = json.load(f)
+            with stage("parse.json", input=file_path, bytes_read=os.path.getsize(file_path)):
+                with open(file_path, 'r', encoding=encoding) as f:
+                    data = json.load(f)
+                items = data.get("items", data) if isinstance(data, dict) else data
+                record_metrics(rows=len(items) if isinstance(items, list) else 1)
             logging.info("JSON parsing successful")
             return data
         except Exception as e:
             logging.error(f"JSON parsing failed for {file_path}: {e}")
             raise
 
+    def iter_parse(self, file_path: str, encoding: str = 'utf-8'):
+        """
+        レコードを 1 件ずつ返す。トップレベルが配列ならその要素を、
+        {"items": [...]} 形式なら items の要素を返す。
+        ファイルを少しずつ読みながら要素を取り出すため、文書全体をメモリに載せない（DB への一括投入に使う）。
+        """
+        logging.info(f"Streaming JSON file: {file_path}")
+        count = 0
+        start = time.perf_counter()
+        try:
+            for item in iter_json_items(file_path, encoding=encoding):
+                count += 1
+                yield item
+            logging.info(f"JSON streaming finished, {count} records read")
+            if metrics_enabled():
+                emit({"stage": "parse.json.stream", "input": file_path, "rows": count,
+                      "bytes_read": os.path.getsize(file_path),
+                      "duration_ms": (time.perf_counter() - start) * 1000.0, "status": "ok"})
+        except Exception as e:
+            logging.error(f"JSON parsing failed for {file_path}: {e}")
+            raise
+
     def supported_extensions(self) -> list:
         return ['.json']
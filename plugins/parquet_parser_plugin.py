@@ -0,0 +1,55 @@
+import os
+import time
+import logging
+from interfaces import IParser
+from metrics import stage, emit, metrics_enabled, record_metrics
+from columnar_io import COLUMNAR_EXTENSIONS, read_table, iter_batches
+
+PLUGIN_NAME = "ColumnarParser"
+
+class ColumnarParser(IParser):
+    """
+    Parquet / Arrow IPC（Feather v2）ファイルのパーサ。
+    columns で読む列を、filters（[(列, 演算子, 値), ...]）で読む行を絞り込める。
+    Parquet は必要な列と行グループだけをディスクから読む。
+    """
+    def parse(self, file_path: str, encoding: str = 'utf-8', columns=None, filters=None):
+        # encoding はバイナリ形式なので使わない（IParser の呼び出し形式に合わせて受け取る）
+        logging.info(f"Parsing columnar file: {file_path}")
+        try:
+            with stage("parse.columnar", input=file_path, bytes_read=os.path.getsize(file_path)):
+                data = read_table(file_path, columns, filters).to_pylist()
+                record_metrics(rows=len(data))
+            logging.info(f"Columnar parsing successful, {len(data)} records found")
+            return data
+        except Exception as e:
+            logging.error(f"Columnar parsing failed for {file_path}: {e}")
+            raise
+
+    def parse_columns(self, file_path: str, columns=None, filters=None) -> dict:
+        """列名 → 値のリストの辞書で返す（行ごとの辞書を作らないので解析に直接渡すときに速い）"""
+        with stage("parse.columnar", input=file_path, bytes_read=os.path.getsize(file_path)):
+            table = read_table(file_path, columns, filters)
+            record_metrics(rows=table.num_rows)
+        return table.to_pydict()
+
+    def iter_parse(self, file_path: str, encoding: str = 'utf-8', columns=None, filters=None):
+        """行をバッチ単位で読み、1 件ずつ返す。ファイル全体をメモリに載せない"""
+        logging.info(f"Streaming columnar file: {file_path}")
+        count = 0
+        start = time.perf_counter()
+        try:
+            for batch in iter_batches(file_path, columns, filters):
+                count += batch.num_rows
+                yield from batch.to_pylist()
+            logging.info(f"Columnar streaming finished, {count} records read")
+            if metrics_enabled():
+                emit({"stage": "parse.columnar.stream", "input": file_path, "rows": count,
+                      "bytes_read": os.path.getsize(file_path),
+                      "duration_ms": (time.perf_counter() - start) * 1000.0, "status": "ok"})
+        except Exception as e:
+            logging.error(f"Columnar parsing failed for {file_path}: {e}")
+            raise
+
+    def supported_extensions(self) -> list:
+        return list(COLUMNAR_EXTENSIONS)
@@ -39,5 +39,6 @@ class WordFreqAnalysis(IAnalysis):
             "top_words": top_words,  # [('Item_1', 5), ('Item_2', 3), ...] など
             "counts": freq_map       # 全単語のカウント辞書
         }
-        logging.info(f"WordFreqAnalysis: result={result}")
+        logging.info("WordFreqAnalysis: %d distinct words, top=%s", len(freq_map), top_words[:3])
+        logging.debug("WordFreqAnalysis: result=%s", result)
         return result
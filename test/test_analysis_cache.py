@@ -0,0 +1,122 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules"))
+import analysis_cache
+from analysis_cache import memoize_analysis, configure_analysis_cache, DiskCache
+
+class TestAnalysisCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.previous = analysis_cache.get_analysis_cache()
+        configure_analysis_cache(cache_dir=os.path.join(self.tmpdir, "cache"), enabled=True)
+        self.csv_file = os.path.join(self.tmpdir, "data.csv")
+        with open(self.csv_file, "w", encoding="utf-8") as f:
+            f.write("x\n1\n2\n")
+        self.calls = 0
+
+        @memoize_analysis("dummy", artifact_args=("output_image",))
+        def analyze(csv_file, output_image, scale=1):
+            self.calls += 1
+            with open(csv_file, encoding="utf-8") as f:
+                total = sum(int(line) for line in f.read().split()[1:]) * scale
+            with open(output_image, "w", encoding="utf-8") as f:
+                f.write(f"chart {total}")
+            return {"total": total}
+
+        self.analyze = analyze
+
+    def tearDown(self):
+        analysis_cache._default_cache = self.previous
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_repeated_call_is_cached(self):
+        out = os.path.join(self.tmpdir, "a.png")
+        self.assertEqual(self.analyze(self.csv_file, out), {"total": 3})
+        self.assertEqual(self.analyze(self.csv_file, out), {"total": 3})
+        self.assertEqual(self.calls, 1)
+        # パラメータが変われば再計算する
+        self.assertEqual(self.analyze(self.csv_file, out, scale=2), {"total": 6})
+        self.assertEqual(self.calls, 2)
+
+    def test_content_change_invalidates(self):
+        out = os.path.join(self.tmpdir, "a.png")
+        self.analyze(self.csv_file, out)
+        with open(self.csv_file, "w", encoding="utf-8") as f:
+            f.write("x\n5\n5\n5\n")
+        self.assertEqual(self.analyze(self.csv_file, out), {"total": 15})
+        self.assertEqual(self.calls, 2)
+
+    def test_chart_restored_from_disk_tier(self):
+        out = os.path.join(self.tmpdir, "a.png")
+        self.analyze(self.csv_file, out)
+        analysis_cache.get_analysis_cache().memory.clear()
+        other = os.path.join(self.tmpdir, "b.png")
+        self.assertEqual(self.analyze(self.csv_file, other), {"total": 3})
+        self.assertEqual(self.calls, 1)
+        with open(other, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "chart 3")
+
+    def test_hit_is_persisted_to_result_store(self):
+        from result_store import ResultStore, fingerprint_file
+        from regression_analyzer import analyze_regression
+        with open(self.csv_file, "w", encoding="utf-8") as f:
+            f.write("x,y\n1,2\n2,4.1\n3,5.9\n")
+        out = os.path.join(self.tmpdir, "regression.png")
+        result = analyze_regression(self.csv_file, out)
+        store = ResultStore(db_path=os.path.join(self.tmpdir, "app.db"))
+        try:
+            # メモ化に命中して解析関数は呼ばれないが、ストアには保存される
+            self.assertEqual(analyze_regression(self.csv_file, out, store=store), result)
+            self.assertEqual(store.lookup("regression", fingerprint_file(self.csv_file), {}), result)
+            self.assertEqual(store.query("regression")[0]["artifact_path"], out)
+        finally:
+            store.db.close()
+
+    def test_default_cache_is_opt_in_via_config(self):
+        import json
+        from config_manager import ConfigManager
+        manager = ConfigManager()
+        previous_path = manager.path
+        config_path = os.path.join(self.tmpdir, "config.json")
+        try:
+            for raw, enabled in (({}, False), ({"analysis_cache_enabled": True,
+                                               "analysis_cache_dir": os.path.join(self.tmpdir, "c")}, True)):
+                with open(config_path, "w", encoding="utf-8") as f:
+                    json.dump(raw, f)
+                manager.load_config(config_path)
+                analysis_cache._default_cache = None
+                cache = analysis_cache.get_analysis_cache()
+                self.assertEqual(cache.enabled, enabled)
+            self.assertEqual(cache.disk.cache_dir, os.path.join(self.tmpdir, "c"))
+        finally:
+            if previous_path is not None:
+                manager.load_config(previous_path)
+
+    def test_main_excludes_configured_cache_dir(self):
+        import subprocess
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        # main.py の import の仕方（sys.path の設定）を確かめるため、別プロセスで実行する。
+        # modules/ のモジュールは素の名前で 1 回だけ読み込まれ、"modules.xxx" としての 2 つ目のコピーはできない
+        script = ("import sys, main; print(main.analysis_cache_dir()); main.get_policy(); "
+                  "print(sorted(name for name in sys.modules if name.startswith('modules.')))")
+        output = subprocess.run([sys.executable, "-c", script],
+                                cwd=root, capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.split("\n")[:2], [".analysis_cache", "[]"])
+
+    def test_disk_eviction_by_size(self):
+        disk = DiskCache(os.path.join(self.tmpdir, "small"), max_bytes=300)
+        artifact = os.path.join(self.tmpdir, "artifact.bin")
+        with open(artifact, "wb") as f:
+            f.write(b"x" * 100)
+        for i in range(5):
+            disk.put(f"{i:02d}key", {"i": i}, [artifact])
+        self.assertIsNone(disk.get("00key"))
+        self.assertIsNotNone(disk.get("04key"))
+
+if __name__ == '__main__':
+    unittest.main()
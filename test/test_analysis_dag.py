@@ -0,0 +1,104 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules"))
+import numpy as np
+import pandas as pd
+from analysis_cache import AnalysisCache
+from analysis_dag import AnalysisDAG, run_analyses
+from regression_analyzer import fit_regression
+from result_store import ResultStore
+
+class TestAnalysisDAG(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = AnalysisCache(os.path.join(self.tmpdir, "cache"))
+        rng = np.random.default_rng(0)
+        n = 120
+        x = rng.normal(size=n)
+        self.frame = pd.DataFrame({
+            "x": x, "y": 2 * x + 1 + rng.normal(scale=0.1, size=n),
+            "group": np.repeat(["A", "B", "C"], n // 3), "value": rng.normal(size=n),
+            "group1": rng.normal(size=n), "group2": rng.normal(loc=0.5, size=n),
+        })
+        self.dataset = os.path.join(self.tmpdir, "dataset.csv")
+        self.frame.to_csv(self.dataset, index=False)
+        self.out = os.path.join(self.tmpdir, "out")
+        os.makedirs(self.out)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def run_dag(self, **options):
+        return run_analyses(self.dataset, output_dir=self.out, cache=self.cache, workers=4, **options)
+
+    def test_single_load_shared_and_cached_on_rerun(self):
+        results, outcome = self.run_dag()
+        self.assertEqual(outcome.errors, {})
+        self.assertEqual(outcome.status["load"], "ok")
+        self.assertEqual(set(results), {"regression", "clustering", "anova", "t_test"})
+        expected = fit_regression(self.frame["x"].to_numpy(), self.frame["y"].to_numpy())
+        self.assertAlmostEqual(results["regression"]["slope"], expected["slope"])
+        self.assertEqual(results["anova"]["groups"], 3)
+        self.assertEqual(sorted(os.listdir(self.out)),
+                         ["anova_boxplot.png", "clustering_analysis.png", "regression_analysis.png"])
+
+        # 2 回目は全てキャッシュから返り、データセットも読まない（消した画像は復元される）
+        os.remove(os.path.join(self.out, "regression_analysis.png"))
+        results2, outcome2 = self.run_dag()
+        self.assertEqual(results2, results)
+        self.assertNotIn("load", outcome2.status)
+        self.assertEqual(set(outcome2.status.values()), {"cached"})
+        self.assertTrue(os.path.exists(os.path.join(self.out, "regression_analysis.png")))
+
+        # パラメータを変えた解析だけを計算し直す
+        results3, outcome3 = self.run_dag(params={"clustering": {"n_clusters": 2}})
+        self.assertEqual(len(results3["clustering"]["centers"]), 2)
+        self.assertEqual(outcome3.status["load"], "ok")
+        self.assertEqual(outcome3.status["analyze:clustering"], "ok")
+        self.assertEqual(outcome3.status["analyze:regression"], "cached")
+
+    def test_cached_render_reports_current_output_dir(self):
+        self.run_dag(analyses=["regression"])
+        # 出力先だけを変えた再実行: 画像はキャッシュから新しい出力先へ復元され、保存されるパスも新しい方になる
+        other = os.path.join(self.tmpdir, "other")
+        os.makedirs(other)
+        store = ResultStore(db_path=os.path.join(self.tmpdir, "results.db"))
+        _, outcome = run_analyses(self.dataset, ["regression"], output_dir=other, cache=self.cache, store=store)
+        self.assertEqual(outcome.status["render:regression"], "cached")
+        self.assertNotEqual(outcome.values["render:regression"], os.path.join(self.out, "regression_analysis.png"))
+        expected = os.path.join(other, "regression_analysis.png")
+        self.assertTrue(os.path.exists(expected))
+        self.assertEqual([row["artifact_path"] for row in store.query("regression")], [expected])
+        store.db.close()
+
+    def test_failure_skips_only_dependents(self):
+        self.frame.drop(columns=["group"]).to_csv(self.dataset, index=False)
+        with self.assertLogs(level="ERROR"):
+            results, outcome = self.run_dag(analyses=["regression", "anova"])
+        self.assertEqual(outcome.status["clean:anova"], "failed")
+        self.assertEqual(outcome.status["analyze:anova"], "skipped")
+        self.assertEqual(outcome.status["render:anova"], "skipped")
+        self.assertIsNone(results["anova"])
+        self.assertEqual(outcome.status["render:regression"], "ok")
+
+    def test_independent_stages_run_in_parallel(self):
+        dag = AnalysisDAG(workers=4, cache=self.cache)
+        dag.add("a", lambda: time.sleep(0.2) or 1)
+        dag.add("b", lambda: time.sleep(0.2) or 2)
+        dag.add("c", lambda a, b: a + b, ["a", "b"])
+        dag.add("loop1", lambda x: x, ["loop2"])
+        dag.add("loop2", lambda x: x, ["loop1"])
+        start = time.perf_counter()
+        outcome = dag.run(["c"])
+        self.assertLess(time.perf_counter() - start, 0.35)
+        self.assertEqual(outcome.values["c"], 3)
+        self.assertEqual(dag.run(["loop1"]).errors, {"loop1": "dependency cycle", "loop2": "dependency cycle"})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,11 @@
+import os
+import json
+import shutil
+import tempfile
 import unittest
-from modules.ast_transformer import transform_code
+import subprocess
+import sys
+from modules.ast_transformer import transform_code, transform_tree, MANIFEST_NAME, NameTable
 
 class TestASTTransformer(unittest.TestCase):
     def test_simple_assignment(self):
@@ -22,5 +28,119 @@ class TestASTTransformer(unittest.TestCase):
         self.assertIn("(obf_bar):", transformed_code)
         self.assertIn("return obf_bar", transformed_code)
 
+class TestCompactTransform(unittest.TestCase):
+    SOURCE = (
+        "import os\n"
+        "class Counter:\n"
+        "    def __init__(self, start):\n"
+        "        self.total = start\n"
+        "    def add_value(self, amount=1):\n"
+        "        self.total += amount\n"
+        "        return self.total\n"
+        "def make_counter(initial_value):\n"
+        "    counter = Counter(initial_value)\n"
+        "    counter.add_value(amount=2)\n"
+        "    return os.path.join('a', str(counter.total)), sorted([3, 1], key=None)\n"
+        "print(make_counter(5))\n"
+    )
+
+    def run_code(self, code):
+        return subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+
+    def test_behaviour_preserved_and_smaller(self):
+        transformed = transform_code(self.SOURCE, mode="compact")
+        self.assertEqual(self.run_code(transformed), self.run_code(self.SOURCE))
+        self.assertLess(len(transformed), len(self.SOURCE))
+        self.assertLess(len(transformed), len(transform_code(self.SOURCE)))
+
+    def test_builtins_and_external_names_kept(self):
+        transformed = transform_code(self.SOURCE, mode="compact")
+        for name in ("print", "sorted", "str", ".path.join(", "key=None", "__init__"):
+            self.assertIn(name, transformed)
+        for name in ("make_counter", "initial_value", "Counter"):
+            self.assertNotIn(name, transformed)
+
+    def test_import_gets_alias(self):
+        transformed = transform_code("import json\nprint(json.dumps([1]))", mode="compact")
+        self.assertRegex(transformed, r"import json as \w+")
+        self.assertEqual(self.run_code(transformed), "[1]\n")
+
+    def test_getattr_strings_protected(self):
+        source = "class A:\n    def visit_x(self):\n        return 1\nprint(getattr(A(), 'visit_' + 'x')())"
+        self.assertEqual(self.run_code(transform_code(source, mode="compact")), "1\n")
+
+    def test_shared_table_is_consistent(self):
+        table = NameTable()
+        first = transform_code("def helper_function(x):\n    return x", mode="compact", table=table)
+        second = transform_code("def helper_function(y):\n    return y", mode="compact", table=table)
+        self.assertEqual(first.split("(")[0], second.split("(")[0])
+
+class TestTransformTree(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.src = os.path.join(self.tmpdir, "src")
+        self.dst = os.path.join(self.tmpdir, "out")
+        self.write("a.py", "x = 1")
+        self.write("pkg/b.py", "def foo(bar):\n    return bar")
+        self.write("pkg/notes.txt", "not python")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def write(self, rel, text):
+        path = os.path.join(self.src, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_mirror_and_incremental(self):
+        stats = transform_tree(self.src, self.dst, workers=2)
+        self.assertEqual(stats["transformed"], 2)
+        with open(os.path.join(self.dst, "pkg", "b.py"), encoding="utf-8") as f:
+            self.assertIn("def obf_foo(", f.read())
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "pkg", "notes.txt")))
+
+        stats = transform_tree(self.src, self.dst, workers=1)
+        self.assertEqual((stats["transformed"], stats["skipped"]), (0, 2))
+
+        self.write("a.py", "y = 2")
+        os.remove(os.path.join(self.src, "pkg", "b.py"))
+        stats = transform_tree(self.src, self.dst, workers=1)
+        self.assertEqual((stats["transformed"], stats["removed"]), (1, 1))
+        with open(os.path.join(self.dst, "a.py"), encoding="utf-8") as f:
+            self.assertIn("obf_y", f.read())
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "pkg", "b.py")))
+
+    def test_version_change_invalidates_cache(self):
+        transform_tree(self.src, self.dst, workers=1)
+        manifest_path = os.path.join(self.dst, MANIFEST_NAME)
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        manifest["version"] = -1
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        self.assertEqual(transform_tree(self.src, self.dst, workers=1)["transformed"], 2)
+
+    def test_syntax_error_is_reported_and_retried(self):
+        self.write("bad.py", "def (:")
+        stats = transform_tree(self.src, self.dst, workers=1)
+        self.assertEqual(stats["failed"], 1)
+        self.assertEqual(transform_tree(self.src, self.dst, workers=1)["failed"], 1)
+
+    def test_compact_mode_renames_across_files(self):
+        self.write("pkg/__init__.py", "")
+        self.write("pkg/helpers.py", "def compute_total(values):\n    return sum(values)\n")
+        self.write("main_app.py", "from pkg.helpers import compute_total\nprint(compute_total([1, 2, 3]))\n")
+        stats = transform_tree(self.src, self.dst, workers=1, mode="compact")
+        self.assertEqual(stats["failed"], 0)
+        with open(os.path.join(self.dst, "pkg", "helpers.py"), encoding="utf-8") as f:
+            self.assertNotIn("compute_total", f.read())
+        result = subprocess.run([sys.executable, "main_app.py"], cwd=self.dst, capture_output=True, text=True)
+        self.assertEqual(result.stdout, "6\n")
+
+        self.assertEqual(transform_tree(self.src, self.dst, workers=1, mode="compact")["transformed"], 0)
+        # モードを変えるとキャッシュは使わない
+        self.assertEqual(transform_tree(self.src, self.dst, workers=1)["transformed"], 5)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+import shutil
+import asyncio
+import tempfile
+import threading
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "modules"))
+sys.path.insert(0, os.path.join(ROOT, "plugins"))
+from interfaces import IParser, IAnalysis
+from async_engine import AsyncEngine, collect_plugins
+import csv_parser_plugin
+import word_freq_analysis_plugin
+
+LATENCY = 0.05
+
+class SlowCSVParser(csv_parser_plugin.CSVParser):
+    """
+    遅いストレージ上のファイルを読む同期パーサーの代わり。
+    parties 件の呼び出しがそろうまでバリアで待つため、呼び出しが並行に走らなければ BrokenBarrierError で失敗する。
+    同時に実行中の呼び出し数の最大値を peak に記録する
+    """
+    def __init__(self, parties):
+        self.barrier = threading.Barrier(parties, timeout=10)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+
+    def parse(self, file_path, encoding='utf-8'):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            self.barrier.wait()
+            time.sleep(LATENCY)
+            return super().parse(file_path, encoding)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+class NativeAsyncParser(IParser):
+    def parse(self, file_path, encoding='utf-8'):
+        raise AssertionError("sync parse should not be used")
+
+    async def aparse(self, file_path, encoding='utf-8'):
+        await asyncio.sleep(LATENCY)
+        return [{"name": os.path.basename(file_path)}]
+
+    def supported_extensions(self):
+        return [".txt"]
+
+class RowCount(IAnalysis):
+    def analyze(self, data, **kwargs):
+        return {"rows": len(data) * kwargs.get("scale", 1)}
+
+class Broken(IAnalysis):
+    def analyze(self, data, **kwargs):
+        raise ValueError("broken analysis")
+
+class TestAsyncEngine(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.csv_files = []
+        for i in range(20):
+            path = os.path.join(self.tmpdir, f"data{i}.csv")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("id,name\n" + "".join(f"{j},word{j % 3} w\n" for j in range(i + 1)))
+            self.csv_files.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_overlaps_slow_parsers(self):
+        # 20 件を 10 並列で読む: 10 件ずつバリアがそろえば成功する（逐次実行ならバリアがそろわずエラーになる）。
+        # 経過時間ではなく同時実行数で確かめるため、負荷の高い環境でも結果は変わらない
+        parser = SlowCSVParser(parties=10)
+        engine = AsyncEngine({".csv": parser}, {"count": RowCount()}, concurrency=10,
+                             analysis_kwargs={"count": {"scale": 2}})
+        results = engine.run(self.csv_files)
+        self.assertEqual([r.error for r in results], [None] * 20)
+        self.assertEqual([r.path for r in results], self.csv_files)
+        self.assertEqual([r.results["count"]["rows"] for r in results], [2 * (i + 1) for i in range(20)])
+        # セマフォの上限ちょうどまで重なり、それを超えない
+        self.assertEqual(parser.peak, 10)
+
+    def test_native_async_parser_and_errors(self):
+        txt = os.path.join(self.tmpdir, "note.txt")
+        open(txt, "w").close()
+        engine = AsyncEngine([NativeAsyncParser()], {"count": RowCount(), "broken": Broken()}, concurrency=2,
+                             keep_data=True)
+        with self.assertLogs(level="ERROR"):
+            results = engine.run([txt, os.path.join(self.tmpdir, "image.png")])
+        self.assertEqual(results[0].data, [{"name": "note.txt"}])
+        self.assertEqual(results[0].results, {"count": {"rows": 1}})
+        self.assertIn("broken analysis", results[0].error)
+        self.assertIn("no parser", results[1].error)
+
+    def test_collect_plugins(self):
+        parsers, analyses = collect_plugins([csv_parser_plugin, word_freq_analysis_plugin])
+        self.assertIsInstance(parsers[".csv"], csv_parser_plugin.CSVParser)
+        self.assertEqual(list(analyses), ["WordFreqAnalysis"])
+        results = AsyncEngine(parsers, analyses).run(self.csv_files[:3])
+        self.assertEqual(results[2].results["WordFreqAnalysis"]["counts"]["w"], 3)
+
+if __name__ == "__main__":
+    unittest.main()
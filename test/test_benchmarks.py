@@ -0,0 +1,49 @@
+import os
+import sys
+import csv
+import shutil
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "modules"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+from run_benchmarks import compare, prepare_inputs
+
+class TestBenchmarks(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_prepare_inputs_row_counts(self):
+        paths = prepare_inputs(self.tmpdir, 60)
+        expected_headers = {
+            "anova": ["group", "value"],
+            "regression": ["x", "y"],
+            "clustering": ["x", "y"],
+            "timeseries": ["date", "value"],
+            "stat": ["group1", "group2"],
+        }
+        for kind, header in expected_headers.items():
+            with open(paths[kind], newline="", encoding="utf-8") as f:
+                rows = list(csv.reader(f))
+            self.assertEqual(rows[0], header)
+            self.assertEqual(len(rows) - 1, 60)
+
+    def test_compare_flags_regressions(self):
+        baseline = {"results": {"a@1": {"median_ms": 100.0, "peak_bytes": 10},
+                                "b@1": {"median_ms": 1.0, "peak_bytes": 10}}}
+        current = {"results": {"a@1": {"median_ms": 150.0, "peak_bytes": 20},
+                               "b@1": {"median_ms": 2.0, "peak_bytes": 10},
+                               "c@1": {"median_ms": 1.0, "peak_bytes": 10}}}
+        result = compare(current, baseline, threshold=0.25, min_delta_ms=5.0)
+        self.assertTrue(result["a@1"]["regression"])
+        self.assertEqual(result["a@1"]["memory_ratio"], 2.0)
+        # 2 倍でも差が 1ms なら誤差扱い
+        self.assertFalse(result["b@1"]["regression"])
+        self.assertNotIn("c@1", result)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules"))
+from change_impact import discover_tests, import_closure, run_impacted_tests
+
+class TestChangeImpact(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.write("modules/alpha.py", "def value():\n    return 1\n")
+        self.write("modules/beta.py", "import alpha\n\ndef double():\n    return alpha.value() * 2\n")
+        self.write("modules/gamma.py", "def name():\n    return 'gamma'\n")
+        self.write("test/test_beta.py", self.make_test("beta", "double()", 2))
+        self.write("test/test_gamma.py", self.make_test("gamma", "name()", "'gamma'"))
+        self.write("test/statistical_test_analyzer.py", "raise RuntimeError('not a test')\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def write(self, rel, text):
+        path = os.path.join(self.root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def make_test(self, module, call, expected):
+        return (
+            "import os\nimport sys\nimport unittest\n"
+            "sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'modules'))\n"
+            f"import {module}\n\n"
+            "class T(unittest.TestCase):\n"
+            f"    def test_it(self):\n        self.assertEqual({module}.{call}, {expected})\n"
+        )
+
+    def run_tests(self, **kwargs):
+        return run_impacted_tests(root=self.root, workers=1, **kwargs)
+
+    def test_discovery_and_closure(self):
+        tests = discover_tests(os.path.join(self.root, "test"))
+        self.assertEqual([os.path.basename(t) for t in tests], ["test_beta.py", "test_gamma.py"])
+        closure = import_closure(os.path.join(self.root, "test", "test_beta.py"), self.root)
+        self.assertEqual(closure, {os.path.join("test", "test_beta.py"), os.path.join("modules", "beta.py"),
+                                   os.path.join("modules", "alpha.py")})
+
+    def test_only_impacted_tests_rerun(self):
+        report = self.run_tests()
+        self.assertTrue(report["ok"])
+        self.assertEqual(len(report["selected"]), 2)
+        self.assertEqual(self.run_tests()["selected"], [])
+
+        # 推移的な依存 (beta -> alpha) の変更で test_beta だけが再実行される
+        self.write("modules/alpha.py", "def value():\n    return 2\n")
+        report = self.run_tests()
+        self.assertEqual(report["selected"], [os.path.join("test", "test_beta.py")])
+        self.assertFalse(report["ok"])
+        self.assertEqual(report["failed"], [os.path.join("test", "test_beta.py")])
+
+        # 失敗したテストは変更がなくても再実行する
+        self.assertEqual(self.run_tests()["selected"], [os.path.join("test", "test_beta.py")])
+        self.write("modules/alpha.py", "def value():\n    return 1\n")
+        self.assertTrue(self.run_tests()["ok"])
+        self.assertEqual(len(self.run_tests(full=True)["selected"]), 2)
+
+    def test_subprocess_scripts_are_dependencies(self):
+        # main.py を別プロセスで読み込むテストは、main.py の変更で再実行される
+        self.write("main.py", "def answer():\n    return 42\n")
+        self.write("test/test_main.py", (
+            "import os\nimport sys\nimport subprocess\nimport unittest\n\n"
+            "class T(unittest.TestCase):\n"
+            "    def test_it(self):\n"
+            "        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))\n"
+            "        script = 'import main; print(main.answer())'\n"
+            "        output = subprocess.run([sys.executable, '-c', script], cwd=root,\n"
+            "                                capture_output=True, text=True).stdout\n"
+            "        self.assertEqual(output.strip(), '42')\n"
+        ))
+        closure = import_closure(os.path.join(self.root, "test", "test_main.py"), self.root)
+        self.assertIn("main.py", closure)
+        self.assertTrue(self.run_tests()["ok"])
+        self.write("main.py", "def answer():\n    return 43\n")
+        report = self.run_tests()
+        self.assertEqual(report["selected"], [os.path.join("test", "test_main.py")])
+        self.assertFalse(report["ok"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "modules"))
+sys.path.insert(0, os.path.join(ROOT, "plugins"))
+import numpy as np
+import pandas as pd
+import analysis_cache
+from analysis_cache import configure_analysis_cache
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:
+    pyarrow = None
+
+@unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+class TestColumnarIO(unittest.TestCase):
+    def setUp(self):
+        from columnar_io import write_frame
+        self.tmpdir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        n = 300
+        self.frame = pd.DataFrame({
+            "group": np.repeat(["A", "B", "C"], n // 3), "value": rng.normal(size=n),
+            "x": rng.normal(size=n), "y": rng.normal(size=n), "note": [f"row {i}" for i in range(n)],
+        })
+        self.paths = {ext: os.path.join(self.tmpdir, f"data{ext}") for ext in (".csv", ".parquet", ".arrow")}
+        self.frame.to_csv(self.paths[".csv"], index=False)
+        write_frame(self.frame, self.paths[".parquet"])
+        write_frame(self.frame, self.paths[".arrow"])
+        self.previous = analysis_cache.get_analysis_cache()
+        configure_analysis_cache(cache_dir=os.path.join(self.tmpdir, "cache"))
+
+    def tearDown(self):
+        analysis_cache._default_cache = self.previous
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_projection_and_filters_match_across_formats(self):
+        from columnar_io import read_frame
+        filters = [("group", "in", ["A", "C"]), ("value", ">", 0)]
+        expected = self.frame[self.frame["group"].isin(["A", "C"]) & (self.frame["value"] > 0)]
+        for ext, path in self.paths.items():
+            frame = read_frame(path, columns=["group", "value", "missing"], filters=filters)
+            self.assertEqual(list(frame.columns), ["group", "value"], ext)
+            self.assertEqual(len(frame), len(expected), ext)
+            np.testing.assert_allclose(frame["value"].to_numpy(), expected["value"].to_numpy())
+
+    def test_parser_plugin(self):
+        from parquet_parser_plugin import ColumnarParser
+        parser = ColumnarParser()
+        self.assertIn(".parquet", parser.supported_extensions())
+        rows = parser.parse(self.paths[".parquet"], columns=["group", "note"], filters=[("group", "==", "B")])
+        self.assertEqual(rows[0], {"group": "B", "note": "row 100"})
+        self.assertEqual(len(rows), 100)
+        self.assertEqual(list(parser.iter_parse(self.paths[".arrow"], columns=["note"])),
+                         [{"note": note} for note in self.frame["note"]])
+        self.assertEqual(parser.parse_columns(self.paths[".parquet"], columns=["x"])["x"], self.frame["x"].tolist())
+
+    def test_analyzers_accept_columnar_inputs(self):
+        from anova_analyzer import analyze_anova
+        from clustering_analyzer import analyze_clustering
+        from_csv = analyze_anova(self.paths[".csv"], os.path.join(self.tmpdir, "a.png"))
+        from_parquet = analyze_anova(self.paths[".parquet"], os.path.join(self.tmpdir, "b.png"))
+        self.assertAlmostEqual(from_parquet["f_statistic"], from_csv["f_statistic"])
+        self.assertEqual(len(analyze_clustering(self.paths[".arrow"], os.path.join(self.tmpdir, "c.png"),
+                                                n_clusters=2)["centers"]), 2)
+
+    def test_time_series_writes_decomposition(self):
+        from columnar_io import read_frame, write_frame
+        from time_series_analyzer import analyze_time_series
+        dates = pd.date_range("2020-01-01", periods=48, freq="MS")
+        series = pd.DataFrame({"date": dates, "value": np.arange(48) + 5 * np.sin(np.arange(48) * np.pi / 6),
+                               "unused": "x"})
+        source = os.path.join(self.tmpdir, "ts.parquet")
+        write_frame(series, source)
+        output = os.path.join(self.tmpdir, "decomposition.parquet")
+        result = analyze_time_series(source, os.path.join(self.tmpdir, "plots"), decomposition_file=output)
+        self.assertEqual(result["observations"], 48)
+        components = read_frame(output, index_col="date")
+        self.assertEqual(list(components.columns), ["observed", "trend", "seasonal", "resid"])
+        np.testing.assert_allclose(components["observed"].to_numpy(), series["value"].to_numpy())
+
+    def test_write_results_and_convert(self):
+        from columnar_io import write_results, read_table, convert
+        path = os.path.join(self.tmpdir, "results.parquet")
+        write_results([{"name": "anova", "p_value": 0.5}, {"name": "t_test", "p_value": 0.01}], path)
+        self.assertEqual(read_table(path, filters=[("p_value", "<", 0.05)]).to_pylist(),
+                         [{"name": "t_test", "p_value": 0.01}])
+        dst = os.path.join(self.tmpdir, "narrow.feather")
+        self.assertEqual(convert(self.paths[".csv"], dst, columns=["x", "y"]), len(self.frame))
+        self.assertEqual(read_table(dst).column_names, ["x", "y"])
+
+    def test_analysis_dag_exports_results(self):
+        from analysis_dag import run_analyses
+        from columnar_io import read_table
+        path = os.path.join(self.tmpdir, "results.parquet")
+        results, outcome = run_analyses(self.paths[".parquet"], ["regression", "anova"], render=False,
+                                        cache=analysis_cache.get_analysis_cache(), results_file=path)
+        self.assertEqual(outcome.status["export"], "ok")
+        rows = read_table(path).to_pylist()
+        self.assertEqual([row["analysis"] for row in rows], ["regression", "anova"])
+        # 種類の違う解析の結果は列の和集合になり、持たない列は null
+        self.assertAlmostEqual(rows[0]["slope"], results["regression"]["slope"])
+        self.assertIsNone(rows[0]["f_statistic"])
+        self.assertEqual(rows[1]["groups"], 3)
+        self.assertIsNone(rows[1]["slope"])
+
+if __name__ == "__main__":
+    unittest.main()
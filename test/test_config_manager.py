@@ -0,0 +1,69 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules"))
+from config_manager import ConfigManager
+
+class TestConfigManager(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "config.json")
+        self.write({"db_path": "test.db", "ts_period": "6", "custom": 1})
+        self.manager = ConfigManager()
+        self.manager.load_config(self.path)
+
+    def tearDown(self):
+        self.manager.stop_watching()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def write(self, data, mtime_offset=0):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        if mtime_offset:
+            st = os.stat(self.path)
+            os.utime(self.path, ns=(st.st_atime_ns, st.st_mtime_ns + mtime_offset))
+
+    def test_schema_validation_and_defaults(self):
+        snapshot = self.manager.snapshot
+        self.assertEqual(snapshot["ts_period"], 6)
+        self.assertEqual(snapshot.db_path, "test.db")
+        self.assertEqual(snapshot["log_level"], "INFO")
+        self.assertEqual(self.manager.get("custom"), 1)
+        self.assertEqual(self.manager.get("missing", "x"), "x")
+
+    def test_snapshot_is_immutable(self):
+        snapshot = self.manager.snapshot
+        with self.assertRaises(TypeError):
+            snapshot["ts_period"] = 1
+        with self.assertRaises(AttributeError):
+            snapshot.ts_period = 1
+
+    def test_typed_lookups(self):
+        self.assertEqual(self.manager.get_int("ts_period"), 6)
+        self.assertEqual(self.manager.get_str("custom"), "1")
+        self.assertEqual(self.manager.get_float("ts_period"), 6.0)
+        self.assertEqual(self.manager.get_list("db_path", []), [])
+
+    def test_reload_on_change(self):
+        old_snapshot = self.manager.snapshot
+        self.write({"ts_period": 4}, mtime_offset=10 ** 9)
+        self.assertTrue(self.manager.reload())
+        self.assertEqual(self.manager.get_int("ts_period"), 4)
+        # 取得済みのスナップショットは変わらない
+        self.assertEqual(old_snapshot["ts_period"], 6)
+        self.assertFalse(self.manager.reload())
+
+    def test_broken_file_keeps_previous_snapshot(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("{broken")
+        st = os.stat(self.path)
+        os.utime(self.path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        self.assertFalse(self.manager.reload())
+        self.assertEqual(self.manager.get_int("ts_period"), 6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules"))
+from data_visualizer import _aggregate, visualize_data_from_csv, visualize_data_from_json
+from json_stream import iter_json_items
+
+class TestAggregate(unittest.TestCase):
+    def test_raw_keeps_rows(self):
+        labels, values, mode = _aggregate([("a", 1.0), ("b", 2.0)], mode="raw")
+        self.assertEqual((labels, values, mode), (["a", "b"], [1.0, 2.0], "raw"))
+
+    def test_bins_sum_mean_count(self):
+        records = [(str(i), float(i % 4)) for i in range(100)]
+        for agg, expected_total in (("sum", 150.0), ("count", 100)):
+            labels, values, mode = _aggregate(iter(records), mode="bins", agg=agg, max_bins=10)
+            self.assertEqual(mode, "bins")
+            self.assertLessEqual(len(labels), 10)
+            self.assertEqual(sum(values), expected_total)
+        labels, values, _ = _aggregate(iter(records), mode="bins", agg="mean", max_bins=25)
+        # ビン幅 4 の各ビンには 0,1,2,3 が 1 つずつ入る
+        self.assertEqual(labels[0], "0-3")
+        self.assertEqual(set(values), {1.5})
+
+    def test_top_n(self):
+        records = [("x", 1.0)] * 5 + [("y", 10.0), ("z", 2.0)]
+        self.assertEqual(_aggregate(records, mode="top", agg="sum", top_n=2)[:2], (["y", "x"], [10.0, 5.0]))
+        self.assertEqual(_aggregate(records, mode="top", agg="count", top_n=1)[:2], (["x"], [5]))
+        self.assertEqual(_aggregate(records, mode="top", agg="mean", top_n=1)[:2], (["y"], [10.0]))
+
+    def test_auto_switches_by_row_count_and_key_type(self):
+        self.assertEqual(_aggregate([(str(i), 1.0) for i in range(10)], raw_limit=10)[2], "raw")
+        self.assertEqual(_aggregate([(str(i), 1.0) for i in range(11)], raw_limit=10)[2], "bins")
+        labels, values, mode = _aggregate([(f"k{i}", float(i)) for i in range(11)], raw_limit=10, top_n=3)
+        self.assertEqual((labels, values, mode), (["k10", "k9", "k8"], [10.0, 9.0, 8.0], "top"))
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            _aggregate([], mode="pie")
+
+class TestJsonStreaming(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def write(self, text, name="data.json"):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_items_key_only_matched_at_top_level(self):
+        items = [{"id": i, "value": i * 1.5, "tag": "items"} for i in range(50)]
+        document = {"kind": "items", "meta": {"items": [{"id": -1}]}, "total": 12345, "items": items}
+        path = self.write(json.dumps(document, indent=1))
+        # バッファ境界がキーや数値の途中に来ても正しく読めるよう、小さいチャンクでも確かめる
+        for chunk_size in (1, 7, 1 << 16):
+            self.assertEqual(list(iter_json_items(path, chunk_size=chunk_size)), items)
+
+    def test_top_level_array_and_missing_items(self):
+        self.assertEqual(list(iter_json_items(self.write("[1, 22, {\"a\": [3]}]"), chunk_size=2)), [1, 22, {"a": [3]}])
+        self.assertEqual(list(iter_json_items(self.write('{"kind": "items", "rows": []}'))), [])
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_json_items(self.write('{"items": [{"id": 1}, ')))
+
+    def test_visualize_json_and_csv(self):
+        items = [{"id": i, "value": 1} for i in range(3000)]
+        json_path = self.write(json.dumps({"kind": "items", "items": items}))
+        csv_path = self.write("id,value\n" + "".join(f"{i},1\n" for i in range(3000)), "data.csv")
+        for visualize, path in ((visualize_data_from_json, json_path), (visualize_data_from_csv, csv_path)):
+            output = os.path.join(self.tmpdir, f"{visualize.__name__}.png")
+            with self.assertLogs(level="INFO") as logs:
+                visualize(path, output, max_bins=30)
+            self.assertTrue(os.path.exists(output))
+            self.assertIn("mode=bins", "\n".join(logs.output))
+
+if __name__ == "__main__":
+    unittest.main()
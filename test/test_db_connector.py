@@ -0,0 +1,122 @@
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules"))
+from db_connector import DBConnector
+
+class TestDBConnector(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmpdir, "test.db")
+        self.db = DBConnector()
+        self.db.connect(self.db_path)
+        self.db.execute("CREATE TABLE items (worker INTEGER, n INTEGER)")
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_wal_mode_enabled(self):
+        mode = self.db.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode.lower(), "wal")
+
+    def test_concurrent_writers(self):
+        errors = []
+        connections = set()
+
+        def worker(worker_id):
+            try:
+                connections.add(id(self.db.connection))
+                for n in range(50):
+                    with self.db.transaction() as conn:
+                        conn.execute("INSERT INTO items VALUES (?, ?)", (worker_id, n))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertGreater(len(connections), 1)
+        count = self.db.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+        self.assertEqual(count, 400)
+
+    def test_transaction_rollback(self):
+        with self.assertRaises(ValueError):
+            with self.db.transaction() as conn:
+                conn.execute("INSERT INTO items VALUES (1, 1)")
+                raise ValueError("boom")
+        count = self.db.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+        self.assertEqual(count, 0)
+
+    def test_executemany_batches(self):
+        rows = ((i % 4, i) for i in range(1000))
+        total = self.db.executemany("INSERT INTO items VALUES (?, ?)", rows, batch_size=300)
+        self.assertEqual(total, 1000)
+        count = self.db.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+        self.assertEqual(count, 1000)
+
+    def test_load_file_from_parser(self):
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "plugins"))
+        from csv_parser_plugin import CSVParser
+        csv_path = os.path.join(self.tmpdir, "rows.csv")
+        with open(csv_path, "w", encoding="utf-8") as f:
+            f.write("id,name,value\n")
+            for i in range(250):
+                f.write(f"{i},Item_{i},{i * 10}\n")
+        total = self.db.load_file(CSVParser(), csv_path, "rows", batch_size=100)
+        self.assertEqual(total, 250)
+        row = self.db.execute("SELECT name, value FROM rows WHERE id = '7'").fetchone()
+        self.assertEqual(row, ("Item_7", "70"))
+
+    def test_load_file_streams_json(self):
+        import json
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "plugins"))
+        from json_parser_plugin import JSONParser
+        json_path = os.path.join(self.tmpdir, "rows.json")
+        items = [{"id": i, "name": f"Item_{i}"} for i in range(250)]
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"kind": "items", "items": items}, f)
+        self.assertEqual(self.db.load_file(JSONParser(), json_path, "rows", batch_size=100), 250)
+        self.assertEqual(self.db.execute("SELECT name FROM rows WHERE id = 7").fetchone(), ("Item_7",))
+        # 末尾が壊れたファイルでも、先頭の要素は文書全体を読む前に返る
+        with open(json_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"items": items})[:-10])
+        records = JSONParser().iter_parse(json_path)
+        self.assertEqual(next(records), items[0])
+        with self.assertLogs(level="ERROR"), self.assertRaises(json.JSONDecodeError):
+            list(records)
+
+    def test_db_calls_emit_metrics(self):
+        import json
+        import metrics
+        path = os.path.join(self.tmpdir, "metrics.jsonl")
+        metrics.configure_metrics(path)
+        try:
+            self.db.execute("INSERT INTO items VALUES (1, 1)")
+            self.db.commit()
+            with self.db.transaction() as conn:
+                conn.execute("UPDATE items SET n = 2")
+        finally:
+            metrics.configure_metrics(None)
+        with open(path, encoding="utf-8") as f:
+            events = [json.loads(line) for line in f]
+        self.assertEqual([e["stage"] for e in events], ["db.execute", "db.commit", "db.transaction"])
+        self.assertEqual(events[0]["rows"], 1)
+        self.assertTrue(events[0]["query"].startswith("INSERT INTO items"))
+
+    def test_context_manager_closes(self):
+        with DBConnector() as db:
+            db.connect(self.db_path)
+            self.assertIsNotNone(db.connection)
+        self.assertIsNone(db.connection)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules"))
+from di_container import DIContainer
+
+class IService:
+    pass
+
+class SlowService(IService):
+    created = 0
+
+    def __init__(self):
+        type(self).created += 1
+        time.sleep(0.05)
+
+class Closable:
+    closed = []
+
+    def close(self):
+        Closable.closed.append(self)
+
+class TestDIContainer(unittest.TestCase):
+    def setUp(self):
+        DIContainer.clear()
+        SlowService.created = 0
+        Closable.closed = []
+
+    def tearDown(self):
+        DIContainer.enable_stats(False)
+        DIContainer.clear()
+
+    def test_singleton_is_created_once_across_threads(self):
+        DIContainer.register(IService, SlowService)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            instances = list(executor.map(lambda _: DIContainer.resolve(IService), range(16)))
+        self.assertEqual(SlowService.created, 1)
+        self.assertEqual(len({id(i) for i in instances}), 1)
+        self.assertIs(DIContainer.resolver(IService)(), instances[0])
+
+    def test_transient_and_instance_registration(self):
+        DIContainer.register(IService, SlowService, singleton=False)
+        self.assertIsNot(DIContainer.resolve(IService), DIContainer.resolve(IService))
+        shared = object()
+        DIContainer.register("value", shared, singleton=False)
+        self.assertIs(DIContainer.resolve("value"), shared)
+        with self.assertRaises(ValueError):
+            DIContainer.resolve("missing")
+        with self.assertRaises(ValueError):
+            DIContainer.register(IService, SlowService, lifetime="request")
+
+    def test_thread_lifetime(self):
+        DIContainer.register(IService, Closable, lifetime="thread")
+        main = DIContainer.resolve(IService)
+        self.assertIs(DIContainer.resolve(IService), main)
+        other = []
+        thread = threading.Thread(target=lambda: other.append(DIContainer.resolve(IService)))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], main)
+
+    def test_scoped_lifetime(self):
+        DIContainer.register(IService, Closable, lifetime="scoped")
+        with self.assertRaises(RuntimeError):
+            DIContainer.resolve(IService)
+        with DIContainer.scope():
+            first = DIContainer.resolve(IService)
+            self.assertIs(DIContainer.resolve(IService), first)
+        self.assertEqual(Closable.closed, [first])
+        with DIContainer.scope():
+            self.assertIsNot(DIContainer.resolve(IService), first)
+
+        async def request():
+            with DIContainer.scope():
+                instance = DIContainer.resolve(IService)
+                await asyncio.sleep(0)
+                self.assertIs(DIContainer.resolve(IService), instance)
+                return instance
+
+        async def run():
+            return await asyncio.gather(request(), request())
+        a, b = asyncio.run(run())
+        self.assertIsNot(a, b)
+
+    def test_stats(self):
+        DIContainer.register(IService, SlowService)
+        DIContainer.enable_stats()
+        for _ in range(5):
+            DIContainer.resolve(IService)
+        stats = DIContainer.stats()["IService"]
+        self.assertEqual(stats["lifetime"], "singleton")
+        self.assertEqual(stats["resolutions"], 5)
+        self.assertEqual(stats["constructions"], 1)
+        self.assertGreater(stats["construct_time_s"], 0.04)
+        DIContainer.enable_stats(False)
+        DIContainer.resolve(IService)
+        self.assertEqual(DIContainer.stats()["IService"]["resolutions"], 5)
+
+if __name__ == "__main__":
+    unittest.main()
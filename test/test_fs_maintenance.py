@@ -0,0 +1,72 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules"))
+from fs_maintenance import plan_maintenance, execute_plan, format_plan, tracked_files, MOVE_MODULES
+
+class TestFsMaintenance(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        for rel in ("main.py", "helper.py", "test_top.py", "modules/analyzer.py", "modules/test_inner.py",
+                    "modules/helper2.py", "modules/__pycache__/x.pyc", "pkg/sub/__pycache__/y.pyc",
+                    "pkg/sub/desktop.ini", "pkg/Desktop.ini", "config.json.bak", "modules.bak/old.py"):
+            self.write(rel)
+        subprocess.run(["git", "init", "-q"], cwd=self.root, check=True)
+        subprocess.run(["git", "add", "pkg/sub/desktop.ini"], cwd=self.root, check=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def write(self, rel):
+        path = os.path.join(self.root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("# " + rel)
+
+    def exists(self, rel):
+        return os.path.exists(os.path.join(self.root, rel))
+
+    def test_plan_covers_cleanup_and_moves(self):
+        plan = plan_maintenance(self.root)
+        summary = {(a.kind, a.path, a.dest) for a in plan}
+        expected = {
+            ("rmtree", "modules.bak", None),
+            ("remove", "config.json.bak", None),
+            ("rmtree", os.path.join("modules", "__pycache__"), None),
+            ("rmtree", os.path.join("pkg", "sub", "__pycache__"), None),
+            ("remove", os.path.join("pkg", "Desktop.ini"), None),
+            ("remove", os.path.join("pkg", "sub", "desktop.ini"), None),
+            ("untrack", os.path.join("pkg", "sub", "desktop.ini"), None),
+            ("mkdir", "test", None),
+            ("move", "test_top.py", os.path.join("test", "test_top.py")),
+            ("move", os.path.join("modules", "test_inner.py"), os.path.join("test", "test_inner.py")),
+            ("move", "helper.py", os.path.join("modules", "helper.py")),
+        }
+        self.assertEqual(summary, expected)
+        self.assertIn("移動: helper.py", format_plan(plan))
+
+    def test_tracked_files_single_call(self):
+        self.assertEqual(tracked_files([os.path.join("pkg", "sub", "desktop.ini"), os.path.join("pkg", "Desktop.ini")],
+                                       self.root), {os.path.join("pkg", "sub", "desktop.ini")})
+
+    def test_dry_run_changes_nothing(self):
+        plan = plan_maintenance(self.root)
+        self.assertEqual(execute_plan(plan, self.root, dry_run=True), [])
+        self.assertTrue(self.exists("helper.py"))
+        self.assertTrue(self.exists("modules.bak"))
+
+    def test_execute(self):
+        self.assertEqual(execute_plan(plan_maintenance(self.root), self.root), [])
+        for rel in ("modules/helper.py", "test/test_top.py", "test/test_inner.py", "main.py"):
+            self.assertTrue(self.exists(rel), rel)
+        for rel in ("helper.py", "modules.bak", "config.json.bak", "pkg/Desktop.ini", "modules/__pycache__"):
+            self.assertFalse(self.exists(rel), rel)
+        self.assertEqual(tracked_files([os.path.join("pkg", "sub", "desktop.ini")], self.root), set())
+        self.assertEqual(plan_maintenance(self.root, (MOVE_MODULES,)), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import sys
+import csv
+import json
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules"))
+from generate_dummy_datasets import generate_dataset, sample, DISTRIBUTIONS
+
+class TestGenerateDummyDatasets(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def path(self, name):
+        return os.path.join(self.tmpdir, name)
+
+    def test_items_json_matches_json_dump(self):
+        for n in (0, 1, 25):
+            expected = json.dumps({"items": [{"id": i, "name": f"Item_{i}", "value": i * 10}
+                                             for i in range(1, n + 1)]}, indent=2)
+            generate_dataset("items_json", self.path("items.json"), n, chunk_size=7)
+            with open(self.path("items.json"), encoding="utf-8") as f:
+                self.assertEqual(f.read(), expected)
+
+    def test_same_seed_is_reproducible(self):
+        for kind in ("anova", "regression", "clustering", "timeseries", "stat"):
+            generate_dataset(kind, self.path("a.csv"), 100, seed=3, chunk_size=100)
+            generate_dataset(kind, self.path("b.csv"), 100, seed=3, chunk_size=100)
+            with open(self.path("a.csv")) as a, open(self.path("b.csv")) as b:
+                self.assertEqual(a.read(), b.read(), kind)
+
+    def test_shards_cover_all_rows(self):
+        paths = generate_dataset("items", self.path("items.csv"), 1001, shards=3, workers=1)
+        ids = []
+        for path in paths:
+            with open(path, newline="", encoding="utf-8") as f:
+                ids.extend(int(row["id"]) for row in csv.DictReader(f))
+        self.assertEqual(ids, list(range(1, 1002)))
+
+    def test_distributions_are_standardized(self):
+        rng = np.random.default_rng(0)
+        for dist in DISTRIBUTIONS:
+            values = sample(rng, dist, 5.0, 2.0, 200_000)
+            self.assertAlmostEqual(values.mean(), 5.0, delta=0.05, msg=dist)
+            self.assertAlmostEqual(values.std(), 2.0, delta=0.1, msg=dist)
+        with self.assertRaises(ValueError):
+            sample(rng, "cauchy", 0, 1, 1)
+
+if __name__ == "__main__":
+    unittest.main()
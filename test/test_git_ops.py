@@ -0,0 +1,94 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules"))
+from git_ops import GitRepo, parse_porcelain_v2
+
+def git(cwd, *args):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True)
+
+class TestGitOps(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.remote = os.path.join(self.tmpdir, "remote.git")
+        git(self.tmpdir, "init", "-q", "--bare", "-b", "main", self.remote)
+        self.work = self.clone("work")
+        self.write(self.work, "a.txt", "base\n")
+        self.write(self.work, "b.txt", "base\n")
+        git(self.work, "add", "-A")
+        git(self.work, "commit", "-q", "-m", "base")
+        git(self.work, "push", "-q", "-u", "origin", "main")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def clone(self, name):
+        path = os.path.join(self.tmpdir, name)
+        git(self.tmpdir, "clone", "-q", self.remote, path)
+        git(path, "config", "user.email", "test@example.com")
+        git(path, "config", "user.name", "test")
+        git(path, "checkout", "-q", "-B", "main")
+        return path
+
+    def write(self, repo, rel, text):
+        with open(os.path.join(repo, rel), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_status_is_read_once_and_cached(self):
+        self.write(self.work, "a.txt", "changed\n")
+        self.write(self.work, "new file.txt", "x\n")
+        repo = GitRepo(self.work)
+        self.assertEqual(repo.current_branch(), "main")
+        status = repo.status()
+        self.assertEqual(status.upstream, "origin/main")
+        self.assertEqual(status.changed, [(".M", "a.txt")])
+        self.assertEqual(status.untracked, ["new file.txt"])
+        self.assertFalse(repo.is_clean())
+        repo.format_status()
+        self.assertEqual(repo.calls, 1)
+
+        self.assertTrue(repo.commit_all("change"))
+        self.assertEqual(repo.status().ahead, 1)
+        repo.push()
+        self.assertEqual(repo.status(refresh=True).ahead, 0)
+        # 変更がないことが分かっていれば git を起動しない
+        calls = repo.calls
+        self.assertFalse(repo.commit_all("nothing"))
+        self.assertEqual(repo.calls, calls)
+
+    def test_conflicts_resolved_in_batched_calls(self):
+        other = self.clone("other")
+        for name in ("a.txt", "b.txt"):
+            self.write(other, name, "theirs\n")
+            self.write(self.work, name, "ours\n")
+        git(other, "commit", "-q", "-am", "theirs")
+        git(other, "push", "-q", "origin", "main")
+        git(self.work, "commit", "-q", "-am", "ours")
+
+        repo = GitRepo(self.work)
+        with self.assertRaises(subprocess.CalledProcessError):
+            repo.run("pull", "-q", "--no-rebase", "origin", "main")
+        repo.invalidate()
+        calls = repo.calls
+        self.assertEqual(sorted(repo.resolve_ours("resolve")), ["a.txt", "b.txt"])
+        # status + checkout --ours + add + commit
+        self.assertEqual(repo.calls - calls, 4)
+        with open(os.path.join(self.work, "a.txt"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), "ours\n")
+        self.assertEqual(repo.conflicted_files(), [])
+        repo.push()
+
+    def test_parse_rename_and_detached(self):
+        output = ("# branch.oid abc\0# branch.head (detached)\0"
+                  "2 R. N... 100644 100644 100644 a b R100 new name.txt\0old.txt\0? x.txt\0")
+        status = parse_porcelain_v2(output)
+        self.assertIsNone(status.branch)
+        self.assertEqual(status.changed, [("R.", "new name.txt")])
+        self.assertEqual(status.untracked, ["x.txt"])
+
+if __name__ == '__main__':
+    unittest.main()
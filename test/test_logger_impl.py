@@ -0,0 +1,87 @@
+import os
+import sys
+import queue
+import shutil
+import logging
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules"))
+from logger_impl import RateLimitFilter, BatchingQueueListener, _BufferedFileHandler, _DeferredQueueHandler
+
+class TestAsyncLogging(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.tmpdir, "async.log")
+        self.logger = logging.getLogger("test_async_logging")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+
+    def tearDown(self):
+        self.logger.handlers.clear()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_queue_listener_writes_all_records(self):
+        handler = _BufferedFileHandler(self.log_file, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+        log_queue = queue.SimpleQueue()
+        listener = BatchingQueueListener(log_queue, [handler], batch_size=16, flush_interval=0.05)
+        listener.start()
+        self.logger.addHandler(_DeferredQueueHandler(log_queue))
+        for i in range(100):
+            self.logger.info("message %d", i)
+        listener.stop()
+        handler.close()
+        with open(self.log_file, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 100)
+        self.assertEqual(lines[42], "INFO message 42")
+
+    def test_mutable_args_and_exceptions_are_captured_at_call_time(self):
+        log_queue = queue.SimpleQueue()
+        self.logger.addHandler(_DeferredQueueHandler(log_queue))
+        items = [1]
+        self.logger.info("items %s, count %d", items, 1)
+        items.append(2)
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            self.logger.exception("failed %d", 3)
+        first, second = log_queue.get_nowait(), log_queue.get_nowait()
+        self.assertEqual(first.getMessage(), "items [1], count 1")
+        self.assertIsNone(first.args)
+        # 不変の引数だけなら整形は書き込みスレッドまで遅らせる
+        self.assertEqual(second.args, (3,))
+        self.assertIsNone(second.exc_info)
+        self.assertIn("ValueError: boom", logging.Formatter().format(second))
+
+    def test_rate_limit_filter_is_thread_safe(self):
+        import threading
+        limiter = RateLimitFilter(burst=10, interval=60)
+        passed = []
+        record = logging.LogRecord("x", logging.INFO, "same.py", 1, "hot path", None, None)
+
+        def worker():
+            passed.append(sum(limiter.filter(record) for _ in range(2000)))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(sum(passed), 10)
+
+    def test_rate_limit_filter(self):
+        records = []
+        handler = logging.Handler()
+        handler.emit = records.append
+        handler.addFilter(RateLimitFilter(burst=5, interval=60))
+        self.logger.addHandler(handler)
+        for i in range(50):
+            self.logger.info("repeated %d", i)
+        self.logger.warning("always kept")
+        self.assertEqual(len(records), 6)
+        self.assertEqual(records[-1].getMessage(), "always kept")
+
+if __name__ == '__main__':
+    unittest.main()
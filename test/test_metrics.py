@@ -0,0 +1,93 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules"))
+import metrics
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "metrics.jsonl")
+        metrics.configure_metrics(self.path)
+
+    def tearDown(self):
+        metrics.configure_metrics(None)
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def read_events(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def test_stage_writes_event_with_recorded_fields(self):
+        with metrics.stage("parse.csv", bytes_read=10):
+            metrics.record_metrics(rows=3)
+        with self.assertRaises(ValueError):
+            with metrics.stage("parse.csv"):
+                raise ValueError("boom")
+        events = self.read_events()
+        self.assertEqual(len(events), 2)
+        self.assertEqual(events[0]["rows"], 3)
+        self.assertEqual(events[0]["bytes_read"], 10)
+        self.assertEqual(events[0]["status"], "ok")
+        self.assertEqual(events[1]["status"], "error")
+        self.assertIn("duration_ms", events[0])
+
+    def test_timed_records_input_size(self):
+        data = os.path.join(self.tmpdir, "data.csv")
+        with open(data, "w") as f:
+            f.write("a,b\n1,2\n")
+
+        @metrics.timed("analyze.test", input_arg="csv_file")
+        def analyze(csv_file):
+            return 1
+
+        self.assertEqual(analyze(data), 1)
+        event = self.read_events()[0]
+        self.assertEqual(event["stage"], "analyze.test")
+        self.assertEqual(event["bytes_read"], os.path.getsize(data))
+
+    def test_nested_stages_keep_outer_peak(self):
+        import tracemalloc
+        started = not tracemalloc.is_tracing()
+        metrics.configure_metrics(self.path, track_memory=True)
+        try:
+            baseline = bytearray(4 << 20)  # 段階の開始前からある分は増加に含めない
+            with metrics.stage("outer"):
+                big = bytearray(8 << 20)
+                del big
+                with metrics.stage("inner"):
+                    small = bytearray(1 << 20)
+                    del small
+            del baseline
+        finally:
+            if started:
+                tracemalloc.stop()
+        events = {e["stage"]: e for e in self.read_events()}
+        self.assertGreaterEqual(events["outer"]["peak_traced_bytes"], 8 << 20)
+        self.assertLess(events["outer"]["peak_traced_bytes"], 11 << 20)
+        self.assertGreaterEqual(events["inner"]["peak_traced_bytes"], 1 << 20)
+        self.assertLess(events["inner"]["peak_traced_bytes"], 3 << 20)
+        self.assertNotIn("max_rss_kb", events["outer"])
+
+    def test_summarize_percentiles(self):
+        for d in range(1, 101):
+            metrics.emit({"stage": "s", "duration_ms": float(d), "rows": 1})
+        summary = metrics.summarize([self.path])["s"]
+        self.assertEqual(summary["count"], 100)
+        self.assertEqual(summary["p50_ms"], 50.0)
+        self.assertEqual(summary["p95_ms"], 95.0)
+        self.assertEqual(summary["max_ms"], 100.0)
+        self.assertEqual(summary["rows"], 100)
+
+    def test_disabled_is_noop(self):
+        metrics.configure_metrics(None)
+        with metrics.stage("x"):
+            metrics.record_metrics(rows=1)
+        self.assertFalse(os.path.exists(self.path))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "modules"))
+from plugin_workers import PluginWorkerPool, PluginWorkerError, encode_rows, decode_rows, write_shared
+from plugin_manager import PluginManager
+
+PLUGINS = {
+    "sum_plugin.py": '''
+import os
+from interfaces import IAnalysis
+PLUGIN_NAME = "Sum"
+class Sum(IAnalysis):
+    def analyze(self, data, **kwargs):
+        blob = b"x" * (kwargs.get("alloc_mb", 0) << 20)
+        return {"total": sum(int(row["value"]) for row in data) * kwargs.get("scale", 1), "pid": os.getpid(),
+                "allocated": len(blob)}
+''',
+    "crash_plugin.py": '''
+import os
+from interfaces import IAnalysis
+PLUGIN_NAME = "Crash"
+class Crash(IAnalysis):
+    def analyze(self, data, **kwargs):
+        if kwargs.get("hard"):
+            os._exit(3)
+        raise ValueError("bad data")
+''',
+    "sleep_plugin.py": '''
+import time
+from interfaces import IAnalysis
+PLUGIN_NAME = "Sleep"
+class Sleep(IAnalysis):
+    def analyze(self, data, **kwargs):
+        time.sleep(kwargs.get("seconds", 0))
+        return {"rows": len(data)}
+''',
+}
+
+class TestPluginWorkers(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.plugin_dir = tempfile.mkdtemp()
+        for name, source in PLUGINS.items():
+            with open(os.path.join(cls.plugin_dir, name), "w", encoding="utf-8") as f:
+                f.write(source)
+        cls.pool = PluginWorkerPool(cls.plugin_dir, workers=2, task_timeout=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+        shutil.rmtree(cls.plugin_dir, ignore_errors=True)
+
+    def rows(self, n=100):
+        return [{"id": str(i), "value": str(i), "name": f"Item_{i}"} for i in range(n)]
+
+    def test_columnar_round_trip(self):
+        rows = [{"a": 1, "b": "x", "c": 1.5}, {"a": 2 ** 70, "b": "y\0z", "d": None}, {"a": 3, "b": "", "c": 2},
+                {"a": -1, "b": "日本語", "e": [1, 2]}]
+        mixed = [{"v": 1, "f": 0.5}, {"v": 2.5, "f": 1.0}, {"v": True}]
+        for case in (rows, mixed):
+            shm, meta = write_shared(case)
+            try:
+                decoded = decode_rows(shm.buf, meta)
+            finally:
+                shm.close()
+                shm.unlink()
+            # 1 == 1.0 == True なので値だけでなく型も比べる
+            self.assertEqual([[(k, type(v), v) for k, v in row.items()] for row in decoded],
+                             [[(k, type(v), v) for k, v in row.items()] for row in case])
+        self.assertEqual([c[1] for c in encode_rows(mixed)[0]["columns"]], ["p", "d"])
+        meta, blobs = encode_rows(self.rows(10))
+        self.assertEqual([c[1] for c in meta["columns"]], ["s", "s", "s"])
+        self.assertEqual(decode_rows(memoryview(b""), encode_rows([])[0]), [])
+
+    def test_analyze_all_reuses_warm_workers(self):
+        data = self.rows()
+        pids = set()
+        for scale in (1, 2, 3):
+            results = self.pool.analyze_all(data, plugins=["Sum", "Sleep"], plugin_kwargs={"Sum": {"scale": scale}})
+            self.assertEqual(results["Sum"]["total"], 4950 * scale)
+            self.assertEqual(results["Sleep"], {"rows": 100})
+            pids.add(results["Sum"]["pid"])
+        self.assertNotIn(os.getpid(), pids)
+        self.assertLessEqual(len(pids), 2)
+        stats = self.pool.stats()["Sum"]
+        self.assertGreaterEqual(stats["calls"], 3)
+        self.assertGreaterEqual(stats["cpu_s"], 0.0)
+        if sys.platform != "win32":
+            self.assertGreater(stats["peak_rss_kb"], 0)
+            self.assertGreaterEqual(stats["max_rss_growth_kb"], 0)
+
+    def test_rss_growth_is_attributed_per_call(self):
+        if sys.platform == "win32":
+            self.skipTest("resource is Unix only")
+        result = self.pool.analyze("Sum", self.rows(5), alloc_mb=64)
+        self.assertEqual(result["allocated"], 64 << 20)
+        self.assertGreater(self.pool.stats()["Sum"]["max_rss_growth_kb"], 32 * 1024)
+
+    def test_failures_do_not_take_down_the_pool(self):
+        with self.assertLogs(level="ERROR"):
+            with self.assertRaisesRegex(PluginWorkerError, "bad data"):
+                self.pool.analyze("Crash", self.rows(3))
+            restarts = self.pool.restarts
+            with self.assertRaisesRegex(PluginWorkerError, "crashed"):
+                self.pool.analyze("Crash", self.rows(3), hard=True)
+            with self.assertRaisesRegex(PluginWorkerError, "timed out"):
+                self.pool.analyze("Sleep", self.rows(3), seconds=30)
+        self.assertEqual(self.pool.restarts, restarts + 2)
+        self.assertEqual(self.pool.analyze("Sum", self.rows(5))["total"], 10)
+        self.assertGreaterEqual(self.pool.stats()["Crash"]["failures"], 2)
+
+    def test_plugin_manager_run_analysis(self):
+        manager = PluginManager()
+        manager.load_plugins_from_directory(self.plugin_dir)
+        in_process = manager.run_analysis("Sum", self.rows(10))
+        self.assertEqual(in_process["pid"], os.getpid())
+        manager.start_workers(workers=1)
+        try:
+            in_worker = manager.run_analysis("Sum", self.rows(10))
+        finally:
+            manager.stop_workers()
+        self.assertEqual(in_worker["total"], in_process["total"])
+        self.assertNotEqual(in_worker["pid"], os.getpid())
+
+if __name__ == "__main__":
+    unittest.main()
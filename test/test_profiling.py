@@ -0,0 +1,75 @@
+import os
+import sys
+import types
+import pstats
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules"))
+import profiling
+from interfaces import IAnalysis
+
+def busy(n):
+    return sum(i * i for i in range(n))
+
+@profiling.profiled("test.outer")
+def outer(n):
+    return inner(n) + busy(n)
+
+@profiling.profiled("test.inner")
+def inner(n):
+    return busy(n)
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.env = {k: os.environ.get(k) for k in (profiling.PROFILE_ENV, profiling.PROFILE_DIR_ENV,
+                                                   profiling.PROFILE_MEMORY_ENV)}
+        os.environ[profiling.PROFILE_ENV] = "1"
+        os.environ[profiling.PROFILE_DIR_ENV] = self.tmpdir
+        os.environ[profiling.PROFILE_MEMORY_ENV] = "1"
+
+    def tearDown(self):
+        for key, value in self.env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_writes_one_profile_per_outermost_call(self):
+        self.assertEqual(outer(1000), 2 * busy(1000))
+        files = sorted(os.listdir(self.tmpdir))
+        self.assertEqual(len(files), 2)
+        self.assertTrue(files[0].startswith("test.outer-") and files[0].endswith(".prof"))
+        self.assertTrue(files[1].endswith(".tracemalloc"))
+
+    def test_disabled(self):
+        os.environ[profiling.PROFILE_ENV] = "0"
+        outer(10)
+        self.assertEqual(os.listdir(self.tmpdir), [])
+
+    def test_folded_stacks(self):
+        outer(20000)
+        prof = [f for f in os.listdir(self.tmpdir) if f.endswith(".prof")][0]
+        stacks = profiling.folded_stacks(pstats.Stats(os.path.join(self.tmpdir, prof)))
+        self.assertTrue(any(key.startswith("outer (") and "inner (" in key for key in stacks))
+        self.assertTrue(all(value > 0 for value in stacks.values()))
+
+    def test_instrument_plugin_module(self):
+        module = types.ModuleType("fake_plugin")
+
+        class Fake(IAnalysis):
+            def analyze(self, data, **kwargs):
+                return {"n": len(data)}
+
+        Fake.__module__ = module.__name__
+        module.Fake = Fake
+        self.assertEqual(profiling.instrument_plugin_module(module), 1)
+        self.assertEqual(profiling.instrument_plugin_module(module), 0)
+        self.assertEqual(Fake().analyze([1, 2]), {"n": 2})
+        self.assertTrue(any(f.startswith("plugin.Fake-") for f in os.listdir(self.tmpdir)))
+
+if __name__ == "__main__":
+    unittest.main()
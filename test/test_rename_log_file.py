@@ -0,0 +1,71 @@
+import os
+import sys
+import gzip
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules"))
+from rename_log_file import count_log_levels, rename_log_file_with_summary, rotate_log_file
+
+LINES = (
+    "2026-01-01 00:00:00 - INFO - started\n"
+    "2026-01-01 00:00:01 - DEBUG - value - ERROR - inside message\n"
+    "2026-01-01 00:00:02 - WARNING - slow\n"
+    "Traceback line without level\n"
+    "2026-01-01 00:00:03 - INFO - done"
+)
+
+class TestRenameLogFile(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmpdir)
+        with open("private_app.log", "w", encoding="utf-8") as f:
+            f.write(LINES)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_counts_are_independent_of_chunk_size(self):
+        expected = {"DEBUG": 1, "INFO": 2, "WARNING": 1, "ERROR": 0, "CRITICAL": 0, "lines": 5}
+        for chunk_size in (1, 7, 64, 1 << 20):
+            self.assertEqual(count_log_levels("private_app.log", chunk_size), expected)
+
+    def test_very_long_lines(self):
+        with open("long.log", "w", encoding="utf-8") as f:
+            f.write("2026-01-01 00:00:00 - ERROR - " + "x" * (4 << 20) + "\n")
+            f.write("2026-01-01 00:00:01 - INFO - short\n")
+            f.write("2026-01-01 00:00:02 - WARNING - " + "y" * (1 << 20))
+        expected = {"DEBUG": 0, "INFO": 1, "WARNING": 1, "ERROR": 1, "CRITICAL": 0, "lines": 3}
+        # 改行のないチャンクが続いても持ち越しは行頭だけなので、小さいチャンクでも線形時間で終わる
+        for chunk_size in (5, 4096, 1 << 20):
+            self.assertEqual(count_log_levels("long.log", chunk_size), expected)
+
+    def test_rename_with_summary(self):
+        result = rename_log_file_with_summary("private_app.log", compress=True)
+        self.assertEqual(result["summary"], "WARNING")
+        self.assertEqual(result["path"], "private_app_WARNING.log.gz")
+        self.assertFalse(os.path.exists("private_app.log"))
+        with gzip.open(result["path"], "rt", encoding="utf-8") as f:
+            self.assertEqual(f.read(), LINES)
+
+    def test_rotation_by_size_and_pruning(self):
+        self.assertIsNone(rotate_log_file("private_app.log", max_bytes=1 << 20))
+        self.assertTrue(os.path.exists("private_app.log"))
+        for i in range(3):
+            with open("private_app.log", "a", encoding="utf-8") as f:
+                f.write(f"\n2026-01-01 00:00:0{i} - ERROR - failed {i}\n")
+            result = rotate_log_file("private_app.log", max_bytes=10, backup_count=1)
+            self.assertEqual(result["summary"], "ERROR")
+            os.utime(result["path"], (1000 + i, 1000 + i))
+            last = result["path"]
+        rotated = [name for name in os.listdir(".") if name.endswith(".gz")]
+        self.assertEqual(rotated, [os.path.basename(last)])
+
+    def test_rotation_by_age(self):
+        self.assertIsNotNone(rotate_log_file("private_app.log", max_age=60, compress=False))
+
+if __name__ == "__main__":
+    unittest.main()
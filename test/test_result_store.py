@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules"))
+from result_store import ResultStore, fingerprint_file, check_result_store, save_to_result_store
+
+class TestResultStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = ResultStore(db_path=os.path.join(self.tmpdir, "results.db"))
+        self.csv_file = os.path.join(self.tmpdir, "data.csv")
+        with open(self.csv_file, "w", encoding="utf-8") as f:
+            f.write("x,y\n1,2\n2,4\n")
+
+    def tearDown(self):
+        self.store.db.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_save_and_lookup(self):
+        fp = fingerprint_file(self.csv_file)
+        self.assertIsNone(self.store.lookup("regression", fp, {"a": 1}))
+        self.store.save("regression", fp, {"a": 1}, {"slope": 2.0})
+        self.assertEqual(self.store.lookup("regression", fp, {"a": 1}), {"slope": 2.0})
+        # パラメータが異なれば別の結果として扱う
+        self.assertIsNone(self.store.lookup("regression", fp, {"a": 2}))
+
+    def test_fingerprint_changes_with_content(self):
+        before = fingerprint_file(self.csv_file)
+        time.sleep(0.01)
+        with open(self.csv_file, "a", encoding="utf-8") as f:
+            f.write("3,6\n")
+        self.assertNotEqual(before, fingerprint_file(self.csv_file))
+
+    def test_check_and_save_helpers(self):
+        fingerprint, cached = check_result_store(self.store, "t_test", self.csv_file, {})
+        self.assertIsNone(cached)
+        save_to_result_store(self.store, "t_test", fingerprint, {}, {"t_statistic": -1.0}, self.csv_file)
+        _, cached = check_result_store(self.store, "t_test", self.csv_file, {})
+        self.assertEqual(cached, {"t_statistic": -1.0})
+        # 出力画像が失われている場合はキャッシュを使わない
+        _, cached = check_result_store(self.store, "t_test", self.csv_file, {},
+                                       os.path.join(self.tmpdir, "missing.png"))
+        self.assertIsNone(cached)
+
+    def test_query_by_type(self):
+        self.store.save("anova", "fp1", {}, {"f_statistic": 1.0})
+        self.store.save("anova", "fp2", {}, {"f_statistic": 2.0})
+        self.store.save("regression", "fp1", {}, {"slope": 1.0})
+        rows = self.store.query("anova")
+        self.assertEqual(len(rows), 2)
+        self.assertEqual({r["input_fingerprint"] for r in rows}, {"fp1", "fp2"})
+
+if __name__ == '__main__':
+    unittest.main()
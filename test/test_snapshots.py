@@ -0,0 +1,105 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules"))
+from snapshots import take_snapshot, restore_snapshot, list_snapshots
+
+class TestSnapshots(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = os.path.join(self.root, ".snapshots")
+        for i in range(5):
+            self.write(f"modules/mod{i}.py", f"value = {i}\n")
+        self.write("modules/sub/inner.py", "inner = True\n")
+        self.write("config.json", '{"a": 1}')
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def write(self, rel, text):
+        path = os.path.join(self.root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def read(self, rel):
+        with open(os.path.join(self.root, rel), encoding="utf-8") as f:
+            return f.read()
+
+    def snapshot(self, keep=5):
+        return take_snapshot(["modules", "config.json", "missing.py"], root=self.root, keep=keep)
+
+    def test_unchanged_files_are_hard_linked(self):
+        generation, stats = self.snapshot()
+        self.assertEqual((generation, stats["copied"], stats["linked"]), (1, 7, 0))
+        self.write("modules/mod0.py", "value = 'changed'\n")
+        generation, stats = self.snapshot()
+        self.assertEqual((generation, stats["copied"], stats["linked"]), (2, 1, 6))
+        first = os.path.join(self.store, "000001", "modules", "mod1.py")
+        second = os.path.join(self.store, "000002", "modules", "mod1.py")
+        self.assertEqual(os.stat(first).st_ino, os.stat(second).st_ino)
+        self.assertNotEqual(os.stat(os.path.join(self.root, "modules", "mod1.py")).st_ino, os.stat(second).st_ino)
+
+    def test_restore_swaps_directory_and_copies_only_changes(self):
+        self.snapshot()
+        self.write("modules/mod0.py", "broken\n")
+        self.write("modules/new.py", "new\n")
+        os.remove(os.path.join(self.root, "modules", "sub", "inner.py"))
+        self.write("config.json", "{}")
+        stats = restore_snapshot(root=self.root)
+        self.assertEqual(stats["copied"], 3)
+        self.assertEqual(self.read("modules/mod0.py"), "value = 0\n")
+        self.assertEqual(self.read("modules/sub/inner.py"), "inner = True\n")
+        self.assertEqual(self.read("config.json"), '{"a": 1}')
+        self.assertFalse(os.path.exists(os.path.join(self.root, "modules", "new.py")))
+        self.assertEqual(sorted(os.listdir(self.root)), [".snapshots", "config.json", "modules"])
+
+        # 復元したファイルを書き換えてもスナップショットは壊れない
+        self.write("modules/mod0.py", "again\n")
+        restore_snapshot(root=self.root)
+        self.assertEqual(self.read("modules/mod0.py"), "value = 0\n")
+
+    def test_restore_only_selected_sources(self):
+        self.snapshot()
+        for i in range(5):
+            os.remove(os.path.join(self.root, "modules", f"mod{i}.py"))
+        self.write("config.json", '{"a": 2}')
+        stats = restore_snapshot(root=self.root, sources=["modules"])
+        self.assertEqual(stats["copied"], 5)
+        self.assertEqual(self.read("modules/mod3.py"), "value = 3\n")
+        # 対象外の config.json の作業中の変更はそのまま残る
+        self.assertEqual(self.read("config.json"), '{"a": 2}')
+
+    def test_keeps_n_generations(self):
+        for i in range(4):
+            self.write("modules/mod0.py", f"value = {i * 10}\n")
+            self.snapshot(keep=2)
+        self.assertEqual(list_snapshots(self.store), [3, 4])
+        restore_snapshot(root=self.root, generation=3)
+        self.assertEqual(self.read("modules/mod0.py"), "value = 20\n")
+
+    def test_corrupt_manifest_is_skipped(self):
+        self.snapshot()
+        self.write("modules/mod0.py", "value = 'second'\n")
+        self.snapshot()
+        with open(os.path.join(self.store, "000002", "manifest.json"), "w", encoding="utf-8"):
+            pass
+        # 復元は読める最新の世代（1）に戻る
+        self.write("modules/mod0.py", "broken\n")
+        self.assertIsNotNone(restore_snapshot(root=self.root))
+        self.assertEqual(self.read("modules/mod0.py"), "value = 0\n")
+        # 次の世代番号は壊れた 2 の次になる。壊れた世代は残す世代数に数えない
+        generation, stats = self.snapshot(keep=2)
+        self.assertEqual((generation, stats["linked"]), (3, 7))
+        self.assertEqual(list_snapshots(self.store), [1, 2, 3])
+        self.snapshot(keep=2)
+        self.assertEqual(list_snapshots(self.store), [3, 4])
+
+    def test_no_snapshot(self):
+        self.assertIsNone(restore_snapshot(root=self.root))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules"))
+from update_gist import sync_gist, load_manifest
+
+# gh gist edit の代わり: <gist_id> --add <file> を受け取り、uploads/ にコピーして calls.log に記録する。
+# fail_<file> があれば、その中の回数だけ失敗する（-1 なら常に失敗）
+STAND_IN = '''
+import os, sys, shutil
+gist_id, _, name = sys.argv[1:4]
+here = os.path.dirname(os.path.abspath(__file__))
+with open(os.path.join(here, "calls.log"), "a") as f:
+    f.write(name + "\\n")
+marker = os.path.join(here, "fail_" + name)
+if os.path.exists(marker):
+    count = int(open(marker).read())
+    if count != 0:
+        if count > 0:
+            open(marker, "w").write(str(count - 1))
+        sys.exit("upload failed")
+os.makedirs(os.path.join(here, "uploads", gist_id), exist_ok=True)
+shutil.copy(name, os.path.join(here, "uploads", gist_id, name))
+'''
+
+class TestUpdateGist(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmpdir)
+        with open("stand_in.py", "w", encoding="utf-8") as f:
+            f.write(STAND_IN)
+        self.command = [sys.executable, os.path.join(self.tmpdir, "stand_in.py")]
+        self.files = [f"file{i}.txt" for i in range(6)]
+        for name in self.files:
+            self.write(name, f"content of {name}\n")
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def write(self, name, text):
+        with open(name, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def calls(self):
+        if not os.path.exists("calls.log"):
+            return []
+        with open("calls.log", encoding="utf-8") as f:
+            calls = f.read().split()
+        os.remove("calls.log")
+        return sorted(calls)
+
+    def sync(self, **kwargs):
+        kwargs.setdefault("backoff", 0)
+        return sync_gist("abc", self.files, command=self.command, workers=3, **kwargs)
+
+    def test_only_changed_files_are_uploaded(self):
+        result = self.sync()
+        self.assertEqual(sorted(result["uploaded"]), self.files)
+        self.assertEqual(self.calls(), self.files)
+        self.assertEqual(set(load_manifest(".gist_manifest.json", "abc")), set(self.files))
+
+        result = self.sync()
+        self.assertEqual(result["uploaded"], [])
+        self.assertEqual(self.calls(), [])
+
+        self.write("file2.txt", "changed\n")
+        result = self.sync()
+        self.assertEqual(result["uploaded"], ["file2.txt"])
+        self.assertEqual(self.calls(), ["file2.txt"])
+        with open(os.path.join("uploads", "abc", "file2.txt"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), "changed\n")
+
+        self.assertEqual(sorted(self.sync(force=True)["uploaded"]), self.files)
+        # Gist ID が変わればすべてアップロードし直す
+        self.assertEqual(len(sync_gist("other", self.files, command=self.command, backoff=0)["uploaded"]), 6)
+
+    def test_retry_and_failure(self):
+        self.write("fail_file1.txt", "2")
+        self.write("fail_file3.txt", "-1")
+        with self.assertLogs(level="ERROR"):
+            result = self.sync(retries=2)
+        self.assertIn("file1.txt", result["uploaded"])
+        self.assertEqual(list(result["failed"]), ["file3.txt"])
+        self.assertEqual(self.calls().count("file3.txt"), 3)
+        # 失敗したファイルだけが次回もアップロード対象になる
+        os.remove("fail_file3.txt")
+        self.assertEqual(self.sync()["uploaded"], ["file3.txt"])
+
+    def test_missing_file_and_dry_run(self):
+        os.remove("file0.txt")
+        with self.assertLogs(level="ERROR"):
+            result = self.sync(dry_run=True)
+        self.assertEqual(result["missing"], ["file0.txt"])
+        self.assertEqual(len(result["uploaded"]), 5)
+        self.assertEqual(self.calls(), [])
+        self.assertFalse(os.path.exists(".gist_manifest.json"))
+
+if __name__ == "__main__":
+    unittest.main()
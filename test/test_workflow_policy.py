@@ -0,0 +1,93 @@
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules"))
+from workflow_policy import load_policy, WorkflowPolicy, RunReport, BudgetExceeded
+from config_manager import ConfigManager
+
+class TestWorkflowPolicy(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.config = os.path.join(self.tmpdir, "config.json")
+        self.previous_config = ConfigManager().path
+
+    def tearDown(self):
+        if self.previous_config is not None:
+            ConfigManager().load_config(self.previous_config)
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def write_config(self, workflow):
+        with open(self.config, "w", encoding="utf-8") as f:
+            json.dump({"workflow": workflow}, f)
+
+    def test_config_and_overrides(self):
+        self.write_config({"push_fallback": "head", "on_conflict": "ours", "time_budget": 30})
+        policy = load_policy(self.config, overrides={"on_conflict": "abort", "merge_option": None}, interactive=False)
+        self.assertEqual(policy.choices, {"push_fallback": "head", "on_conflict": "abort", "merge_option": "ask"})
+        self.assertEqual(policy.time_budget, 30.0)
+        self.assertIsNotNone(policy.deadline)
+
+    def test_invalid_values_fall_back_to_defaults(self):
+        self.write_config({"push_fallback": "force", "time_budget": "soon"})
+        with self.assertLogs(level="ERROR"):
+            policy = load_policy(self.config, interactive=False)
+        self.assertEqual(policy.choices["push_fallback"], "ask")
+        self.assertIsNone(policy.deadline)
+
+    def test_reads_workflow_through_config_manager(self):
+        with open(self.config, "w", encoding="utf-8") as f:
+            json.dump({"workflow": "abort everything"}, f)
+        with self.assertLogs(level="ERROR") as logs:
+            policy = load_policy(self.config, interactive=False)
+        self.assertIn("Invalid config value for 'workflow'", "\n".join(logs.output))
+        self.assertEqual(policy.choices["push_fallback"], "ask")
+        # 同じファイルの変更は ConfigManager の再読み込みで反映される
+        self.write_config({"push_fallback": "branch"})
+        os.utime(self.config, ns=(0, 10 ** 9))
+        ConfigManager().reload()
+        self.assertEqual(load_policy(self.config, interactive=False).choices["push_fallback"], "branch")
+
+    def test_non_interactive_never_prompts(self):
+        policy = WorkflowPolicy(interactive=False)
+        with mock.patch("builtins.input", side_effect=AssertionError("prompted")):
+            self.assertEqual(policy.choose("push_fallback", "? ", {"1": "branch"}), "abort")
+            self.assertEqual(policy.choose("on_conflict", "? ", {"y": "ours"}), "abort")
+            self.assertEqual(policy.choose("merge_option", "? ", {"1": "temp_branch"}), "skip")
+
+    def test_interactive_ask_maps_answers(self):
+        policy = WorkflowPolicy({"merge_option": "local_target"}, interactive=True)
+        with mock.patch("builtins.input", return_value=" 1 "):
+            self.assertEqual(policy.choose("push_fallback", "? ", {"1": "branch", "2": "head"}), "branch")
+        with mock.patch("builtins.input", return_value="x"):
+            self.assertEqual(policy.choose("on_conflict", "? ", {"y": "ours"}), "abort")
+        with mock.patch("builtins.input", side_effect=AssertionError("prompted")):
+            self.assertEqual(policy.choose("merge_option", "? "), "local_target")
+
+    def test_budget_stops_next_step_and_report_is_written(self):
+        policy = WorkflowPolicy({"on_conflict": "ours"}, interactive=False, time_budget=0.05)
+        report = RunReport(policy, self.tmpdir)
+        report.start_step("cleanup")
+        policy.choose("on_conflict")
+        report.end_step("ok")
+        time.sleep(0.06)
+        with self.assertRaises(BudgetExceeded):
+            report.start_step("tests")
+        path = os.path.join(self.tmpdir, "reports", "run.json")
+        report.finish(3, "timeout", "budget", path=path)
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.assertEqual(data["status"], "timeout")
+        self.assertEqual(data["exit_code"], 3)
+        self.assertEqual([s["name"] for s in data["steps"]], ["cleanup"])
+        self.assertEqual(data["decisions"], [{"key": "on_conflict", "value": "ours", "source": "policy",
+                                              "step": "cleanup"}])
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["run.json"])
+
+if __name__ == "__main__":
+    unittest.main()